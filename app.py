@@ -6,10 +6,29 @@ import os
 import json
 import hashlib
 import time
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash, Response
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from models import init_db, User, Product, Collection
+from scrapers.browser_pool import browser_pool
+from scrapers.event_loop import background_loop
+from scrapers.request_blocking import block_requests
+from scrapers.http_fetcher import fast_scrape
+from scrapers.readiness import wait_until_ready, wait_for_dom_stable
+from scrapers.extraction_plan import compile_plan
+from scrapers.scheduler import scrape_scheduler
+from scrapers.reverify import reverify_sampler
+from scrapers.single_flight import SingleFlight
+from scrapers.session_warmup import session_warmup
+from scrapers.host_registry import host_registry
+from scrapers.brand_store import brand_store
+from scrapers.price_parser import parse_price, parse_many
+from scrapers.tracing import tracer, current_trace, trace_stage
+from scrapers.strategy_stats import strategy_stats
+from scrapers.circuit_breaker import circuit_breaker, CircuitOpenError, ScrapeBlocked, is_block_status, is_block_title
+from scrapers.negative_cache import negative_cache, classify_failure, BLOCK, PARSE_MISS
+from scrapers.debug_capture import debug_capture
+from scrapers.image_probe import image_prober
 
 # Import scrapers config for standardized timeouts and site configs
 try:
@@ -54,8 +73,37 @@ app.secret_key = os.environ.get('SECRET_KEY', 'favit-secret-key-2025')
 scraping_cache = {}
 CACHE_DURATION = 3600  # 1 hour cache
 
-# File to store dynamically added brands
-BRANDS_FILE = "dynamic_brands.json"
+# Aynı URL için eşzamanlı scrape'ler tek bir scrape'i paylaşır (worker'lar arası dosya kilidi ile);
+# hata yer tutucuları (failed_result) diğer worker'lara paylaşılmaz
+scrape_flight = SingleFlight("app-scrape", shareable=lambda result: bool(result) and not result.get("error"))
+
+# scrape_product için browser context ayarları (browser_pool üzerinden açılır)
+SCRAPE_CONTEXT_OPTIONS = {
+    "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    "viewport": {'width': 1920, 'height': 1080},
+    "locale": 'tr-TR',
+    "timezone_id": 'Europe/Istanbul',
+    "extra_http_headers": {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+        'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Referer': 'https://www.google.com/',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Sec-Fetch-User': '?1',
+        'sec-ch-ua': '"Chromium";v="122", "Not(A:Brand";v="24", "Google Chrome";v="122"',
+        'sec-ch-ua-mobile': '?0',
+        'sec-ch-ua-platform': '"Windows"'
+    }
+}
+
+# WebDriver özelliğini gizle (scrape ve warm-up sayfaları)
+STEALTH_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    window.navigator.chrome = { runtime: {} };
+"""
 
 # Site-specific scraping configurations
 SITE_CONFIGS = {
@@ -576,14 +624,34 @@ SITE_CONFIGS = {
     }
 }
 
+# Host suffix index: "shop.mango.com" gibi alt alan adları eşleşir, "gap.com" başka host'ların içinde eşleşmez
+host_registry.register("app_site_config", SITE_CONFIGS)
+
 def get_site_config(url):
     """URL'den site konfigürasyonunu al"""
-    for domain, config in SITE_CONFIGS.items():
-        if domain in url:
-            return config
-    return None
+    return host_registry.lookup("app_site_config", url)
+
+# Sportime (Shopify) DOM fiyat selector'ları - öncelik sırasına göre
+SPORTIME_PRICE_SELECTORS = [
+    '.product-price .money',
+    '.product__price .money',
+    '.product-single__price .money',
+    '.price .money',
+    '[itemprop="price"]',
+    '.product-price',
+    '.product__price',
+    '.product-single__price',
+    '.money',
+    'span.money',
+    'span.product-price',
+    '.price',
+    'span.price',
+    '[data-price]',
+    '.current-price',
+    '.sale-price'
+]
 
-async def extract_with_site_config(page, url, site_config):
+async def extract_with_site_config(page, url, site_config, candidates=None):
     """Site-specific konfigürasyon kullanarak veri çek"""
     title = None
     price = None
@@ -591,13 +659,18 @@ async def extract_with_site_config(page, url, site_config):
     image = None
     
     try:
+        # Tüm selector adaylarını tek page.evaluate ile topla (selector başına CDP round-trip yok)
+        if candidates is None:
+            extra = {"price": SPORTIME_PRICE_SELECTORS} if "sportime.com.tr" in url else None
+            candidates = await compile_plan(site_config, extra).collect(page, url)
+        
         # Başlık çekme
         if site_config and 'title_selectors' in site_config:
             for selector in site_config['title_selectors']:
                 try:
-                    title_element = await page.query_selector(selector)
+                    title_element = candidates.query('title', selector)
                     if title_element:
-                        title = await title_element.text_content()
+                        title = title_element['text']
                         if title and title.strip():
                             title = title.strip().upper()
                             title = re.sub(r'[^\w\s\-\.]', '', title)
@@ -618,9 +691,7 @@ async def extract_with_site_config(page, url, site_config):
                 try:
                     # Önce JSON-LD structured data'dan fiyat çek (en güvenilir)
                     try:
-                        json_ld_scripts = await page.query_selector_all('script[type="application/ld+json"]')
-                        for script in json_ld_scripts:
-                            script_content = await script.text_content()
+                        for script_content in candidates.jsonld:
                             if script_content and 'offers' in script_content:
                                 import json
                                 try:
@@ -648,9 +719,9 @@ async def extract_with_site_config(page, url, site_config):
                     # JSON-LD'den bulunamadıysa meta tag'lerden çek
                     if not price:
                         try:
-                            meta_price = await page.query_selector('meta[property="product:price:amount"]')
-                            if meta_price:
-                                price_value = await meta_price.get_attribute('content')
+                            meta_prices = candidates.meta(['meta[property="product:price:amount"]'])
+                            if meta_prices:
+                                price_value = meta_prices[0]
                                 if price_value:
                                     try:
                                         price_float = float(price_value)
@@ -665,32 +736,15 @@ async def extract_with_site_config(page, url, site_config):
                     # Meta'dan da bulunamadıysa DOM'dan çek
                     if not price:
                         # Shopify'ın standart fiyat selector'ları - öncelik sırasına göre
-                        sportime_price_selectors = [
-                            '.product-price .money',
-                            '.product__price .money',
-                            '.product-single__price .money',
-                            '.price .money',
-                            '[itemprop="price"]',
-                            '.product-price',
-                            '.product__price',
-                            '.product-single__price',
-                            '.money',
-                            'span.money',
-                            'span.product-price',
-                            '.price',
-                            'span.price',
-                            '[data-price]',
-                            '.current-price',
-                            '.sale-price'
-                        ]
+                        sportime_price_selectors = SPORTIME_PRICE_SELECTORS
                         
                         all_found_prices = []
                         
                         for selector in sportime_price_selectors:
                             try:
-                                price_elements = await page.query_selector_all(selector)
+                                price_elements = candidates.query_all('price', selector)
                                 for element in price_elements:
-                                    price_text = await element.text_content()
+                                    price_text = element['text']
                                     if price_text and price_text.strip():
                                         price_text = price_text.strip()
                                         print(f"[DEBUG] Sportime price element text: '{price_text[:100]}...' (selector: {selector})")
@@ -2329,9 +2383,9 @@ async def extract_with_site_config(page, url, site_config):
                 # Tüm fiyat elementlerini topla
                 for selector in site_config['price_selectors']:
                     try:
-                        price_elements = await page.query_selector_all(selector)
+                        price_elements = candidates.query_all('price', selector)
                         for element in price_elements:
-                            price_text = await element.text_content()
+                            price_text = element['text']
                             if price_text and price_text.strip():
                                 # Fiyat temizleme
                                 price_text = price_text.strip()
@@ -2344,8 +2398,7 @@ async def extract_with_site_config(page, url, site_config):
                                     price_num = float(clean_price)
                                     all_prices.append({
                                         'value': price_num,
-                                        'text': price_text,
-                                        'element': element
+                                        'text': price_text
                                     })
                     except Exception as e:
                         print(f"[DEBUG] Price selector hatası {selector}: {e}")
@@ -2385,9 +2438,9 @@ async def extract_with_site_config(page, url, site_config):
         if site_config and 'old_price_selectors' in site_config and site_config['old_price_selectors']:
             for selector in site_config['old_price_selectors']:
                 try:
-                    old_price_element = await page.query_selector(selector)
+                    old_price_element = candidates.query('old_price', selector)
                     if old_price_element:
-                        old_price_text = await old_price_element.text_content()
+                        old_price_text = old_price_element['text']
                         if old_price_text and old_price_text.strip():
                             # Fiyat temizleme ve TL ekleme
                             old_price_text = old_price_text.strip()
@@ -2985,11 +3038,12 @@ async def extract_with_site_config(page, url, site_config):
             if not image:
                 for selector in site_config['image_selectors']:
                     try:
-                        img_element = await page.query_selector(selector)
+                        src = None
+                        img_element = candidates.query('image', selector)
                         if img_element:
                             # Önce srcset'i kontrol et (daha yüksek kalite için)
-                            srcset = await img_element.get_attribute('srcset')
-                            src = await img_element.get_attribute('src')
+                            srcset = img_element.get('srcset')
+                            src = img_element.get('src')
                             
                             # Diğer siteler için genel srcset işleme
                             if srcset:
@@ -3022,7 +3076,7 @@ async def extract_with_site_config(page, url, site_config):
                             # Sportime/Shopify için özel görsel işleme
                             if "sportime.com.tr" in url or "shopify" in src.lower():
                                     # data-src kontrolü (lazy loading)
-                                    data_src = await img_element.get_attribute('data-src')
+                                    data_src = img_element.get('data-src')
                                     if data_src and any(ext in data_src.lower() for ext in ['.jpg', '.jpeg', '.webp', '.png']):
                                         if not any(skip in data_src.lower() for skip in ['logo', 'icon', 'banner', 'header', 'footer', 'ad']):
                                             src = data_src
@@ -3091,6 +3145,33 @@ def set_cached_result(url, data):
     cache_key = get_cache_key(url)
     scraping_cache[cache_key] = (data, time.time())
 
+def failed_result(url, brand, failure):
+    """Başarısız scrape yer tutucusu; "error" alanı hata sınıfı (timeout/block/parse_miss/error), cache'e yazılmaz"""
+    return {
+        "id": str(uuid.uuid4()),
+        "url": url,
+        "name": "Scraping hatası - Lütfen URL'yi kontrol edin",
+        "price": "Fiyat bulunamadı",
+        "old_price": None,
+        "image": None,
+        "brand": brand,
+        "discount_info": None,
+        "sizes": [],
+        "error": failure
+    }
+
+def record_scrape_success(url, result):
+    """Başarılı sonuç: success cache, circuit breaker ve negatif cache"""
+    set_cached_result(url, result)
+    circuit_breaker.record_success(url, result)
+    negative_cache.record_success(url)
+
+def record_scrape_failure(url, failure):
+    """Başarısız scrape: success cache'e dokunmadan negatif cache ve circuit breaker"""
+    ttl = negative_cache.record_failure(url, failure)
+    circuit_breaker.record_failure(url, failure)
+    print(f"[DEBUG] Scrape başarısız ({failure}), {ttl:.0f} sn tekrar denenmeyecek: {url}")
+
 def extract_domain_from_url(url):
     """URL'den domain çıkar"""
     from urllib.parse import urlparse
@@ -3104,24 +3185,6 @@ def extract_domain_from_url(url):
     except:
         return None
 
-def load_dynamic_brands():
-    """Dinamik olarak eklenen markaları yükle"""
-    try:
-        if os.path.exists(BRANDS_FILE):
-            with open(BRANDS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"[HATA] Dinamik markalar yüklenemedi: {e}")
-    return []
-
-def save_dynamic_brands(brands):
-    """Dinamik markaları kaydet"""
-    try:
-        with open(BRANDS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(brands, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"[HATA] Dinamik markalar kaydedilemedi: {e}")
-
 def add_brand_automatically(domain):
     """Yeni markayı otomatik olarak ekle"""
     if not domain:
@@ -3165,20 +3228,10 @@ def add_brand_automatically(domain):
     if domain.split('.')[0].lower() in brand_mappings:
         brand_name = brand_mappings[domain.split('.')[0].lower()]
     
-    # Dinamik markaları yükle
-    dynamic_brands = load_dynamic_brands()
-    
-    # Marka zaten var mı kontrol et
-    for existing_domain, existing_name in dynamic_brands:
-        if existing_domain == domain:
-            return existing_name
-    
-    # Yeni markayı ekle
-    new_brand = (domain, brand_name)
-    dynamic_brands.append(new_brand)
-    save_dynamic_brands(dynamic_brands)
-    
-    print(f"[YENİ MARKA] Otomatik olarak eklendi: {domain} -> {brand_name}")
+    # Yeni markayı ekle (zaten varsa mevcut adı döner); dosyaya toplu yazılır
+    brand_name, created = brand_store.add(domain, brand_name)
+    if created:
+        print(f"[YENİ MARKA] Otomatik olarak eklendi: {domain} -> {brand_name}")
     return brand_name
 
 def detect_brand_from_url(url):
@@ -3188,15 +3241,14 @@ def detect_brand_from_url(url):
         return "Bilinmiyor"
     
     # Önce sabit BRANDS listesinde ara
-    for brand_domain, brand_name in BRANDS:
-        if brand_domain in domain:
-            return brand_name
+    brand_name = host_registry.lookup("brand", domain)
+    if brand_name:
+        return brand_name
     
-    # Dinamik markalarda ara
-    dynamic_brands = load_dynamic_brands()
-    for brand_domain, brand_name in dynamic_brands:
-        if brand_domain in domain:
-            return brand_name
+    # Dinamik markalarda ara (bellekte; dosya yalnızca değiştiğinde yeniden okunur)
+    brand_name = brand_store.lookup(domain)
+    if brand_name:
+        return brand_name
     
     # Marka bulunamadı, otomatik ekle
     new_brand_name = add_brand_automatically(domain)
@@ -3312,15 +3364,47 @@ BRANDS = [
     ("kigili.com", "Kigili"),
 ]
 
-async def scrape_product(url):
-    print(f"[DEBUG] Scraping başlıyor: {url}")
-    
-    # Check cache
-    cached_data = get_cached_result(url)
+# Tekrarlanan girişlerde ilk eşleşme geçerli (liste sırası korunur)
+host_registry.register("brand", BRANDS)
+
+@tracer.traced("app")
+async def scrape_product(url, use_cache=True, use_negative_cache=True):
+    # Check cache (yeniden doğrulama taze veri ister)
+    cached_data = get_cached_result(url) if use_cache else None
     if cached_data:
         print(f"[DEBUG] Cache'ten veri alındı: {url}")
+        trace = current_trace()
+        if trace is not None:
+            trace.outcome = "cache"
         return cached_data
     
+    # Yakın zamanda başarısız olan URL: TTL dolana kadar browser açılmaz (use_negative_cache=False ile atlanır)
+    failure = negative_cache.get(url, bypass=not use_negative_cache)
+    if failure:
+        print(f"[DEBUG] Negatif cache: {url} ({failure['failure']}, {failure['retry_after']} sn kaldı)")
+        trace = current_trace()
+        if trace is not None:
+            trace.outcome = "negative_cache"
+        return failed_result(url, detect_brand_from_url(url), failure["failure"])
+    
+    # Engelleyen/sürekli hata veren mağaza: timeout'ları beklemeden son başarılı veri ya da hızlı hata
+    try:
+        circuit_breaker.check(url)
+    except CircuitOpenError as e:
+        if e.last_good is None:
+            raise
+        print(f"[DEBUG] Circuit breaker açık, son başarılı veri kullanılıyor: {url}")
+        trace = current_trace()
+        if trace is not None:
+            trace.outcome = "stale"
+        return e.last_good
+    
+    # Aynı URL zaten çekiliyorsa (başka istek/worker) onun sonucunu bekle
+    return await scrape_flight.run_async(url, lambda: _scrape_product(url))
+
+async def _scrape_product(url):
+    print(f"[DEBUG] Scraping başlıyor: {url}")
+    
     # Dinamik marka tespiti
     brand = detect_brand_from_url(url)
     print(f"[DEBUG] Tespit edilen marka: {brand}")
@@ -3338,180 +3422,112 @@ async def scrape_product(url):
     if os.environ.get('RENDER') or os.environ.get('PORT'):
         headless = True
     
+    # HTTP fast path: sunucu tarafında render edilen sayfalar için browser açma
+    fast_data = await fast_scrape(url)
+    ranked = None
+    if fast_data and fast_data.get("complete"):
+        # Logo / placeholder görseller elenir; hiçbir aday geçmezse browser denenir
+        ranked = await image_prober.rank([fast_data["image"]] + list(fast_data.get("images") or []), referer=url)
+    if ranked and ranked["image"]:
+        print(f"[DEBUG] HTTP fast path başarılı ({fast_data['sources']}, {fast_data['fetch']['elapsed']}s): {url}")
+        result = {
+            "id": str(uuid.uuid4()),
+            "url": url,
+            "name": fast_data["title"],
+            "price": fast_data["price"],
+            "old_price": fast_data.get("old_price"),
+            "image": ranked["image"],
+            "images": ranked["images"],
+            "brand": brand,
+            "discount_info": None,
+            "sizes": []
+        }
+        record_scrape_success(url, result)
+        return result
+    
     try:
-        async with async_playwright() as p:
-            # Browser'ı başlat - Production ayarları
-            browser = await p.chromium.launch(
-                headless=True,  # Her zaman headless kullan
-                args=[
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox',
-                    '--disable-gpu',
-                    '--disable-plugins',
-                    '--disable-extensions',
-                    '--disable-background-timer-throttling',
-                    '--disable-backgrounding-occluded-windows',
-                    '--disable-renderer-backgrounding',
-                    '--disable-features=TranslateUI',
-                    '--disable-ipc-flooding-protection',
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor',
-                    '--disable-default-apps',
-                    '--disable-sync',
-                    '--disable-translate',
-                    '--hide-scrollbars',
-                    '--mute-audio',
-                    '--no-default-browser-check',
-                    '--no-pings',
-                    '--disable-prompt-on-repost',
-                    '--disable-hang-monitor',
-                    '--disable-client-side-phishing-detection',
-                    '--disable-component-update',
-                    '--disable-domain-reliability',
-                    '--disable-features=AudioServiceOutOfProcess',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-accelerated-2d-canvas',
-                    '--no-first-run',
-                    '--no-zygote',
-                    '--single-process',
-                    '--disable-background-networking',
-                ]
-            )
-            
-            # Context oluştur
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080},
-                locale='tr-TR',
-                timezone_id='Europe/Istanbul',
-                extra_http_headers={
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                    'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Referer': 'https://www.google.com/',
-                    'Upgrade-Insecure-Requests': '1',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Sec-Fetch-User': '?1',
-                    'sec-ch-ua': '"Chromium";v="122", "Not(A:Brand";v="24", "Google Chrome";v="122"',
-                    'sec-ch-ua-mobile': '?0',
-                    'sec-ch-ua-platform': '"Windows"'
-                }
-            )
-            
+        # Mango/Zara/Bershka/Pull&Bear/Les Benjamins: ana sayfa ziyareti (cookie/oturum) ve çerez onayı
+        # domain başına bir kez yapılır; saklanan storage_state yeni context'e enjekte edilir
+        warmup_domain, _ = session_warmup.site_for(url)
+        storage_state = await session_warmup.storage_state(
+            url, context_options=SCRAPE_CONTEXT_OPTIONS, init_script=STEALTH_INIT_SCRIPT
+        )
+        context_options = dict(SCRAPE_CONTEXT_OPTIONS, storage_state=storage_state) if storage_state else SCRAPE_CONTEXT_OPTIONS
+        
+        # Kalıcı browser havuzundan izole bir context al (her çağrıda Chromium başlatma yok)
+        async with browser_pool.context(**context_options) as context:
+            # Görsel/font/medya ve tracker isteklerini engelle
+            request_blocker = await block_requests(context, url)
             page = await context.new_page()
             
             # WebDriver özelliğini gizle
-            await page.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                window.navigator.chrome = { runtime: {} };
-            """)
+            await page.add_init_script(STEALTH_INIT_SCRIPT)
 
+            response = None
             try:
-                # Site-specific navigation logic
-                # Standardized navigation timeouts
-                nav_timeout = get_timeout("navigation")
-                wait_time = 2000
-                
-                if "mango.com" in url:
-                    print(f"[DEBUG] Mango için özel navigation başlıyor")
-                    try:
-                        await page.goto("https://shop.mango.com/tr", wait_until="domcontentloaded", timeout=nav_timeout)
-                        await page.wait_for_timeout(wait_time)
-                    except:
-                        pass
-                elif "zara.com" in url:
-                    try:
-                        await page.goto("https://www.zara.com/tr/", wait_until="domcontentloaded", timeout=nav_timeout)
-                        await page.wait_for_timeout(wait_time)
-                    except:
-                        pass
-                elif "bershka.com" in url:
-                    try:
-                        await page.goto("https://www.bershka.com/tr/", wait_until="domcontentloaded", timeout=nav_timeout)
-                        await page.wait_for_timeout(wait_time)
-                    except:
-                        pass
-                elif "pullandbear.com" in url:
-                    try:
-                        await page.goto("https://www.pullandbear.com/tr/", wait_until="domcontentloaded", timeout=nav_timeout)
-                        await page.wait_for_timeout(wait_time)
-                    except:
-                        pass
-                elif "lesbenjamins.com" in url:
-                    try:
-                        await page.goto("https://lesbenjamins.com/", wait_until="domcontentloaded", timeout=nav_timeout)
-                        await page.wait_for_timeout(wait_time)
-                    except:
-                        pass
-                
                 print(f"[DEBUG] Sayfa yükleniyor: {url}")
                 page_load_timeout = get_timeout("page_load")
-                response = await page.goto(url, timeout=page_load_timeout, wait_until='domcontentloaded')
+                with trace_stage("goto") as trace:
+                    response = await page.goto(url, timeout=page_load_timeout, wait_until='domcontentloaded')
                 
                 # Sayfa yüklenme durumunu kontrol et
                 if response:
                     print(f"[DEBUG] Sayfa yanıt kodu: {response.status}")
+                    if trace is not None:
+                        trace.add_bytes("document", response.headers.get("content-length"))
+                    # Saklanan oturum reddedildiyse bir sonraki scrape yeniden warm-up yapsın
+                    if storage_state and response.status in (401, 403):
+                        session_warmup.invalidate(warmup_domain)
                 
                 # Pull&Bear için özel işlemler
                 if "pullandbear.com" in url:
                     print("[DEBUG] Pull&Bear sayfası için özel bekleme ve scroll...")
                     
-                    # Çerezleri kabul et
-                    element_wait_timeout = get_timeout("element_wait")
-                    try:
-                        await page.click('#onetrust-accept-btn-handler', timeout=element_wait_timeout)
-                        print("[DEBUG] Çerezler kabul edildi")
-                    except:
-                        pass
+                    # Çerezleri kabul et (warm-up başarısız olduysa; aksi halde onay storage_state'te)
+                    if not storage_state:
+                        element_wait_timeout = get_timeout("element_wait")
+                        try:
+                            await page.click('#onetrust-accept-btn-handler', timeout=element_wait_timeout)
+                            print("[DEBUG] Çerezler kabul edildi")
+                        except:
+                            pass
                         
-                    # Sayfayı yavaşça aşağı kaydır (Lazy load tetiklemek için)
-                    scroll_wait = 1000
+                    # Sayfayı yavaşça aşağı kaydır (Lazy load tetiklemek için); her adımda DOM durulunca devam et
                     for i in range(5):
                         await page.evaluate(f"window.scrollBy(0, 500)")
-                        await page.wait_for_timeout(scroll_wait)
+                        await wait_for_dom_stable(page, label="scroll")
                     
                     # Sayfanın en üstüne geri dön
                     await page.evaluate("window.scrollTo(0, 0)")
-                    await page.wait_for_timeout(scroll_wait)
-                    
-                    # Debug için HTML kaydet
-                    try:
-                        import os
-                        debug_dir = os.path.join(os.getcwd(), 'static', 'debug')
-                        os.makedirs(debug_dir, exist_ok=True)
-                        await page.screenshot(path=os.path.join(debug_dir, 'pullandbear_latest.png'), full_page=True)
-                        with open(os.path.join(debug_dir, 'pullandbear_latest.html'), 'w', encoding='utf-8') as f:
-                            f.write(await page.content())
-                        print("[DEBUG] Debug dosyaları kaydedildi")
-                    except Exception as e:
-                        print(f"[ERROR] Debug kaydetme hatası: {e}")
-
-                else:
-                    # Diğer siteler için standart bekleme
-                    network_idle_timeout = get_timeout("network_idle")
-                    try:
-                        await page.wait_for_load_state('networkidle', timeout=network_idle_timeout)
-                    except:
-                        pass
 
             except Exception as e:
                 print(f"[ERROR] Sayfa yükleme hatası: {e}")
+                await debug_capture.capture(page, url, classify_failure(e), {"error": str(e)})
                 # Devam etmeye çalış
-                
-            # Ek bekleme (standardized)
-            default_wait = 3000
-            await page.wait_for_timeout(default_wait)
+            
+            # 403/429/503: hazır olma beklemesi ve extraction boşuna, doğrudan hata
+            if response is not None and is_block_status(response.status):
+                await debug_capture.capture(page, url, BLOCK, {"status": response.status})
+                raise ScrapeBlocked(f"HTTP {response.status}")
             
             # Site-specific konfigürasyonu al ve veri çek
             site_config = get_site_config(url)
+            
+            # Sabit bekleme yerine: JSON-LD Product, rakam içeren fiyat elementi ya da durulmuş DOM
+            await wait_until_ready(page, price_selectors=(site_config or {}).get("price_selectors"))
+            
+            trace = current_trace()
             if site_config:
                 print(f"[DEBUG] Site-specific konfigürasyon kullanılıyor")
-                site_title, site_price, site_old_price, site_image = await extract_with_site_config(page, url, site_config)
+                with trace_stage("extract.site"):
+                    site_title, site_price, site_old_price, site_image = await extract_with_site_config(page, url, site_config)
+                if trace is not None:
+                    for field, value in (("title", site_title), ("price", site_price), ("image", site_image)):
+                        if value:
+                            trace.claim(field, "site")
             else:
                 site_title, site_price, site_old_price, site_image = None, None, None, None
+                site_images = []
                 
                 # Universal scraper'ı kullan (site-specific yoksa veya eksik veri varsa)
                 if UNIVERSAL_SCRAPER_AVAILABLE and universal_scraper:
@@ -3519,9 +3535,14 @@ async def scrape_product(url):
                     if use_universal:
                         print(f"[DEBUG] Universal scraper kullanılıyor (site-specific yok veya eksik veri)")
                         try:
-                            uni_title = await universal_scraper.extract_title(page)
-                            uni_price, uni_old_price = await universal_scraper.extract_price(page, url)
-                            uni_image, uni_images = await universal_scraper.extract_image(page, url)
+                            # Tek round-trip: tüm adaylar toplanır, öncelik ve fiyat parse Python'da
+                            candidates = await compile_plan(site_config).collect(page, url)
+                            # Bu domain'de (neredeyse) hiç kazanmayan tier'lar en sona alınır
+                            uni_data = strategy_stats.resolve(candidates)
+                            print(f"[DEBUG] Universal extraction kaynakları: {uni_data['sources']}")
+                            uni_title = uni_data["title"]
+                            uni_price, uni_old_price = uni_data["price"], uni_data["old_price"]
+                            uni_image, uni_images = uni_data["image"], uni_data["images"]
                             
                             # Site-specific verileri universal verilerle birleştir (öncelik site-specific'te)
                             if not site_title and uni_title:
@@ -3535,6 +3556,7 @@ async def scrape_product(url):
                                 print(f"[DEBUG] Universal scraper'dan eski fiyat alındı: {site_old_price}")
                             if not site_image and uni_image:
                                 site_image = uni_image
+                                site_images = uni_images
                                 print(f"[DEBUG] Universal scraper'dan görsel alındı: {site_image}")
                         except Exception as e:
                             print(f"[DEBUG] Universal scraper hatası: {e}")
@@ -3542,6 +3564,8 @@ async def scrape_product(url):
                             traceback.print_exc()
                 
                 # Başlık çek - Boyner'deki başarılı selectors
+                if trace is not None:
+                    trace.mark("extract.legacy")
                 title = None
                 try:
                     title_selectors = [
@@ -3553,24 +3577,31 @@ async def scrape_product(url):
                         'title'
                     ]
                     
-                    for selector in title_selectors:
-                        try:
-                            if selector == 'title':
-                                title_element = await page.query_selector('title')
-                                if title_element:
-                                    title = await title_element.text_content()
-                            else:
-                                title_element = await page.query_selector(selector)
-                                if title_element:
-                                    title = await title_element.text_content()
+                    # Universal extraction başlığı bulduysa DOM'u tekrar tarama
+                    if not site_title:
+                        # Bu domain'de hiç eşleşmeyen selector'lar sona alınır (her deneme bir round trip)
+                        title_selectors = strategy_stats.order(url, "title", "selector", title_selectors)
+                        title_winner = None
+                        for selector in title_selectors:
+                            try:
+                                if selector == 'title':
+                                    title_element = await page.query_selector('title')
+                                    if title_element:
+                                        title = await title_element.text_content()
+                                else:
+                                    title_element = await page.query_selector(selector)
+                                    if title_element:
+                                        title = await title_element.text_content()
                             
-                            if title and title.strip():
-                                title = title.strip().upper()
-                                title = re.sub(r'[^\w\s\-\.]', '', title)
-                                title = re.sub(r'\s+', ' ', title).strip()
-                                break
-                        except:
-                            continue
+                                if title and title.strip():
+                                    title = title.strip().upper()
+                                    title = re.sub(r'[^\w\s\-\.]', '', title)
+                                    title = re.sub(r'\s+', ' ', title).strip()
+                                    title_winner = selector
+                                    break
+                            except:
+                                continue
+                        strategy_stats.record_selectors(url, "title", title_selectors, title_winner)
                     
                     # Site-specific başlık varsa kullan
                     if site_title:
@@ -3793,8 +3824,9 @@ async def scrape_product(url):
                     title = "Başlık bulunamadı"
 
                 # Görsel çek - Gelişmiş yaklaşım (tüm görselleri topla)
-                image = None
-                images = []  # Tüm görselleri buraya topla
+                # Universal extraction görseli bulduysa DOM'u tekrar tarama
+                image = site_image
+                images = list(site_images) if site_image else []  # Tüm görselleri buraya topla
                 try:
                     # Önce ürün görseli için özel selector'ları dene
                     product_img_selectors = [
@@ -3813,55 +3845,56 @@ async def scrape_product(url):
                     ]
                     
                     # Ürün görseli için özel arama
-                    for selector in product_img_selectors:
-                        try:
-                            img_elements = await page.query_selector_all(selector)
-                            for img in img_elements:
-                                src = await img.get_attribute('src')
-                                srcset = await img.get_attribute('srcset')
-                                alt = await img.get_attribute('alt') or ''
+                    if not image:
+                        for selector in product_img_selectors:
+                            try:
+                                img_elements = await page.query_selector_all(selector)
+                                for img in img_elements:
+                                    src = await img.get_attribute('src')
+                                    srcset = await img.get_attribute('srcset')
+                                    alt = await img.get_attribute('alt') or ''
                                 
-                                # Ürün görseli olup olmadığını kontrol et
-                                if src and any(ext in src.lower() for ext in ['.jpg', '.jpeg', '.webp', '.png']):
-                                    # Logo, icon gibi küçük görselleri filtrele
-                                    if not any(skip in src.lower() for skip in ['logo', 'icon', 'banner', 'header', 'footer']):
-                                        # Boyut kontrolü (çok küçük görselleri filtrele)
-                                        try:
-                                            size = await img.bounding_box()
-                                            if size and size['width'] > 100 and size['height'] > 100:
-                                                # İlk görseli ana görsel olarak ayarla
+                                    # Ürün görseli olup olmadığını kontrol et
+                                    if src and any(ext in src.lower() for ext in ['.jpg', '.jpeg', '.webp', '.png']):
+                                        # Logo, icon gibi küçük görselleri filtrele
+                                        if not any(skip in src.lower() for skip in ['logo', 'icon', 'banner', 'header', 'footer']):
+                                            # Boyut kontrolü (çok küçük görselleri filtrele)
+                                            try:
+                                                size = await img.bounding_box()
+                                                if size and size['width'] > 100 and size['height'] > 100:
+                                                    # İlk görseli ana görsel olarak ayarla
+                                                    if not image:
+                                                        image = src
+                                                    # Tüm görselleri listeye ekle (tekrar yoksa)
+                                                    if src not in images:
+                                                        images.append(src)
+                                                    break
+                                            except:
                                                 if not image:
                                                     image = src
-                                                # Tüm görselleri listeye ekle (tekrar yoksa)
                                                 if src not in images:
                                                     images.append(src)
                                                 break
-                                        except:
-                                            if not image:
-                                                image = src
-                                            if src not in images:
-                                                images.append(src)
-                                            break
                                 
-                                # srcset kontrolü - tüm görselleri topla
-                                if srcset:
-                                    srcset_urls = srcset.split(',')
-                                    for srcset_url in srcset_urls:
-                                        url_part = srcset_url.strip().split(' ')[0]
-                                        if any(ext in url_part.lower() for ext in ['.jpg', '.jpeg', '.webp', '.png']):
-                                            if not any(skip in url_part.lower() for skip in ['logo', 'icon', 'banner']):
-                                                if not image:
-                                                    image = url_part
-                                                if url_part not in images:
-                                                    images.append(url_part)
+                                    # srcset kontrolü - tüm görselleri topla
+                                    if srcset:
+                                        srcset_urls = srcset.split(',')
+                                        for srcset_url in srcset_urls:
+                                            url_part = srcset_url.strip().split(' ')[0]
+                                            if any(ext in url_part.lower() for ext in ['.jpg', '.jpeg', '.webp', '.png']):
+                                                if not any(skip in url_part.lower() for skip in ['logo', 'icon', 'banner']):
+                                                    if not image:
+                                                        image = url_part
+                                                    if url_part not in images:
+                                                        images.append(url_part)
                                 
+                                    if image:
+                                        break
+                            
                                 if image:
                                     break
-                            
-                            if image:
-                                break
-                        except:
-                            continue
+                            except:
+                                continue
                     
                     # Eğer ürün görseli bulunamadıysa, genel görsel arama
                     if not image:
@@ -4345,6 +4378,10 @@ async def scrape_product(url):
                             'p'
                         ]
                         
+                        # Hiç eşleşmeyen selector'lar sona (her deneme bir round trip)
+                        discount_price_selectors = strategy_stats.order(url, "price", "selector", discount_price_selectors)
+                        general_price_selectors = strategy_stats.order(url, "price", "selector", general_price_selectors)
+                        
                         # Önce indirimli fiyat ara
                         for selector in discount_price_selectors:
                             try:
@@ -4372,6 +4409,7 @@ async def scrape_product(url):
                                     break
                             except:
                                 continue
+                        strategy_stats.record_selectors(url, "price", discount_price_selectors, selector if price else None)
                         
                         # İndirimli fiyat bulunamadıysa genel fiyat ara
                         if not price:
@@ -4402,6 +4440,7 @@ async def scrape_product(url):
                                         break
                                 except:
                                     continue
+                            strategy_stats.record_selectors(url, "price", general_price_selectors, selector if price else None)
                         
                         # Sportime.com.tr için özel fiyat çekme
                         if ("sportime.com.tr" in url) and (not price or price == "Fiyat bulunamadı"):
@@ -4789,8 +4828,17 @@ async def scrape_product(url):
                 print(f"[DEBUG] Çekilen marka: {brand}")
                 print(f"[DEBUG] Çekilen görsel: {image}")
                 print(f"[DEBUG] Çekilen indirim bilgisi: {discount_info}")
+                if request_blocker:
+                    print(f"[DEBUG] İstek engelleme: {request_blocker.summary()}")
                 
                 # Eğer images listesi boşsa ama image varsa, image'i ekle
+                if trace is not None:
+                    trace.mark("postprocess")
+                # Tüm adaylar paralel prob edilir (Range ile sadece header): 1x1 placeholder / SVG / 404 elenir,
+                # kalanlar boyut ve en-boy oranına göre sıralanır (küçük / logo oranlı görseller en sona)
+                if image or images:
+                    ranked = await image_prober.rank([image] + list(images or []), referer=url, keep_weak=True)
+                    image, images = ranked["image"], ranked["images"]
                 if not images and image:
                     images = [image]
                 # Eğer image yoksa ama images varsa, ilk görseli image olarak ayarla
@@ -4809,25 +4857,26 @@ async def scrape_product(url):
                     "discount_info": discount_info,
                     "sizes": []
                 }
-                set_cached_result(url, result)
+                # Fiyatsız / engel sayfası sonucu success cache'e yazılmaz
+                if is_block_title(title):
+                    outcome = BLOCK
+                    record_scrape_failure(url, BLOCK)
+                elif price:
+                    outcome = "success"
+                    record_scrape_success(url, result)
+                else:
+                    outcome = PARSE_MISS
+                    record_scrape_failure(url, PARSE_MISS)
+                # Örneklenmiş sayfa kaydı (başarısızlarda hepsi); yazma request dışında
+                await debug_capture.capture(page, url, outcome, {"title": title, "price": price, "image": image})
                 return result
 
     except Exception as e:
         print(f"[HATA] Scraping başarısız: {e}")
         traceback.print_exc()
-        result = {
-            "id": str(uuid.uuid4()),
-            "url": url,
-            "name": "Scraping hatası - Lütfen URL'yi kontrol edin",
-            "price": "Fiyat bulunamadı",
-            "old_price": None,
-            "image": None,
-            "brand": brand,
-            "discount_info": None,
-            "sizes": []
-        }
-        set_cached_result(url, result)
-        return result
+        failure = classify_failure(e)
+        record_scrape_failure(url, failure)
+        return failed_result(url, brand, failure)
 
 @app.route("/")
 def index():
@@ -4839,7 +4888,7 @@ def index():
 @login_required
 def manage_brands():
     """Dinamik markaları yönet"""
-    dynamic_brands = load_dynamic_brands()
+    dynamic_brands = brand_store.all()
     all_brands = BRANDS + dynamic_brands
     return render_template("manage_brands.html", brands=all_brands, dynamic_brands=dynamic_brands)
 
@@ -4851,18 +4900,11 @@ def add_brand_manual():
     brand_name = request.form.get("brand_name")
     
     if domain and brand_name:
-        dynamic_brands = load_dynamic_brands()
-        
-        # Zaten var mı kontrol et
-        for existing_domain, existing_name in dynamic_brands:
-            if existing_domain == domain:
-                flash("Bu domain zaten mevcut", "error")
-                return redirect(url_for("manage_brands"))
-        
-        # Yeni markayı ekle
-        new_brand = (domain, brand_name)
-        dynamic_brands.append(new_brand)
-        save_dynamic_brands(dynamic_brands)
+        # Yeni markayı ekle ve hemen kaydet (zaten varsa eklenmez)
+        _, created = brand_store.add(domain, brand_name, flush=True)
+        if not created:
+            flash("Bu domain zaten mevcut", "error")
+            return redirect(url_for("manage_brands"))
         
         flash(f"Marka başarıyla eklendi: {domain} -> {brand_name}", "success")
     else:
@@ -4874,20 +4916,97 @@ def add_brand_manual():
 @login_required
 def delete_brand(domain):
     """Dinamik markayı sil"""
-    dynamic_brands = load_dynamic_brands()
-    
-    # Markayı bul ve sil
-    for i, (brand_domain, brand_name) in enumerate(dynamic_brands):
-        if brand_domain == domain:
-            deleted_brand = dynamic_brands.pop(i)
-            save_dynamic_brands(dynamic_brands)
-            flash(f"Marka silindi: {deleted_brand[0]} -> {deleted_brand[1]}", "success")
-            break
+    deleted_brand = brand_store.remove(domain)
+    if deleted_brand:
+        flash(f"Marka silindi: {deleted_brand[0]} -> {deleted_brand[1]}", "success")
     else:
         flash("Marka bulunamadı", "error")
     
     return redirect(url_for("manage_brands"))
 
+@app.route("/admin/verification")
+@login_required
+def verification_stats():
+    """Örneklenen yeniden doğrulamaların domain bazlı uyuşmazlık oranları"""
+    return jsonify({
+        "success": True,
+        "sample_rate": reverify_sampler.sample_rate,
+        "domains": reverify_sampler.stats()
+    })
+
+@app.route("/admin/traces")
+@login_required
+def trace_stats():
+    """Domain bazlı scrape aşama süreleri (histogram), kazanan tier'lar ve son trace'ler"""
+    return jsonify({
+        "success": True,
+        "sample_rate": tracer.sample_rate,
+        "jsonl_path": tracer.jsonl_path,
+        "stats": tracer.stats,
+        "domains": tracer.summary(request.args.get("domain")),
+        "recent": tracer.recent(request.args.get("recent", 20, type=int))
+    })
+
+@app.route("/admin/scheduler")
+@login_required
+def scheduler_stats():
+    """Domain bazlı scrape kuyruk derinlikleri, aktif scrape'ler ve token bucket durumu"""
+    return jsonify({
+        "success": True,
+        "stats": scrape_scheduler.stats,
+        "queues": scrape_scheduler.queue_depths()
+    })
+
+@app.route("/admin/circuit-breakers")
+@login_required
+def circuit_breaker_stats():
+    """Domain bazlı circuit breaker durumları (açık olanlar önce)"""
+    return jsonify({
+        "success": True,
+        "stats": circuit_breaker.stats,
+        "domains": circuit_breaker.snapshot()
+    })
+
+@app.route("/admin/browsers")
+@login_required
+def browser_pool_stats():
+    """Havuzdaki browser'lar: yaş, servis edilen sayfa, açık context, process ağacı RSS ve yenileme sayaçları"""
+    return jsonify({
+        "success": True,
+        **browser_pool.browser_stats()
+    })
+
+@app.route("/admin/debug-captures")
+@login_required
+def debug_captures():
+    """Örneklenmiş scrape sayfa kayıtları (en yeni önce)"""
+    limit = request.args.get("limit", 100, type=int)
+    return jsonify({
+        "success": True,
+        "stats": debug_capture.stats,
+        "captures": debug_capture.recent(limit)
+    })
+
+@app.route("/admin/debug-captures/<capture_id>/<kind>")
+@login_required
+def debug_capture_file(capture_id, kind):
+    """Tek kaydın HTML'i, ekran görüntüsü ya da metadata'sı"""
+    data = debug_capture.read(capture_id, kind)
+    if data is None:
+        return jsonify({"success": False, "error": "Kayıt bulunamadı"}), 404
+    # HTML düz metin olarak döner: kaydedilen sayfanın script'leri admin oturumunda çalışmasın
+    mimetypes = {"html": "text/plain; charset=utf-8", "screenshot": "image/jpeg", "meta": "application/json"}
+    return Response(data, mimetype=mimetypes[kind])
+
+@app.route("/admin/negative-cache")
+@login_required
+def negative_cache_stats():
+    """Negatif cache sayaçları ve hata sınıfına göre aktif kayıtlar"""
+    return jsonify({
+        "success": True,
+        "negative_cache": negative_cache.summary()
+    })
+
 @app.route("/dashboard")
 @login_required
 def dashboard():
@@ -5107,18 +5226,8 @@ def logout():
     return redirect(url_for("index"))
 
 def normalize_price(price_str):
-    """Fiyat string'ini normalize et - karşılaştırma için"""
-    if not price_str:
-        return None
-    # Sadece sayıları ve nokta/virgül al
-    import re
-    price_clean = re.sub(r'[^\d.,]', '', str(price_str))
-    # Virgülü noktaya çevir
-    price_clean = price_clean.replace(',', '.')
-    try:
-        return float(price_clean)
-    except:
-        return None
+    """Fiyat string'ini normalize et - karşılaştırma için ("1.299,99 TL" -> 1299.99)"""
+    return parse_price(price_str)
 
 def compare_and_fix_product(product, scraped_data):
     """Ürün verilerini karşılaştır ve hatalıysa düzelt"""
@@ -5212,6 +5321,61 @@ def compare_and_fix_product(product, scraped_data):
     
     return []
 
+def prepare_product_data(product_data, url):
+    """
+    Scrape sonucunu tek seferde doğru yazılacak Product alanlarına çevir.
+    compare_and_fix_product'ın alan seçimi ve kontrolleri insert'ten önce uygulanır, ikinci scrape gerekmez.
+    """
+    name = (product_data.get('name') or product_data.get('title') or '').strip()
+    price = product_data.get('price') or product_data.get('current_price') or ''
+    
+    # Doğrulama: güncel fiyattan büyük olmayan eski fiyat indirim değildir
+    old_price = product_data.get('old_price')
+    price_num = normalize_price(price)
+    old_price_num = normalize_price(old_price)
+    if price_num and old_price_num and old_price_num <= price_num:
+        print(f"[DEBUG] Geçersiz eski fiyat atlandı: {old_price} (fiyat: {price})")
+        old_price = None
+    
+    image = product_data.get('image') or ''
+    if image.startswith('//'):
+        image = 'https:' + image
+    
+    images = []
+    for img in [image] + list(product_data.get('images') or []):
+        if img and img.startswith('//'):
+            img = 'https:' + img
+        if img and img not in images:
+            images.append(img)
+    if not image and images:
+        image = images[0]
+    
+    return {
+        "name": name,
+        "price": price,
+        "image": image,
+        "brand": product_data.get('brand', ''),
+        "url": product_data.get('url', url),
+        "old_price": old_price,
+        "current_price": product_data.get('current_price'),
+        "discount_percentage": product_data.get('discount_percentage'),
+        "images": images,
+        "discount_info": product_data.get('discount_info'),
+    }
+
+def schedule_reverification(product, url):
+    """Örneklenen ürünleri request dışında taze scrape ile tekrar doğrula (SCRAPER_REVERIFY_SAMPLE)"""
+    def check(fresh_data):
+        current = Product.get_by_id(product.id)
+        return compare_and_fix_product(current, fresh_data) if current else []
+    
+    async def rescrape(u):
+        fresh_data = await scrape_scheduler.run(u, lambda v: scrape_product(v, use_cache=False), owner="reverify")
+        # Hata yer tutucusu kayıtlı ürünü "düzeltmemeli"
+        return None if fresh_data and fresh_data.get("error") else fresh_data
+    
+    return reverify_sampler.maybe_schedule(url, rescrape, check)
+
 def validate_url(url):
     """URL'yi validate et ve normalize et"""
     if not url:
@@ -5251,60 +5415,36 @@ def add_product():
             flash("Geçersiz URL formatı. Lütfen geçerli bir ürün linki girin.", "error")
             return redirect(url_for("dashboard"))
         
+        # Trace bu istekte açılır: scrape ve DB yazımı aynı kayıtta görünür
+        trace_handle = tracer.begin(validated_url, "add_product")
         try:
-            product_data = asyncio.run(scrape_product(validated_url))
-            if not product_data:
+            # Domain başına hız/eşzamanlılık limiti, kullanıcılar arası adil sıra
+            product_data = background_loop.run(
+                scrape_scheduler.run(validated_url, scrape_product, owner=current_user.id)
+            )
+            if not product_data or product_data.get("error"):
                 flash("Ürün bilgileri çekilemedi. Lütfen geçerli bir ürün linki olduğundan emin olun.", "error")
                 return redirect(url_for("dashboard"))
             
-            # Ürün adı kontrolü
-            product_name = product_data.get('name') or product_data.get('title', '')
-            print(f"[DEBUG] add_product - Çekilen ürün adı: {product_name}")
+            # Normalizasyon ve doğrulama insert'ten önce: ürün tek seferde doğru yazılır
+            fields = prepare_product_data(product_data, validated_url)
+            print(f"[DEBUG] add_product - Çekilen ürün adı: {fields['name']}")
             
-            if not product_name or len(product_name.strip()) == 0:
+            if not fields['name']:
                 print("[UYARI] Ürün adı boş, varsayılan isim atanıyor")
-                product_name = "Ürün Başlığı Bulunamadı"
+                fields['name'] = "Ürün Başlığı Bulunamadı"
                 # flash("Ürün adı alınamadı. Lütfen farklı bir link deneyin.", "error")
                 # return redirect(url_for("dashboard"))
             
-            # Ürünü oluştur
-            product_images = product_data.get('images', [])
-            if not product_images and product_data.get('image'):
-                product_images = [product_data.get('image')]
+            print(f"[DEBUG] Ürün oluşturuluyor: {fields['name']}, Fiyat: {fields['price']}")
             
-            print(f"[DEBUG] Ürün oluşturuluyor: {product_name}, Fiyat: {product_data.get('price')}")
+            with trace_stage("db_write"):
+                product = Product.create(current_user.id, **fields)
             
-            product = Product.create(
-                    current_user.id,
-                product_name,
-                product_data.get('price') or product_data.get('current_price', ''),
-                product_data.get('image', ''),
-                product_data.get('brand', ''),
-                product_data.get('url', validated_url),
-                old_price=product_data.get('old_price'),
-                current_price=product_data.get('current_price'),
-                discount_percentage=product_data.get('discount_percentage'),
-                images=product_images,
-                discount_info=product_data.get('discount_info')
-            )
-            
-            # Ürün eklendikten sonra tekrar kontrol et ve düzelt
             if product:
-                try:
-                    # Tekrar scraping yap (cache'den gelecek, hızlı olacak)
-                    verification_data = asyncio.run(scrape_product(validated_url))
-                    if verification_data:
-                        fixed = compare_and_fix_product(product, verification_data)
-                        if fixed:
-                            flash(f"Ürün eklendi ve {', '.join(fixed)} düzeltildi: {product.name}", "success")
-                        else:
-                            flash(f"Ürün başarıyla eklendi: {product.name}", "success")
-                    else:
-                        flash(f"Ürün başarıyla eklendi: {product.name}", "success")
-                except Exception as verify_error:
-                    # Doğrulama hatası kritik değil, ürün zaten eklendi
-                    print(f"[UYARI] Doğrulama hatası (kritik değil): {verify_error}")
-                    flash(f"Ürün başarıyla eklendi: {product.name}", "success")
+                flash(f"Ürün başarıyla eklendi: {product.name}", "success")
+                # Örneklenen ürünler arka planda taze scrape ile tekrar doğrulanır
+                schedule_reverification(product, validated_url)
             else:
                 flash("Ürün oluşturulamadı. Lütfen tekrar deneyin.", "error")
                 return redirect(url_for("dashboard"))
@@ -5318,6 +5458,8 @@ def add_product():
             import traceback
             traceback.print_exc()
             return redirect(url_for("dashboard"))
+        finally:
+            tracer.end(trace_handle)
     
     elif bulk_urls:
         urls = [url.strip() for url in bulk_urls.split('\n') if url.strip()]
@@ -5326,7 +5468,6 @@ def add_product():
             return redirect(url_for("dashboard"))
         
         added_count = 0
-        fixed_count = 0
         failed_count = 0
         max_urls = 50  # Güvenlik: Maksimum URL sayısı
         
@@ -5334,58 +5475,40 @@ def add_product():
             flash(f"Çok fazla URL. Maksimum {max_urls} URL ekleyebilirsiniz. İlk {max_urls} URL işlenecek.", "warning")
             urls = urls[:max_urls]
         
+        valid_urls = []
         for url in urls:
             validated_url = validate_url(url)
             if not validated_url:
                 failed_count += 1
                 print(f"[UYARI] Geçersiz URL atlandı: {url}")
                 continue
-            
+            valid_urls.append(validated_url)
+        
+        # Tüm URL'ler tek event loop'ta eşzamanlı çekilir (global + domain başına limit);
+        # her sonuç tamamlandığı anda kaydedilir
+        for validated_url, product_data, scrape_error in scrape_scheduler.run_batch(valid_urls, scrape_product, owner=current_user.id):
             try:
-                product_data = asyncio.run(scrape_product(validated_url))
-                if not product_data:
+                if scrape_error:
+                    raise scrape_error
+                if not product_data or product_data.get("error"):
                     failed_count += 1
                     continue
                 
-                product_name = product_data.get('name') or product_data.get('title', '')
-                if not product_name or len(product_name.strip()) == 0:
+                fields = prepare_product_data(product_data, validated_url)
+                if not fields['name']:
                     failed_count += 1
                     continue
                 
-                product_images = product_data.get('images', [])
-                if not product_images and product_data.get('image'):
-                    product_images = [product_data.get('image')]
-                
-                product = Product.create(
-                        current_user.id,
-                    product_name,
-                    product_data.get('price') or product_data.get('current_price', ''),
-                    product_data.get('image', ''),
-                    product_data.get('brand', ''),
-                    product_data.get('url', validated_url),
-                    old_price=product_data.get('old_price'),
-                    current_price=product_data.get('current_price'),
-                    discount_percentage=product_data.get('discount_percentage'),
-                    images=product_images,
-                    discount_info=product_data.get('discount_info')
-                )
+                write_started = time.perf_counter()
+                product = Product.create(current_user.id, **fields)
+                tracer.observe(validated_url, "db_write", time.perf_counter() - write_started)
                 
                 if product:
-                    try:
-                        # Kontrol ve düzeltme
-                        verification_data = asyncio.run(scrape_product(validated_url))
-                        if verification_data:
-                            fixed = compare_and_fix_product(product, verification_data)
-                            if fixed:
-                                fixed_count += 1
-                        added_count += 1
-                    except Exception as verify_error:
-                        # Doğrulama hatası kritik değil
-                        print(f"[UYARI] Doğrulama hatası (kritik değil) ({validated_url}): {verify_error}")
-                        added_count += 1
+                    added_count += 1
+                    schedule_reverification(product, validated_url)
                 else:
                     failed_count += 1
-            except asyncio.TimeoutError:
+            except (asyncio.TimeoutError, TimeoutError):
                 failed_count += 1
                 print(f"[HATA] Zaman aşımı ({validated_url})")
             except Exception as e:
@@ -5395,8 +5518,6 @@ def add_product():
         # Sonuç mesajı
         if added_count > 0:
             message_parts = [f"{added_count} ürün eklendi"]
-            if fixed_count > 0:
-                message_parts.append(f"{fixed_count} ürün düzeltildi")
             if failed_count > 0:
                 message_parts.append(f"{failed_count} ürün eklenemedi")
             flash(", ".join(message_parts), "success" if failed_count == 0 else "warning")
@@ -5679,7 +5800,6 @@ def get_price_history(tracking_id):
     
     # Veriyi Chart.js için formatla
     labels = []
-    prices = []
     
     for price, recorded_at in history_data:
         # Tarihi formatla
@@ -5689,7 +5809,9 @@ def get_price_history(tracking_id):
             dt = recorded_at
         
         labels.append(dt.strftime('%d.%m'))
-        prices.append(float(price.replace('₺', '').replace('TL', '').replace(',', '').strip()))
+    
+    # Tüm fiyatlar tek seferde parse edilir
+    prices = parse_many([price for price, _ in history_data])
     
     return jsonify({
         'labels': labels,
@@ -5761,11 +5883,13 @@ def update_prices():
     updated_count = 0
     notifications = []
     
-    for item in tracking_items:
+    # Takip edilen fiyatlar tek seferde parse edilir
+    current_prices = parse_many([item[3] for item in tracking_items], 0.0)
+    original_prices = parse_many([item[5] for item in tracking_items], 0.0)
+    alert_prices = parse_many([item[7] for item in tracking_items])
+    
+    for item, current_price, original_price, alert_price in zip(tracking_items, current_prices, original_prices, alert_prices):
         tracking_id = item[0]
-        current_price = float(item[3] or 0)
-        original_price = float(item[5] or 0)
-        alert_price = float(item[7] or 0) if item[7] else None
         
         # Simüle edilmiş fiyat değişimi (-%10 ile +%5 arası)
         price_change = random.uniform(-0.1, 0.05)
@@ -5912,11 +6036,7 @@ def add_product_to_tracking(product_id):
             return jsonify({"success": False, "message": "Bu ürün zaten takip ediliyor"})
         
         # Fiyatı sayısal değere çevir
-        try:
-            price_str = product.price.replace('₺', '').replace(',', '').strip()
-            current_price = float(price_str)
-        except:
-            current_price = 0.0
+        current_price = parse_price(product.price, 0.0)
         
         # Fiyat takibine ekle
         tracking_id = PriceTracking.create(
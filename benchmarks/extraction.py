@@ -0,0 +1,224 @@
+"""
+Extraction Benchmark
+Runs every extraction strategy over the saved-page corpus and reports speed, memory and field accuracy
+
+    python benchmarks/extraction.py                      # writes benchmarks/results/extraction-<commit>.json
+    python benchmarks/extraction.py --repeat 50 --baseline benchmarks/results/extraction-abc1234.json --check
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lxml import etree
+
+from scrapers.config import get_site_config
+from scrapers.html_extractor import html_extractor
+from scrapers.price_parser import parse_price
+from universal_scraper import universal_scraper
+
+CORPUS_DIR = os.path.join(ROOT, 'benchmarks', 'corpus')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# name -> (use the URL's site config, tiers passed to PageCandidates.resolve)
+STRATEGIES = {
+    "site_config": (True, None),
+    "universal": (False, None),
+    "jsonld": (False, ("jsonld",)),
+    "regex": (False, ("regex", "fallback")),
+}
+
+FIELDS = ("title", "price", "old_price", "image")
+
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    """(manifest version, [document dicts with raw "html" bytes])"""
+    with open(os.path.join(corpus_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    documents = []
+    for document in manifest["documents"]:
+        with open(os.path.join(corpus_dir, document["file"]), 'rb') as f:
+            documents.append(dict(document, html=f.read()))
+    return manifest["version"], documents
+
+
+def extract(document, strategy):
+    """One full static extraction (parse + resolve) with a strategy"""
+    use_site_config, tiers = STRATEGIES[strategy]
+    doc = html_extractor.parse(document["html"])
+    site_config = get_site_config(document["url"]) if use_site_config else None
+    return html_extractor.candidates(doc, document["url"], site_config).resolve(tiers)
+
+
+def field_matches(field, actual, expected):
+    if field == "title":
+        return universal_scraper._clean_title(expected) == actual
+    if field in ("price", "old_price"):
+        return actual is not None and parse_price(actual) == parse_price(expected)
+    return actual == expected
+
+
+def percentiles(samples):
+    """p50/p90/p99/max of a list of seconds, in milliseconds"""
+    ordered = sorted(samples)
+
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {"p50": at(0.50), "p90": at(0.90), "p99": at(0.99), "max": round(ordered[-1] * 1000, 3)}
+
+
+def run_strategy(documents, strategy, repeat):
+    # Warm-up: selector compilation and plan caches are per process, not per document
+    results = {document["id"]: extract(document, strategy) for document in documents}
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for document in documents:
+            t0 = time.perf_counter()
+            extract(document, strategy)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    # Python-side peak of one pass (libxml2's own allocations are only in the process max RSS)
+    tracemalloc.start()
+    for document in documents:
+        extract(document, strategy)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    accuracy, misses = {}, []
+    for field in FIELDS:
+        checked = [d for d in documents if field in d["expected"]]
+        if not checked:
+            continue
+        hits = 0
+        for document in checked:
+            actual = results[document["id"]][field]
+            if field_matches(field, actual, document["expected"][field]):
+                hits += 1
+            else:
+                misses.append({"id": document["id"], "field": field, "actual": actual,
+                               "expected": document["expected"][field]})
+        accuracy[field] = round(hits / len(checked), 4)
+
+    return {
+        "docs_per_sec": round(len(latencies) / elapsed, 1),
+        "latency_ms": percentiles(latencies),
+        "per_document_ms": {
+            document["id"]: round(sum(latencies[i::len(documents)]) / repeat * 1000, 3)
+            for i, document in enumerate(documents)
+        },
+        "peak_traced_kb": round(peak / 1024, 1),
+        "accuracy": accuracy,
+        "sources": {document_id: data["sources"] for document_id, data in results.items()},
+        "misses": misses,
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(repeat=20, strategies=None, corpus_dir=CORPUS_DIR):
+    """Benchmark result dict (what gets written as JSON)"""
+    version, documents = load_corpus(corpus_dir)
+    strategies = strategies or list(STRATEGIES)
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "lxml": '.'.join(map(str, etree.LXML_VERSION)),
+            "machine": platform.machine(),
+            "corpus_version": version,
+            "documents": len(documents),
+            "corpus_bytes": sum(len(d["html"]) for d in documents),
+            "repeat": repeat,
+        },
+        "strategies": {name: run_strategy(documents, name, repeat) for name in strategies},
+    }
+    # ru_maxrss is KB on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["meta"]["max_rss_kb"] = max_rss // 1024 if sys.platform == 'darwin' else max_rss
+    return result
+
+
+def compare(result, baseline, tolerance=0.15):
+    """Regressions against a baseline result: slower docs/sec (beyond tolerance) or lower accuracy"""
+    regressions = []
+    for name, current in result["strategies"].items():
+        before = baseline.get("strategies", {}).get(name)
+        if not before:
+            continue
+        if current["docs_per_sec"] < before["docs_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: docs/sec {before['docs_per_sec']} -> {current['docs_per_sec']}")
+        for field, value in current["accuracy"].items():
+            if value < before.get("accuracy", {}).get(field, 0):
+                regressions.append(f"{name}: {field} accuracy {before['accuracy'][field]} -> {value}")
+    return regressions
+
+
+def print_report(result):
+    meta = result["meta"]
+    print(f"Corpus v{meta['corpus_version']}: {meta['documents']} documents, "
+          f"{meta['corpus_bytes'] // 1024} KB, x{meta['repeat']} (commit {meta['commit']})")
+    print(f"{'strategy':<12} {'docs/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'peak KB':>9}  accuracy")
+    for name, data in result["strategies"].items():
+        latency = data["latency_ms"]
+        accuracy = ' '.join(f"{field}={value:.2f}" for field, value in data["accuracy"].items())
+        print(f"{name:<12} {data['docs_per_sec']:>9} {latency['p50']:>8} {latency['p90']:>8} "
+              f"{latency['p99']:>8} {data['peak_traced_kb']:>9}  {accuracy}")
+    print(f"max RSS: {meta['max_rss_kb']} KB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Static extraction benchmark over the saved-page corpus")
+    parser.add_argument('--repeat', type=int, default=20, help="timed passes over the corpus per strategy")
+    parser.add_argument('--strategy', action='append', choices=list(STRATEGIES), help="run only these strategies")
+    parser.add_argument('--corpus', default=CORPUS_DIR)
+    parser.add_argument('--output', help="result JSON path (default: benchmarks/results/extraction-<commit>.json)")
+    parser.add_argument('--baseline', help="earlier result JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="allowed docs/sec drop vs. the baseline")
+    parser.add_argument('--check', action='store_true', help="exit with status 1 on regressions")
+    args = parser.parse_args(argv)
+
+    result = run(args.repeat, args.strategy, args.corpus)
+    print_report(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"extraction-{result['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"Sonuçlar kaydedildi: {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"[REGRESYON] {regression}")
+        if regressions and args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""
+Gunicorn hooks
+Loaded automatically from the working directory; command-line flags still apply
+"""
+
+
+def worker_exit(server, worker):
+    """Close the worker's warm Chromium pool, HTTP sessions and background loop before exit"""
+    try:
+        from scrapers.brand_store import brand_store
+
+        # Batched automatic brands not yet written
+        brand_store.flush()
+    except Exception as e:
+        server.log.warning(f"Brand store flush failed: {e}")
+
+    try:
+        from scrapers.browser_pool import browser_pool
+        from scrapers.event_loop import background_loop
+        from scrapers.http_fetcher import http_fetcher
+
+        browser_pool.shutdown()
+        if background_loop.is_running():
+            background_loop.run(http_fetcher.close(), timeout=5)
+        background_loop.shutdown()
+    except Exception as e:
+        server.log.warning(f"Scraper shutdown failed: {e}")
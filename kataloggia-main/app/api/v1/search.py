@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app.services.product_service import ProductService
 from app.services.collection_service import CollectionService
+from scrapers.price_parser import parse_many
 
 bp = Blueprint('search', __name__, url_prefix='/api/v1/search')
 product_service = ProductService()
@@ -30,9 +31,15 @@ def search_products():
         # Get all user products
         products = product_service.get_user_products(current_user.id, use_cache=False)
         
+        # Price filter: parse all prices in one pass
+        if min_price or max_price:
+            prices = parse_many([product.price for product in products])
+        else:
+            prices = [None] * len(products)
+        
         # Filter products
         results = []
-        for product in products:
+        for product, price_num in zip(products, prices):
             match = True
             
             # Text search
@@ -46,15 +53,13 @@ def search_products():
                 match = False
             
             # Price filter
-            if min_price or max_price:
+            if price_num is not None:
                 try:
-                    price_num = float(str(product.price).replace('₺', '').replace('TL', '').replace(',', '').strip())
-                    
                     if min_price and price_num < float(min_price):
                         match = False
                     if max_price and price_num > float(max_price):
                         match = False
-                except:
+                except ValueError:
                     pass
             
             if match:
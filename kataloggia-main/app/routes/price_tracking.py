@@ -5,6 +5,7 @@ from flask import Blueprint, jsonify, request, render_template
 from flask_login import login_required, current_user
 from app.services.price_tracking_service import PriceTrackingService
 from app.models.price_tracking import PriceTracking
+from scrapers.price_parser import parse_price
 
 bp = Blueprint('price_tracking', __name__, url_prefix='/price-tracking')
 price_tracking_service = PriceTrackingService()
@@ -119,7 +120,7 @@ def get_price_history(tracking_id):
         import random
         from datetime import datetime, timedelta
         
-        current_price = float(str(tracking[3]).replace(',', '.')) if tracking[3] else 0
+        current_price = parse_price(tracking[3], 0)
         
         labels = []
         prices = []
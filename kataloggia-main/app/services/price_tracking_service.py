@@ -2,8 +2,13 @@
 Price Tracking Service
 Background price checking service
 """
+from concurrent.futures import ThreadPoolExecutor
+
 from app.models.price_tracking import PriceTracking
 from app.services.scraping_service import ScrapingService
+from scrapers.config import SCHEDULER_CONFIG
+from scrapers.price_parser import parse_price
+from scrapers.scheduler import scrape_owner
 
 class PriceTrackingService:
     """Price tracking business logic"""
@@ -12,47 +17,8 @@ class PriceTrackingService:
         self.scraping_service = ScrapingService()
 
     def _parse_price(self, value):
-        """Fiyat string'ini güvenli şekilde floata çevirir."""
-        if value is None:
-            return None
-
-        import re
-
-        # Her şeyi stringe çevir
-        s = str(value)
-
-        # Sadece sayı, nokta ve virgül kalsın
-        s = re.sub(r"[^\d,\.]", "", s)
-
-        # Hiç rakam yoksa boş say
-        if not re.search(r"\d", s):
-            return None
-
-        # Örnek formatlar:
-        #  - "1.299,99" (TR)
-        #  - "1,299.99" (EN)
-        #  - "1299,99"
-        #  - "1299.99"
-        #  - "1 299,99 TL" vs.
-
-        if "," in s and "." in s:
-            # İkisi de varsa: varsayılan Türk formatı: 1.299,99 -> 1299.99
-            if s.rfind(",") > s.rfind("."):
-                s = s.replace(".", "").replace(",", ".")
-            else:
-                # Çok istisnai durum, virgülleri at
-                s = s.replace(",", "")
-        elif "," in s and "." not in s:
-            # Tek virgül: 1299,99 -> 1299.99 gibi
-            s = s.replace(",", ".")
-        else:
-            # Sadece nokta veya düz sayı: 1,299.99 gibi durumlarda virgülü sil
-            s = s.replace(",", "")
-
-        try:
-            return float(s)
-        except ValueError:
-            return None
+        """Fiyat string'ini güvenli şekilde floata çevirir ("1.299,99 TL" -> 1299.99)."""
+        return parse_price(value)
     
     def check_all_prices(self):
         """Tüm takip edilen ürünlerin fiyatlarını kontrol et"""
@@ -66,9 +32,14 @@ class PriceTrackingService:
                 'notifications': []
             }
             
-            for tracking in trackings:
+            # Kontroller eşzamanlı; her scrape domain limitlerinden (scrape_scheduler) geçer,
+            # böylece çok takip edilen tek bir mağaza art arda istek yağmuruna tutulmaz
+            with ThreadPoolExecutor(max_workers=SCHEDULER_CONFIG["price_check_workers"]) as executor:
+                checks = [(tracking, executor.submit(self._check_for_owner, tracking)) for tracking in trackings]
+            
+            for tracking, check in checks:
                 try:
-                    result = self.check_product_price(tracking.product_id)
+                    result = check.result()
                     results['checked'] += 1
                     
                     if result.get('price_changed'):
@@ -88,6 +59,11 @@ class PriceTrackingService:
             print(f"Error in check_all_prices: {e}")
             return {'checked': 0, 'updated': 0, 'notifications': []}
     
+    def _check_for_owner(self, tracking):
+        """Kullanıcılar arası adil sıra: her kontrol takibin sahibi adına kuyruğa girer"""
+        with scrape_owner(tracking.user_id):
+            return self.check_product_price(tracking.product_id)
+    
     def check_product_price(self, product_id):
         """Belirli bir ürünün fiyatını kontrol et"""
         try:
@@ -14,6 +14,11 @@ from app.services.cache_service import cache_service, cached
 class ScrapingService:
     """Scraping business logic with caching"""
 
+    # Tüm instance'lar (API, Celery görevleri, fiyat takibi) aynı in-flight kaydını paylaşır
+    _flight = None
+    _tracer = None
+    _scheduler = None
+
     def __init__(self):
         # Import scraper from project root
         parent_dir = os.path.join(os.path.dirname(__file__), '../../..')
@@ -21,9 +26,43 @@ class ScrapingService:
         if parent_dir not in sys.path:
             sys.path.insert(0, parent_dir)
 
+        if ScrapingService._flight is None:
+            try:
+                from scrapers.single_flight import SingleFlight
+                ScrapingService._flight = SingleFlight("service-scrape")
+            except ImportError as e:
+                print(f"[WARNING] Single-flight kullanılamıyor, her istek ayrı çekilecek: {e}")
+
+        if ScrapingService._scheduler is None:
+            try:
+                from scrapers.scheduler import scrape_scheduler
+                ScrapingService._scheduler = scrape_scheduler
+            except ImportError as e:
+                print(f"[WARNING] Scrape scheduler kullanılamıyor, domain limitleri uygulanmayacak: {e}")
+
+        if ScrapingService._tracer is None:
+            try:
+                from scrapers.tracing import tracer
+                ScrapingService._tracer = tracer
+            except ImportError as e:
+                print(f"[WARNING] Scrape tracing kullanılamıyor: {e}")
+
     @cached(expiration=3600, key_prefix='scrape')
-    def scrape_product(self, url):
+    def scrape_product(self, url, use_negative_cache=True):
         """Tek bir ürünü çek (cached) - güvenli ve filtreli"""
+        if self._tracer is None:
+            return self._scrape_product(url, use_negative_cache)
+
+        # Servis çağrısı trace'in sahibi; scraper.scrape_product / fetch_data aynı trace'e katılır
+        handle = self._tracer.begin(url, "service")
+        result = None
+        try:
+            result = self._scrape_product(url, use_negative_cache)
+        finally:
+            self._tracer.end(handle, "ok" if result else "empty")
+        return result
+
+    def _scrape_product(self, url, use_negative_cache=True):
         try:
             # clear_scraping_cache ile uyumlu manual cache key
             cache_key = f"scrape:{hashlib.md5(url.encode()).hexdigest()}"
@@ -41,103 +80,81 @@ class ScrapingService:
             # 2) scraper.py içindeki scrape_product fonksiyonunu çağır
             try:
                 from scraper import scrape_product as base_scrape
+                from scrapers.price_parser import format_price
+                from scrapers.tracing import trace_mark
+                from scrapers.circuit_breaker import circuit_breaker, CircuitOpenError, is_block_title
+                from scrapers.negative_cache import negative_cache, classify_failure, BLOCK, PARSE_MISS, ERROR
+                from scrapers.scheduler import QueueTimeout
             except ImportError as e:
                 print(f"[ERROR] Could not import scraper: {e}")
                 return None
 
-            result = base_scrape(url)
+            # Yakın zamanda başarısız olan URL: TTL dolana kadar tekrar denenmez
+            # (circuit breaker'dan önce: half-open deneme hakkını sonuç bildirmeden harcamasın)
+            failure = negative_cache.get(url, bypass=not use_negative_cache)
+            if failure:
+                print(f"[DEBUG] Negative cache hit ({failure['failure']}, {failure['retry_after']}s left): {url}")
+                return None
+
+            # Engelleyen / sürekli hata veren mağaza: timeout'ları beklemeden son başarılı veri ya da None
+            try:
+                circuit_breaker.check(url)
+            except CircuitOpenError as e:
+                print(f"[WARNING] {e}")
+                return e.last_good
+
+            def failed(failure, message):
+                print(message)
+                negative_cache.record_failure(url, failure)
+                circuit_breaker.record_failure(url, failure)
+                return None
+
+            # Aynı URL başka bir istek/worker tarafından çekiliyorsa onun sonucunu bekle
+            scrape = base_scrape
+            if self._flight is not None:
+                scrape = lambda u: self._flight.run(u, lambda: base_scrape(u))
+            # Domain başına token bucket / eşzamanlılık limiti (tüm servis ve Celery trafiği)
+            try:
+                if self._scheduler is not None:
+                    result = self._scheduler.call(url, scrape)
+                else:
+                    result = scrape(url)
+            except QueueTimeout as e:
+                # Yerel kuyruk yoğunluğu: mağazanın hatası değil, negative cache / breaker'a yazılmaz
+                print(f"[WARNING] {e}")
+                circuit_breaker.release_probe(url)
+                return None
+            except Exception as e:
+                return failed(classify_failure(e), f"[ERROR] Scraping error: {e}")
             print(f"[DEBUG] Raw scraping result: {result}")
+            trace_mark("postprocess")
 
             if not result:
-                print(f"[ERROR] Scraping returned no result for: {url}")
-                return None
+                return failed(ERROR, f"[ERROR] Scraping returned no result for: {url}")
 
             # 3) Title kontrolü
             raw_title = (result.get("title") or "").strip()
             if not raw_title:
-                print(f"[ERROR] Product title not found in result: {result}")
-                return None
+                return failed(PARSE_MISS, f"[ERROR] Product title not found in result: {result}")
 
-            upper_title = raw_title.upper()
-            if ("ACCESS DENIED" in upper_title or
-                "FORBIDDEN" in upper_title or
-                "BOT DETECTED" in upper_title):
-                print(f"[ERROR] Access denied / bot page detected for: {url}")
-                return None
+            if is_block_title(raw_title):
+                return failed(BLOCK, f"[ERROR] Access denied / bot page detected for: {url}")
 
             # 4) Fiyat
             raw_price = result.get("price")
             if not raw_price or not str(raw_price).strip():
-                print(f"[ERROR] Price not found in result: {result}")
-                return None
+                return failed(PARSE_MISS, f"[ERROR] Price not found in result: {result}")
 
             price_clean = str(raw_price).strip()
-            price = f"{price_clean} TL" # Default fallback
-
-            try:
-                import re
-                # Sadece sayı ve virgül/nokta kalsın
-                # Örnek: 1.299,99 -> 1299.99
-                # Örnek: 1,299.00 -> 1299.00
-                # Örnek: 500 -> 500.00
-                
-                # Para birimi sembollerini temizle
-                price_str = re.sub(r"[^\d,\.]", "", price_clean)
-
-                if not price_str:
-                    print(f"[ERROR] Price string empty after cleaning: {price_clean}")
-                    return None
-
-                # Basit mantık:
-                # Eğer hem nokta hem virgül varsa: sondaki ondalıktır, ortadaki binliktir
-                # Eğer sadece virgül varsa: genelde ondalıktır (TR), ama bazen binliktir (US)
-                # Eğer sadece nokta varsa: genelde binliktir (TR), ama bazen ondalıktır (US)
-                
-                # Bizim scraper genelde düzgün formatta döndürmeye çalışıyor ama garanti değil.
-                # Standartlaştırma:
-                if "," in price_str and "." in price_str:
-                    if price_str.rfind(",") > price_str.rfind("."):
-                        # 1.299,99 formatı (TR/EU) -> Noktaları sil, virgülü nokta yap
-                        price_num = float(price_str.replace(".", "").replace(",", "."))
-                    else:
-                        # 1,299.99 formatı (US) -> Virgülleri sil
-                        price_num = float(price_str.replace(",", ""))
-                elif "," in price_str:
-                    # Sadece virgül var: 129,90 veya 1,299
-                    # Genelde 2 hane varsa ondalıktır
-                    parts = price_str.split(",")
-                    if len(parts[-1]) == 2:
-                        # 129,90 -> 129.90
-                        price_num = float(price_str.replace(",", "."))
-                    else:
-                        # 1,299 -> 1299 (Binlik ayracı varsayımı riskli ama genelde ondalık nokta ile gelir)
-                        # TR sitelerinde genelde virgül ondalıktır.
-                        price_num = float(price_str.replace(",", "."))
-                elif "." in price_str:
-                    # Sadece nokta var: 1.299 veya 12.99
-                    # 3 hane varsa binliktir: 1.299
-                    parts = price_str.split(".")
-                    if len(parts[-1]) == 3:
-                         price_num = float(price_str.replace(".", ""))
-                    else:
-                         price_num = float(price_str)
-                else:
-                    price_num = float(price_str)
-
-                # Türk Lirası formatla
-                if price_num >= 1000:
-                    price = f"{price_num:,.2f} TL".replace(",", "X").replace(".", ",").replace("X", ".")
-                else:
-                    price = f"{price_num:.2f} TL".replace(".", ",")
-            except Exception as e:
-                print(f"[DEBUG] Price formatting error: {e}, using raw: {price_clean}")
-                price = f"{price_clean} TL"
+            # 1.299,99 / 1,299.99 / 1.299 / 129,90 -> "1.299,99 TL" (tek ortak parser)
+            price = format_price(price_clean)
+            if price is None:
+                return failed(PARSE_MISS, f"[ERROR] No amount found in price: {price_clean}")
 
             # 5) Görsel zorunlu
             image = result.get("image")
             if not image or not str(image).strip():
-                print(f"[ERROR] Image not found in result: {result}")
-                return None
+                return failed(PARSE_MISS, f"[ERROR] Image not found in result: {result}")
 
             # 6) Marka yoksa domain'den üret
             brand = result.get("brand")
@@ -157,6 +174,8 @@ class ScrapingService:
 
             # Manual cache + decorator cache beraber çalışacak, sorun değil
             cache_service.set(cache_key, formatted_result, expiration=3600)
+            circuit_breaker.record_success(url, formatted_result)
+            negative_cache.record_success(url)
             print(
                 f"[DEBUG] Scraping successful - Name: {formatted_result.get('name')}, "
                 f"Price: {formatted_result.get('price')}, Brand: {formatted_result.get('brand')}"
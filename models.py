@@ -3,6 +3,7 @@ import uuid
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from scrapers.price_parser import parse_price
 
 def init_db():
     """Veritabanını başlat"""
@@ -728,12 +729,9 @@ class PriceTracking:
             original_price = current_data[1]
             
             # Fiyat değişimini hesapla
-            try:
-                current_num = float(str(current_price).replace('₺', '').replace('TL', '').replace(',', '').strip())
-                new_num = float(str(new_price).replace('₺', '').replace('TL', '').replace(',', '').strip())
-                price_change = new_num - current_num
-            except:
-                price_change = 0
+            current_num = parse_price(current_price)
+            new_num = parse_price(new_price)
+            price_change = new_num - current_num if current_num is not None and new_num is not None else 0
             
             # Fiyat takibini güncelle
             cursor.execute('''
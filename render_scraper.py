@@ -4,12 +4,22 @@ Render.com için optimize edilmiş scraper wrapper
 Async/await sorunlarını çözer ve Render'da çalışacak şekilde ayarlanmıştır
 """
 
-import asyncio
 import logging
 import os
 from typing import Dict, Any, Optional
 from site_specific_scrapers import SiteSpecificScrapers
 from advanced_site_scrapers import AdvancedSiteScrapers
+from scrapers.event_loop import background_loop
+from scrapers.scheduler import scrape_scheduler
+from scrapers.host_registry import host_registry
+
+# Advanced/site-specific scraper'ların desteklediği siteler
+SUPPORTED_SITES = [
+    "beymen.com", "ellesse.com.tr", "beyyoglu.com", "ninewest.com.tr",
+    "levis.com.tr", "dockers.com.tr", "sarar.com", "salomon.com.tr",
+    "abercrombie.com", "loft.com.tr", "ucla.com.tr", "yargici.com"
+]
+host_registry.register("render_site", [(site, site) for site in SUPPORTED_SITES])
 
 # Render.com için logging ayarları
 logging.basicConfig(
@@ -33,7 +43,6 @@ class RenderScraper:
             '--disable-dev-shm-usage',
             '--disable-accelerated-2d-canvas',
             '--no-first-run',
-            '--no-zygote',
             '--disable-gpu',
             '--disable-background-timer-throttling',
             '--disable-backgrounding-occluded-windows',
@@ -69,29 +78,30 @@ class RenderScraper:
         Sync wrapper for async scraping (Flask compatibility)
         """
         try:
-            # Render.com'da event loop sorunlarını çözmek için
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            return loop.run_until_complete(self.scrape_product_async(url, use_advanced))
+            # Browser havuzunun event loop'unda, domain limitleriyle çalıştır
+            return background_loop.run(
+                scrape_scheduler.run(url, lambda u: self.scrape_product_async(u, use_advanced))
+            )
         except Exception as e:
             logging.error(f"Sync scraping hatası: {e}")
             return {"error": str(e), "url": url}
     
     def scrape_multiple_products_sync(self, urls: list, use_advanced: bool = True) -> list:
         """
-        Birden fazla ürünü sync olarak scrape eder
+        Birden fazla ürünü eşzamanlı scrape eder; hız limiti domain başına scheduler'da
+        (farklı sitelerdeki URL'ler birbirini beklemez). Sonuçlar giriş sırasıyla döner.
         """
+        scraped = scrape_scheduler.run_batch(urls, lambda u: self.scrape_product_async(u, use_advanced))
+        by_url = {url: (result, error) for url, result, error in scraped}
         results = []
         
         for i, url in enumerate(urls, 1):
             logging.info(f"[{i}/{len(urls)}] Scraping: {url}")
             
             try:
-                result = self.scrape_product_sync(url, use_advanced)
+                result, error = by_url[url]
+                if error is not None:
+                    raise error
                 results.append(result)
                 
                 if "error" in result:
@@ -105,30 +115,16 @@ class RenderScraper:
                     "error": str(e),
                     "url": url
                 })
-            
-            # Rate limiting
-            import time
-            time.sleep(1)
         
         return results
     
     def is_site_supported(self, url: str) -> bool:
         """URL'nin desteklenen bir site olup olmadığını kontrol eder"""
-        domain = self._extract_domain(url)
-        supported_sites = [
-            "beymen.com", "ellesse.com.tr", "beyyoglu.com", "ninewest.com.tr",
-            "levis.com.tr", "dockers.com.tr", "sarar.com", "salomon.com.tr",
-            "abercrombie.com", "loft.com.tr", "ucla.com.tr", "yargici.com"
-        ]
-        return domain in supported_sites
+        return host_registry.lookup("render_site", url) is not None
     
     def get_supported_sites(self) -> list:
         """Desteklenen site listesini döndürür"""
-        return [
-            "beymen.com", "ellesse.com.tr", "beyyoglu.com", "ninewest.com.tr",
-            "levis.com.tr", "dockers.com.tr", "sarar.com", "salomon.com.tr",
-            "abercrombie.com", "loft.com.tr", "ucla.com.tr", "yargici.com"
-        ]
+        return list(SUPPORTED_SITES)
 
 # Global scraper instance
 render_scraper = RenderScraper()
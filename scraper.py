@@ -1,9 +1,19 @@
-import asyncio
 import logging
 import re
 import json
 from urllib.parse import urlparse
-from playwright.async_api import async_playwright
+from scrapers.browser_pool import browser_pool
+from scrapers.event_loop import background_loop, DEFAULT_RUN_TIMEOUT
+from scrapers.request_blocking import block_requests
+from scrapers.http_fetcher import fast_scrape
+from scrapers.readiness import wait_until_ready
+from scrapers.host_registry import host_registry
+from scrapers.tracing import tracer, trace_claims, trace_mark, trace_stage
+from scrapers.strategy_stats import strategy_stats
+from scrapers.circuit_breaker import ScrapeBlocked, is_block_status
+from scrapers.retry_policy import retry_policy
+from scrapers.node_bridge import node_bridge
+from scrapers.image_probe import image_prober
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -184,56 +194,113 @@ async def extract_teknosa_data(page):
         return null;
     }''')
 
+# Host suffix index ("amazon" gibi TLD'siz anahtarlar her uzantıda eşleşir)
+host_registry.register("selectors", SITE_SELECTORS)
+
 def get_site_selectors(url):
-    domain = urlparse(url).netloc.lower()
-    for site, selectors in SITE_SELECTORS.items():
-        if site in domain:
-            return selectors
-    return None
+    return host_registry.lookup("selectors", url)
 
 try:
     from playwright_stealth import Stealth
 except ImportError:
     Stealth = None
 
+# fetch_data için browser context ayarları (browser_pool üzerinden açılır)
+FETCH_CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "locale": "tr-TR",
+    "timezone_id": "Europe/Istanbul",
+    "extra_http_headers": {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+        "Accept-Language": "tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7",
+        "Referer": "https://www.google.com/",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+        "Sec-Ch-Ua-Mobile": "?0",
+        "Sec-Ch-Ua-Platform": '"Windows"',
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "cross-site",
+        "Sec-Fetch-User": "?1"
+    }
+}
+
+def _node_image(image):
+    """JSON-LD image alanı string, liste ya da ImageObject olabilir"""
+    if isinstance(image, list):
+        image = image[0] if image else None
+    if isinstance(image, dict):
+        image = image.get("url") or image.get("contentUrl")
+    return image
+
+async def fetch_from_node(url):
+    """unified_scraper worker'ından sonuç (fetch_data formatında); başlık/fiyat yoksa ya da worker hata verirse None"""
+    try:
+        with trace_stage("node_worker"):
+            data = await node_bridge.scrape_async(url)
+    except Exception as e:
+        logging.warning(f"Node worker failed, falling back to Playwright: {e}")
+        return None
+    if not data.get("name") or data.get("price") in (None, ""):
+        return None
+    original_price = data.get("originalPrice")
+    return {
+        "title": str(data["name"]).strip().upper(),
+        "price": str(data["price"]).strip(),
+        "original_price": str(original_price).strip() if original_price else None,
+        "discount_message": None,
+        "image": _node_image(data.get("image")),
+        "brand": data.get("brand") or urlparse(url).netloc.replace("www.", "").split(".")[0].upper(),
+        "url": url
+    }
+
+@tracer.traced("scraper")
 async def fetch_data(url):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=[
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-infobars',
-                '--window-position=0,0',
-                '--ignore-certificate-errors',
-                '--ignore-certificate-errors-spki-list',
-                '--disable-accelerated-2d-canvas',
-                '--no-zygote',
-                '--no-first-run',
-                '--disable-gpu',
-                '--disable-blink-features=AutomationControlled'
-            ]
-        )
-        context = await browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            locale="tr-TR",
-            timezone_id="Europe/Istanbul",
-            extra_http_headers={
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-                "Accept-Language": "tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Referer": "https://www.google.com/",
-                "Upgrade-Insecure-Requests": "1",
-                "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                "Sec-Ch-Ua-Mobile": "?0",
-                "Sec-Ch-Ua-Platform": '"Windows"',
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "cross-site",
-                "Sec-Fetch-User": "?1"
-            }
-        )
-        
+    """Tek deneme; hata / engelleme durumunda None"""
+    try:
+        return await fetch_attempt(url)
+    except Exception as e:
+        logging.error(f"Error scraping {url}: {e}")
+        return None
+
+async def fetch_attempt(url, strategy="default"):
+    """
+    Tek scrape denemesi; engelleme ScrapeBlocked, timeout/diğer hatalar exception olarak yükselir.
+    "thorough" (retry escalation): HTTP fast path ve istek engelleme atlanır, her sitede networkidle beklenir.
+    """
+    thorough = strategy == "thorough"
+
+    # Nike / Bershka / Decathlon: sıcak unified_scraper worker'ı (SCRAPER_NODE_WORKERS), olmazsa Playwright
+    if not thorough and node_bridge.routes(url):
+        node_data = await fetch_from_node(url)
+        if node_data:
+            return node_data
+
+    # HTTP fast path: statik JSON-LD/meta yeterliyse browser açılmaz
+    fast_data = None if thorough else await fast_scrape(url)
+    ranked = None
+    if fast_data and fast_data.get("complete"):
+        # Logo / placeholder görseller elenir; hiçbir aday geçmezse browser denenir
+        ranked = await image_prober.rank([fast_data["image"]] + list(fast_data.get("images") or []), referer=url)
+    if ranked and ranked["image"]:
+        logging.info(f"HTTP fast path hit ({fast_data['sources']}): {url}")
+        original_price = fast_data.get("old_price")
+        return {
+            "title": fast_data["title"].strip().upper(),
+            "price": fast_data["price"],
+            "original_price": original_price if original_price != fast_data["price"] else None,
+            "discount_message": None,
+            "image": ranked["image"],
+            "brand": fast_data.get("brand") or urlparse(url).netloc.replace("www.", "").split(".")[0].upper(),
+            "url": url
+        }
+
+    # Kalıcı browser havuzundan izole context (her denemede Chromium başlatılmaz)
+    async with browser_pool.context(**FETCH_CONTEXT_OPTIONS) as context:
+        # Görsel/font/medya ve tracker isteklerini engelle (thorough denemede sayfa tam yüklenir)
+        request_blocker = None if thorough else await block_requests(context, url)
+
         # Anti-detection scripts
         await context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         await context.add_init_script("Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]})")
@@ -249,18 +316,26 @@ async def fetch_data(url):
             logging.info(f"Navigating to {url}")
             
             # Adidas ve Zara için özel timeout ve wait stratejisi
-            if "adidas.com" in url or "zara.com" in url:
-                await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+            trace_mark("goto")
+            if "adidas.com" in url or "zara.com" in url or thorough:
+                response = await page.goto(url, wait_until="domcontentloaded", timeout=90000)
                 try:
-                    await page.wait_for_load_state("networkidle", timeout=30000)
+                    if not (response and is_block_status(response.status)):
+                        await page.wait_for_load_state("networkidle", timeout=30000)
                 except:
                     pass
             else:
-                await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+                response = await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+
+            # Engelleme yanıtı (403/429/503): hazır olma beklemesi ve extraction atlanır
+            if response and is_block_status(response.status):
+                logging.warning(f"Blocked with HTTP {response.status}: {url}")
+                raise ScrapeBlocked(f"HTTP {response.status}")
             
-            # Rastgele bekleme
-            import random
-            await page.wait_for_timeout(random.randint(3000, 7000))
+            # Sabit/rastgele bekleme yerine içerik hazır olunca devam et (readiness kendi süresini yazar)
+            trace_mark(None)
+            site_selectors = get_site_selectors(url) or {}
+            await wait_until_ready(page, price_selectors=site_selectors.get("price"))
 
             result = {
                 "title": None,
@@ -273,11 +348,13 @@ async def fetch_data(url):
             }
 
             # 1. Decathlon Özel Kontrolü
+            trace_mark("extract.site")
             if "decathlon" in url:
                 decathlon_data = await extract_decathlon_data(page)
                 if decathlon_data:
                     logging.info("Decathlon data found via window object")
                     result.update(decathlon_data)
+                    trace_claims(result, "site")
                     # Decathlon verisi genelde tamdır, dönülebilir
                     if result["title"] and result["price"]:
                         return result
@@ -290,8 +367,10 @@ async def fetch_data(url):
                     # Mevcut result ile birleştir (None olmayanları al)
                     for k, v in teknosa_data.items():
                         if v: result[k] = v
+                    trace_claims(result, "site")
 
             # 3. JSON-LD Kontrolü (En güvenilir kaynak)
+            trace_mark("extract.jsonld")
             json_data = await extract_jsonld(page)
             if json_data:
                 logging.info("JSON-LD data found")
@@ -326,6 +405,8 @@ async def fetch_data(url):
                             result["brand"] = brand_data
 
             # 4. Meta Tags / OG Tags Kontrolü
+            trace_claims(result, "jsonld")
+            trace_mark("extract.meta")
             if not result["title"] or not result["price"] or not result["image"]:
                 meta_data = await extract_meta_tags(page)
                 if meta_data:
@@ -337,6 +418,8 @@ async def fetch_data(url):
                         result["price"] = meta_data["price"]
 
             # 5. DOM Selectors (Site bazlı veya fallback)
+            trace_claims(result, "meta")
+            trace_mark("extract.dom")
             selectors = get_site_selectors(url)
             if not selectors:
                 selectors = {
@@ -350,42 +433,25 @@ async def fetch_data(url):
                 if "original_price" not in selectors:
                     selectors["original_price"] = ["del", ".old-price", "[data-testid='original-price']", "span[class*='old']"]
 
-            # Eksik verileri DOM'dan çekmeye çalış
-            if not result["title"]:
-                for sel in selectors["title"]:
-                    try:
-                        el = await page.query_selector(sel)
-                        if el:
-                            text = await el.inner_text()
-                            if text:
-                                result["title"] = text.strip()
-                                break
-                    except: continue
-
-            if not result["price"]:
-                for sel in selectors["price"]:
+            # Eksik verileri DOM'dan çekmeye çalış; bu domain'de hiç eşleşmeyen selector'lar
+            # sona alınır (her query_selector bir round trip)
+            for field in ("title", "price", "original_price"):
+                if result[field]:
+                    continue
+                ordered = strategy_stats.order(url, field, "selector", selectors[field])
+                for sel in ordered:
                     try:
                         el = await page.query_selector(sel)
                         if el:
                             text = await el.inner_text()
                             if text:
-                                result["price"] = text.strip()
-                                break
-                    except: continue
-            
-            # Original Price (İndirimsiz Fiyat) Arama
-            if not result["original_price"]:
-                for sel in selectors["original_price"]:
-                    try:
-                        el = await page.query_selector(sel)
-                        if el:
-                            text = await el.inner_text()
-                            if text:
-                                result["original_price"] = text.strip()
+                                result[field] = text.strip()
                                 break
                     except: continue
+                strategy_stats.record_selectors(url, field, ordered, sel if result[field] else None)
 
             # Kampanya / Sepette İndirim Mesajı Arama (Geniş Kapsamlı)
+            trace_mark("extract.discount")
             try:
                 # Tüm sayfa metnini çek
                 page_text = await page.evaluate("document.body.innerText")
@@ -412,8 +478,10 @@ async def fetch_data(url):
             except Exception as e:
                 logging.debug(f"Deep campaign extraction failed: {e}")
 
+            trace_mark("extract.dom")
             if not result["image"]:
-                for sel in selectors["image"]:
+                ordered = strategy_stats.order(url, "image", "selector", selectors["image"])
+                for sel in ordered:
                     try:
                         el = await page.query_selector(sel)
                         if el:
@@ -422,6 +490,7 @@ async def fetch_data(url):
                                 result["image"] = src
                                 break
                     except: continue
+                strategy_stats.record_selectors(url, "image", ordered, sel if result["image"] else None)
 
             if not result["brand"]:
                 for sel in selectors.get("brand", []):
@@ -456,6 +525,11 @@ async def fetch_data(url):
                     result["brand"] = domain.replace("www.", "").split(".")[0].upper()
 
             # Son Temizlik ve Formatlama
+            trace_claims(result, "dom")
+            trace_mark("postprocess")
+            if result["image"]:
+                # 1x1 placeholder / SVG / 404 kaydedilmesin (Range ile header prob); küçük ama gerçek görsel kalır
+                result["image"] = (await image_prober.rank([result["image"]], referer=url, keep_weak=True))["image"]
             if result["title"]:
                 result["title"] = result["title"].strip().upper()
             
@@ -467,29 +541,21 @@ async def fetch_data(url):
                 if result["original_price"] == result["price"]:
                     result["original_price"] = None
 
+            if request_blocker:
+                logging.info(f"Request blocking: {request_blocker.summary()}")
             logging.info(f"Scraping result: {result}")
             return result
 
         except Exception as e:
-            logging.error(f"Error scraping {url}: {e}")
-            return None
-        finally:
-            await browser.close()
+            logging.error(f"Error scraping {url} ({strategy}): {e}")
+            raise
 
+@tracer.traced("scraper")
 def scrape_product(url):
-    """Main entry point - 3 deneme hakkı"""
-    for i in range(3):
-        try:
-            logging.debug(f"Attempt {i+1}/3 - {url}")
-            result = asyncio.run(fetch_data(url))
-            if result and result.get("title"): # En azından başlık olmalı
-                return result
-        except Exception as e:
-            logging.debug(f"Attempt {i+1} failed: {e}")
-            # Son deneme değilse bekle
-            if i < 2:
-                import time
-                time.sleep(2)
-    
-    logging.error(f"All attempts failed for {url}")
-    return None
+    """
+    Main entry point. Denemeler tek bir coroutine içinde background loop'ta çalışır:
+    aynı browser, her denemede yeni context; bekleme asyncio.sleep (RETRY_CONFIG).
+    """
+    # Süre sınırı eskisi gibi deneme başına
+    timeout = DEFAULT_RUN_TIMEOUT * retry_policy.max_attempts
+    return background_loop.run(retry_policy.run(url, fetch_attempt), timeout=timeout)
@@ -5,6 +5,7 @@ Site-specific scraping logic organized by domain
 
 from scrapers.config import SITE_CONFIGS, get_site_config, get_timeout
 from scrapers.utils import format_price, extract_price_from_text, normalize_image_url, should_skip_image
+from scrapers.price_parser import parse_price, parse_many
 
-__all__ = ['SITE_CONFIGS', 'get_site_config', 'get_timeout', 'format_price', 'extract_price_from_text', 'normalize_image_url', 'should_skip_image']
+__all__ = ['SITE_CONFIGS', 'get_site_config', 'get_timeout', 'format_price', 'extract_price_from_text', 'normalize_image_url', 'should_skip_image', 'parse_price', 'parse_many']
 
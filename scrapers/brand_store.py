@@ -0,0 +1,263 @@
+"""
+Brand Store
+Dynamic (automatically or manually added) brands kept in memory, reloaded on change, written in batches
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: single-process writes only
+    fcntl = None
+
+from scrapers.config import BRAND_STORE_CONFIG
+from scrapers.host_registry import host_registry
+
+
+def _apply(brands, ops):
+    """Apply ("add", domain, name) / ("remove", domain) ops to a domain -> name dict"""
+    for op in ops:
+        if op[0] == "add":
+            brands.setdefault(op[1], op[2])
+        else:
+            brands.pop(op[1], None)
+    return brands
+
+
+class JsonBrandBackend:
+    """dynamic_brands.json ([[domain, name], ...]); writes merge under a file lock and replace atomically"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def version(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return {domain: name for domain, name in json.load(f)}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"[HATA] Dinamik markalar yüklenemedi: {e}")
+            return {}
+
+    def apply(self, ops):
+        """Re-read the file, apply `ops` and write it back; returns the merged brands"""
+        lock_fd = None
+        if fcntl is not None:
+            lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            # Merge with what other workers wrote since our last load (no lost updates)
+            brands = _apply(self.load(), ops)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump([[domain, name] for domain, name in brands.items()], f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            return brands
+        finally:
+            if lock_fd is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+                os.close(lock_fd)
+
+
+class SqliteBrandBackend:
+    """`brands` table plus a version row bumped by every write (cheap change detection)"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS brands (
+                    domain TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS brands_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('INSERT OR IGNORE INTO brands_version (id, version) VALUES (1, 0)')
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def version(self):
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT version FROM brands_version WHERE id = 1').fetchone()[0]
+        finally:
+            conn.close()
+
+    def load(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT domain, name FROM brands ORDER BY created_at, rowid').fetchall()
+        finally:
+            conn.close()
+        return {domain: name for domain, name in rows}
+
+    def apply(self, ops):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for op in ops:
+                if op[0] == "add":
+                    conn.execute('INSERT OR IGNORE INTO brands (domain, name) VALUES (?, ?)', (op[1], op[2]))
+                else:
+                    conn.execute('DELETE FROM brands WHERE domain = ?', (op[1],))
+            conn.execute('UPDATE brands_version SET version = version + 1 WHERE id = 1')
+            conn.commit()
+        finally:
+            conn.close()
+        return self.load()
+
+
+class BrandStore:
+    """
+    In-memory dynamic brands backed by JSON or SQLite.
+
+    Reads never touch the backend unless its mtime/version changed (checked at
+    most every `check_interval` seconds). `add()` batches new brands for
+    `flush_interval` seconds; admin edits pass flush=True. The brand lookup
+    table of `host_registry` is rebuilt whenever the set changes.
+    """
+
+    def __init__(self, backend=None, flush_interval=None, check_interval=None, table="dynamic_brand"):
+        self.backend = backend or self._default_backend()
+        self.flush_interval = BRAND_STORE_CONFIG["flush_interval"] if flush_interval is None else flush_interval
+        self.check_interval = BRAND_STORE_CONFIG["check_interval"] if check_interval is None else check_interval
+        self.table = table
+        self._lock = threading.RLock()
+        self._brands = None
+        self._version = None
+        self._checked_at = 0
+        self._pending = []
+        self._timer = None
+        self.stats = {"reloads": 0, "flushes": 0, "added": 0}
+
+    @staticmethod
+    def _default_backend():
+        json_backend = JsonBrandBackend(BRAND_STORE_CONFIG["json_path"])
+        if BRAND_STORE_CONFIG["backend"] != "sqlite":
+            return json_backend
+        backend = SqliteBrandBackend(BRAND_STORE_CONFIG["db_path"])
+        if not backend.load():
+            # First start on SQLite: import the existing JSON brands
+            existing = json_backend.load()
+            if existing:
+                backend.apply([("add", domain, name) for domain, name in existing.items()])
+        return backend
+
+    # ========== Reads ==========
+
+    def _publish(self, brands):
+        self._brands = brands
+        host_registry.register(self.table, list(brands.items()))
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._brands is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        version = self.backend.version()
+        if self._brands is not None and version == self._version:
+            return
+        # Unflushed local additions stay visible on top of the reloaded set
+        self._version = version
+        self._publish(_apply(self.backend.load(), self._pending))
+        self.stats["reloads"] += 1
+
+    def all(self):
+        """(domain, name) tuples in insertion order"""
+        with self._lock:
+            self._refresh()
+            return list(self._brands.items())
+
+    def get(self, domain):
+        with self._lock:
+            self._refresh()
+            return self._brands.get(domain)
+
+    def lookup(self, url_or_host):
+        """Brand of the longest matching dynamic domain suffix"""
+        with self._lock:
+            self._refresh()
+        return host_registry.lookup(self.table, url_or_host)
+
+    # ========== Writes ==========
+
+    def add(self, domain, name, flush=False):
+        """Add a brand unless the domain exists; returns (stored name, created)"""
+        with self._lock:
+            self._refresh()
+            existing = self._brands.get(domain)
+            if existing is not None:
+                return existing, False
+            self._pending.append(("add", domain, name))
+            brands = dict(self._brands)
+            brands[domain] = name
+            self._publish(brands)
+            self.stats["added"] += 1
+            if flush:
+                self.flush()
+            else:
+                self._schedule_flush()
+            return name, True
+
+    def remove(self, domain):
+        """Delete a brand now; returns (domain, name) or None"""
+        with self._lock:
+            self._refresh()
+            name = self._brands.get(domain)
+            if name is None:
+                return None
+            self._pending.append(("remove", domain))
+            self.flush()
+            return domain, name
+
+    def _schedule_flush(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes in one backend transaction"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            ops, self._pending = self._pending, []
+            try:
+                brands = self.backend.apply(ops)
+            except Exception as e:
+                print(f"[HATA] Dinamik markalar kaydedilemedi: {e}")
+                self._pending = ops + self._pending
+                self._schedule_flush()
+                return
+            self._version = self.backend.version()
+            self._checked_at = time.monotonic()
+            self._publish(brands)
+            self.stats["flushes"] += 1
+
+
+# Global instance
+brand_store = BrandStore()
+atexit.register(brand_store.flush)
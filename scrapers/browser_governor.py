@@ -0,0 +1,127 @@
+"""
+Browser Governor
+Recycling limits for pooled Chromium browsers: pages served, age and memory of the browser's process tree
+"""
+import os
+import time
+import uuid
+
+from scrapers.config import BROWSER_GOVERNOR_CONFIG
+
+PROC = '/proc'
+MB = 1024 * 1024
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Unknown switch Chromium ignores; tags a launched browser so its process can be found
+MARKER_SWITCH = '--scraper-pool-id'
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _pids():
+    try:
+        return [int(name) for name in os.listdir(PROC) if name.isdigit()]
+    except OSError:
+        return []
+
+
+def find_browser_process(marker):
+    """PID of the browser process launched with `marker` (Linux /proc), else None"""
+    needle = f"{MARKER_SWITCH}={marker}".encode()
+    for pid in _pids():
+        args = (_read(f"{PROC}/{pid}/cmdline") or b'').split(b'\0')
+        # Child processes carry --type=renderer/gpu-process/...; the browser itself does not
+        if needle in args and not any(arg.startswith(b'--type=') for arg in args):
+            return pid
+    return None
+
+
+def process_tree_rss(pid):
+    """Summed resident memory (bytes) of `pid` and all its descendants; None if `pid` is gone or there is no /proc"""
+    children = {}
+    for child in _pids():
+        stat = _read(f"{PROC}/{child}/stat")
+        if stat:
+            # Fields after the "(comm)" part: state, ppid, ...
+            children.setdefault(int(stat[stat.rfind(b')') + 2:].split()[1]), []).append(child)
+
+    statm = _read(f"{PROC}/{pid}/statm")
+    if statm is None:
+        return None
+    total, stack = int(statm.split()[1]) * PAGE_SIZE, list(children.get(pid, ()))
+    while stack:
+        current = stack.pop()
+        statm = _read(f"{PROC}/{current}/statm")
+        if statm:
+            total += int(statm.split()[1]) * PAGE_SIZE
+        stack.extend(children.get(current, ()))
+    return total
+
+
+class BrowserGovernor:
+    """
+    Decides when a pooled browser is recycled: after `max_served` contexts,
+    `max_age` seconds, or once the summed RSS of its process tree (browser,
+    zygote, renderers, GPU/utility processes) passes `max_rss_mb`. RSS is
+    read from /proc at most every `rss_interval` seconds per browser and is
+    not checked where /proc is missing. BrowserPool drains a recycled
+    browser: its in-flight contexts finish, new ones go to the replacement.
+    """
+
+    def __init__(self, max_served=None, max_age=None, max_rss_mb=None, rss_interval=None):
+        config = BROWSER_GOVERNOR_CONFIG
+        self.max_served = config["max_served"] if max_served is None else max_served
+        self.max_age = config["max_age"] if max_age is None else max_age
+        self.max_rss_mb = config["max_rss_mb"] if max_rss_mb is None else max_rss_mb
+        self.rss_interval = config["rss_interval"] if rss_interval is None else rss_interval
+        self.stats = {"recycled": 0, "reasons": {}}
+
+    def track(self):
+        """(launch args, tracking record) for a browser about to be launched"""
+        marker = uuid.uuid4().hex[:12]
+        info = {"marker": marker, "pid": None, "launched": time.monotonic(), "pages": 0, "active": 0,
+                "rss": None, "measured": 0}
+        return [f"{MARKER_SWITCH}={marker}"], info
+
+    def measure(self, info):
+        """RSS of a tracked browser's process tree (cached for `rss_interval`)"""
+        now = time.monotonic()
+        if now - info["measured"] >= self.rss_interval:
+            info["measured"] = now
+            if info["pid"] is None:
+                info["pid"] = find_browser_process(info["marker"])
+            info["rss"] = process_tree_rss(info["pid"]) if info["pid"] else None
+        return info["rss"]
+
+    def recycle_reason(self, info):
+        """First limit a tracked browser has reached ("pages" / "age" / "rss"), else None"""
+        if self.max_served and info["pages"] >= self.max_served:
+            return "pages"
+        if self.max_age and time.monotonic() - info["launched"] >= self.max_age:
+            return "age"
+        if self.max_rss_mb:
+            rss = self.measure(info)
+            if rss and rss > self.max_rss_mb * MB:
+                return "rss"
+        return None
+
+    def recycled(self, reason):
+        self.stats["recycled"] += 1
+        self.stats["reasons"][reason] = self.stats["reasons"].get(reason, 0) + 1
+
+    def describe(self, info):
+        """Exported metrics of one tracked browser"""
+        rss = self.measure(info)
+        return {
+            "pid": info["pid"],
+            "age": round(time.monotonic() - info["launched"]),
+            "pages": info["pages"],
+            "active": info["active"],
+            "rss_mb": round(rss / MB, 1) if rss else None,
+        }
@@ -0,0 +1,305 @@
+"""
+Browser Pool
+Long-lived Chromium instances shared by every Playwright scraper in a worker process
+"""
+import asyncio
+import atexit
+import os
+import time
+from contextlib import asynccontextmanager
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:
+    async_playwright = None
+
+from scrapers.browser_governor import BrowserGovernor
+from scrapers.event_loop import background_loop
+from scrapers.tracing import current_trace
+
+
+# Launch flags shared by all scrapers.
+# --single-process and --no-zygote are intentionally left out: the pool serves
+# several contexts from one browser, single-process Chromium does not survive
+# context churn, and both put renderer leaks into processes that outlive the
+# pages. With separate renderers, closing a context returns its memory and the
+# governor recycles browsers that still grow.
+BROWSER_ARGS = [
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-gpu',
+    '--disable-plugins',
+    '--disable-extensions',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-features=TranslateUI',
+    '--disable-ipc-flooding-protection',
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--hide-scrollbars',
+    '--mute-audio',
+    '--no-default-browser-check',
+    '--no-pings',
+    '--disable-prompt-on-repost',
+    '--disable-hang-monitor',
+    '--disable-client-side-phishing-detection',
+    '--disable-component-update',
+    '--disable-domain-reliability',
+    '--disable-features=AudioServiceOutOfProcess',
+    '--disable-accelerated-2d-canvas',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-infobars',
+    '--no-first-run',
+    '--disable-background-networking',
+]
+
+# Pool sizing (overridable per deployment)
+POOL_CONFIG = {
+    "browsers": int(os.environ.get('SCRAPER_POOL_BROWSERS', '1')),
+    "max_pages": int(os.environ.get('SCRAPER_POOL_MAX_PAGES', '4')),
+    "shutdown_timeout": 15,
+}
+
+
+class BrowserPool:
+    """
+    Keeps a small set of warm Chromium browsers on the worker's background loop.
+
+    Playwright objects are bound to the loop that created them, so the pool
+    lives on the shared BackgroundLoop thread. Sync code submits scrape
+    coroutines with `run()`; coroutines running on that loop borrow isolated
+    contexts with `context()` / `page()`.
+
+    The governor decides when a browser is recycled (pages served, age,
+    memory). A recycled browser leaves its slot at once but is only closed
+    when its last borrowed context is returned.
+    """
+
+    def __init__(self, size=None, max_pages=None, launch_args=None, loop=None, governor=None):
+        self.size = max(1, size or POOL_CONFIG["browsers"])
+        self.max_pages = max(1, max_pages or POOL_CONFIG["max_pages"])
+        self.launch_args = list(launch_args or BROWSER_ARGS)
+        self.loop = loop or background_loop
+        self.governor = governor or BrowserGovernor()
+        self._reset_state()
+
+    def _reset_state(self):
+        """Forget every loop-bound handle (first use, new process or after shutdown)"""
+        self._bound_loop = None
+        self._playwright = None
+        self._browsers = [None] * self.size
+        self._info = {}          # browser -> governor tracking record
+        self._draining = set()   # recycled browsers with contexts still open
+        self._next_browser = 0
+        self._semaphore = None
+        self._launch_lock = None
+        self.stats = {"launches": 0, "relaunches": 0, "contexts": 0, "private_contexts": 0}
+
+    # ========== Event loop ==========
+
+    def submit(self, coro):
+        """Schedule a coroutine on the pool loop; returns a concurrent.futures.Future"""
+        return self.loop.submit(coro)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the pool loop and block until it finishes"""
+        return self.loop.run(coro, timeout)
+
+    def _on_pool_loop(self):
+        return self.loop.is_current()
+
+    # ========== Browser management ==========
+
+    def _primitives(self):
+        # asyncio primitives must be created on the loop that uses them; a new
+        # loop (fork, restart) means every browser handle is stale as well
+        loop = asyncio.get_running_loop()
+        if self._bound_loop is not loop:
+            self._reset_state()
+            self._bound_loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_pages)
+            self._launch_lock = asyncio.Lock()
+        return self._semaphore, self._launch_lock
+
+    async def _start_playwright(self):
+        if async_playwright is None:
+            raise RuntimeError("Playwright is not installed")
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        return self._playwright
+
+    async def _launch(self):
+        playwright = await self._start_playwright()
+        marker_args, info = self.governor.track()
+        browser = await playwright.chromium.launch(headless=True, args=self.launch_args + marker_args)
+        self._info[browser] = info
+        self.stats["launches"] += 1
+        return browser
+
+    async def _close_browser(self, browser):
+        self._info.pop(browser, None)
+        self._draining.discard(browser)
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    async def _drain(self, browser):
+        """Take a recycled browser out of rotation; closed now if idle, else when its last context closes"""
+        info = self._info.get(browser)
+        if info is not None and info["active"]:
+            self._draining.add(browser)
+        else:
+            await self._close_browser(browser)
+
+    async def _get_browser(self):
+        """Pick the next browser round-robin, relaunching it if it crashed"""
+        _, launch_lock = self._primitives()
+        async with launch_lock:
+            index = self._next_browser % self.size
+            self._next_browser += 1
+
+            browser = self._browsers[index]
+            if browser is not None and browser.is_connected():
+                reason = self.governor.recycle_reason(self._info[browser])
+                if reason is None:
+                    return browser
+                print(f"[DEBUG] Browser #{index} yenileniyor ({reason}): {self.governor.describe(self._info[browser])}")
+                self.governor.recycled(reason)
+                self._browsers[index] = None
+                await self._drain(browser)
+                browser = None
+
+            if browser is not None:
+                print(f"[WARNING] Browser #{index} disconnected, relaunching")
+                self.stats["relaunches"] += 1
+                await self._close_browser(browser)
+
+            try:
+                browser = await self._launch()
+            except Exception:
+                if any(b is not None and b.is_connected() for b in self._browsers):
+                    raise
+                # Every browser is gone, so the driver may be too; restart it once
+                await self._stop_playwright()
+                browser = await self._launch()
+
+            self._browsers[index] = browser
+            return browser
+
+    async def _stop_playwright(self):
+        for index, browser in enumerate(self._browsers):
+            if browser is not None:
+                await self._close_browser(browser)
+            self._browsers[index] = None
+        for browser in list(self._draining):
+            await self._close_browser(browser)
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    @asynccontextmanager
+    async def _private_context(self, **options):
+        """Throwaway browser for callers running on a foreign event loop"""
+        if async_playwright is None:
+            raise RuntimeError("Playwright is not installed")
+        self.stats["private_contexts"] += 1
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=self.launch_args)
+            try:
+                context = await browser.new_context(**options)
+                yield context
+            finally:
+                await browser.close()
+
+    @asynccontextmanager
+    async def context(self, **options):
+        """Borrow an isolated browser context; closed automatically on exit"""
+        if not self._on_pool_loop():
+            # e.g. scripts calling asyncio.run(scrape_product(...)) directly
+            async with self._private_context(**options) as context:
+                yield context
+            return
+
+        semaphore, _ = self._primitives()
+        trace, started = current_trace(), time.perf_counter()
+        async with semaphore:
+            browser = await self._get_browser()
+            try:
+                context = await browser.new_context(**options)
+            except Exception:
+                # Browser died between the health check and new_context
+                browser = await self._get_browser()
+                context = await browser.new_context(**options)
+            self.stats["contexts"] += 1
+            info = self._info.get(browser)
+            if info is not None:
+                info["pages"] += 1
+                info["active"] += 1
+            if trace is not None:
+                # Pool slot wait + (re)launch + new_context
+                trace.add("context", time.perf_counter() - started)
+            try:
+                yield context
+            finally:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+                if info is not None:
+                    info["active"] -= 1
+                    if browser in self._draining and not info["active"]:
+                        await self._close_browser(browser)
+
+    @asynccontextmanager
+    async def page(self, **options):
+        """Borrow a fresh page inside its own context"""
+        async with self.context(**options) as context:
+            yield await context.new_page()
+
+    # ========== Metrics ==========
+
+    def browser_stats(self):
+        """Per-browser age / pages served / open contexts / process tree RSS, plus recycling counters"""
+        browsers = [
+            dict(self.governor.describe(self._info[browser]), slot=index)
+            for index, browser in enumerate(self._browsers)
+            if browser is not None and browser in self._info
+        ]
+        draining = [self.governor.describe(self._info[browser]) for browser in list(self._draining) if browser in self._info]
+        return {
+            "stats": self.stats,
+            "recycled": self.governor.stats,
+            "limits": {"max_served": self.governor.max_served, "max_age": self.governor.max_age,
+                       "max_rss_mb": self.governor.max_rss_mb},
+            "browsers": browsers,
+            "draining": draining,
+        }
+
+    # ========== Shutdown ==========
+
+    async def close(self):
+        """Close every browser and the Playwright driver"""
+        await self._stop_playwright()
+
+    def shutdown(self, timeout=None):
+        """Close the browsers from sync code (gunicorn worker_exit / atexit)"""
+        if self._bound_loop is not None and self.loop.is_running():
+            try:
+                self.loop.run(self.close(), timeout or POOL_CONFIG["shutdown_timeout"])
+            except Exception as e:
+                print(f"[WARNING] Browser pool shutdown error: {e}")
+        self._reset_state()
+
+
+# Global instance (one per worker process)
+browser_pool = BrowserPool()
+atexit.register(browser_pool.shutdown)
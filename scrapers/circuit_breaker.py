@@ -0,0 +1,175 @@
+"""
+Circuit Breaker
+Per-domain breaker: after repeated failures or bot blocks, scrapes of a shop fail fast until a probe succeeds
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from scrapers.config import CIRCUIT_BREAKER_CONFIG
+from scrapers.host_registry import parse_host
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Page titles of bot walls / error pages that come back as HTTP 200
+BLOCK_TITLE_MARKERS = ("ACCESS DENIED", "FORBIDDEN", "BOT DETECTED")
+
+
+def is_block_status(status):
+    return status in CIRCUIT_BREAKER_CONFIG["block_statuses"]
+
+
+def is_block_title(title):
+    upper_title = (title or "").upper()
+    return any(marker in upper_title for marker in BLOCK_TITLE_MARKERS)
+
+
+class ScrapeBlocked(Exception):
+    """The shop answered with a block status or a challenge page"""
+
+
+class CircuitOpenError(Exception):
+    """Scrape refused without a request because the domain's breaker is open"""
+
+    def __init__(self, domain, retry_after, last_good=None):
+        super().__init__(f"{domain} geçici olarak devre dışı ({retry_after:.0f} sn sonra tekrar denenecek)")
+        self.domain = domain
+        self.retry_after = retry_after
+        self.last_good = last_good
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures (errors,
+    empty results, block statuses, challenge pages). While open, check()
+    raises CircuitOpenError carrying the URL's last good result, if any.
+    After the cooldown one caller is let through as a half-open probe: its
+    success closes the breaker, its failure re-opens it with a doubled
+    cooldown. State is per process.
+    """
+
+    def __init__(self, enabled=None, failure_threshold=None, cooldown=None, max_cooldown=None,
+                 probe_timeout=None, last_good_size=None):
+        config = CIRCUIT_BREAKER_CONFIG
+        self.enabled = config["enabled"] if enabled is None else enabled
+        self.failure_threshold = failure_threshold or config["failure_threshold"]
+        self.cooldown = config["cooldown"] if cooldown is None else cooldown
+        self.max_cooldown = config["max_cooldown"] if max_cooldown is None else max_cooldown
+        self.probe_timeout = config["probe_timeout"] if probe_timeout is None else probe_timeout
+        self.last_good_size = last_good_size or config["last_good_size"]
+        self._lock = threading.Lock()
+        self._domains = {}
+        self._last_good = OrderedDict()
+        self.stats = {"rejected": 0, "served_stale": 0, "opened": 0, "probes": 0}
+
+    def _state(self, domain):
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = {
+                "state": CLOSED, "failures": 0, "cooldown": self.cooldown, "opened_at": None,
+                "probe_started": None, "last_failure": None, "last_reason": None, "rejected": 0,
+            }
+        return state
+
+    # ========== Guard ==========
+
+    def check(self, url):
+        """Return if a scrape of `url` may run now, else raise CircuitOpenError"""
+        if not self.enabled:
+            return
+        domain = parse_host(url)
+        now = time.monotonic()
+        with self._lock:
+            state = self._domains.get(domain)
+            if state is None or state["state"] == CLOSED:
+                return
+            if state["state"] == OPEN and now - state["opened_at"] >= state["cooldown"]:
+                state["state"] = HALF_OPEN
+            if state["state"] == HALF_OPEN and (
+                    state["probe_started"] is None or now - state["probe_started"] >= self.probe_timeout):
+                # This caller is the probe; everyone else keeps failing fast until it reports
+                state["probe_started"] = now
+                self.stats["probes"] += 1
+                return
+            state["rejected"] += 1
+            self.stats["rejected"] += 1
+            retry_after = max(0.0, state["cooldown"] - (now - state["opened_at"]))
+            last_good = self._last_good.get(url)
+        if last_good is not None:
+            self.stats["served_stale"] += 1
+        raise CircuitOpenError(domain, retry_after, last_good)
+
+    # ========== Outcomes ==========
+
+    def record_success(self, url, data=None):
+        if not self.enabled:
+            return
+        domain = parse_host(url)
+        with self._lock:
+            state = self._state(domain)
+            if state["state"] != CLOSED:
+                print(f"[DEBUG] Circuit breaker kapandı: {domain}")
+            state.update(state=CLOSED, failures=0, cooldown=self.cooldown, opened_at=None, probe_started=None)
+            if data:
+                self._last_good[url] = data
+                self._last_good.move_to_end(url)
+                while len(self._last_good) > self.last_good_size:
+                    self._last_good.popitem(last=False)
+
+    def record_failure(self, url, reason="error"):
+        if not self.enabled:
+            return
+        domain = parse_host(url)
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(domain)
+            state["failures"] += 1
+            state["last_failure"] = time.time()
+            state["last_reason"] = reason
+            if state["state"] == HALF_OPEN:
+                # Failed probe: back off further
+                state["cooldown"] = min(self.max_cooldown, state["cooldown"] * 2)
+            elif state["state"] == OPEN or state["failures"] < self.failure_threshold:
+                return
+            state.update(state=OPEN, opened_at=now, probe_started=None)
+            self.stats["opened"] += 1
+        print(f"[UYARI] Circuit breaker açıldı: {domain} ({reason}, {state['failures']} ardışık hata)")
+
+    def release_probe(self, url):
+        """The caller never scraped (e.g. queue timeout): hand the half-open probe to the next caller"""
+        if not self.enabled:
+            return
+        with self._lock:
+            state = self._domains.get(parse_host(url))
+            if state is not None and state["state"] == HALF_OPEN:
+                state["probe_started"] = None
+
+    # ========== Introspection ==========
+
+    def snapshot(self):
+        """Per-domain breaker state (non-closed domains first)"""
+        now = time.monotonic()
+        with self._lock:
+            domains = {}
+            for domain, state in self._domains.items():
+                retry_after = None
+                if state["state"] == OPEN:
+                    retry_after = round(max(0.0, state["cooldown"] - (now - state["opened_at"])), 1)
+                domains[domain] = {
+                    "state": state["state"],
+                    "failures": state["failures"],
+                    "cooldown": state["cooldown"],
+                    "retry_after": retry_after,
+                    "last_failure": state["last_failure"],
+                    "last_reason": state["last_reason"],
+                    "rejected": state["rejected"],
+                }
+        return dict(sorted(domains.items(), key=lambda item: item[1]["state"] == CLOSED))
+
+    def reset(self, domain):
+        with self._lock:
+            return self._domains.pop(parse_host(domain), None) is not None
+
+
+# Global instance
+circuit_breaker = CircuitBreaker()
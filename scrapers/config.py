@@ -2,8 +2,70 @@
 Site Configuration
 Contains all site-specific selectors and configurations
 """
+import os
 import re
-from urllib.parse import urlparse
+import tempfile
+
+from scrapers.host_registry import host_registry
+
+# HTTP-first fast path (see scrapers/http_fetcher.py)
+# Sites whose product data only exists after JavaScript runs set "engine": "browser"
+# in SITE_CONFIGS and skip straight to Playwright.
+HTTP_FIRST_CONFIG = {
+    "enabled": os.environ.get('SCRAPER_HTTP_FIRST', '1') not in ('0', 'false', 'False'),
+    "timeout": 8,                      # seconds for the whole document fetch
+    "max_bytes": 3 * 1024 * 1024,      # stop reading huge documents
+    "pool_size": 32,                   # keep-alive connections in total
+    "per_host": 4,                     # keep-alive connections per host
+    "trusted_price_sources": ["jsonld", "meta"],  # regex-only prices escalate to the browser
+}
+
+# Post-extraction image check: candidates probed in parallel with Range requests, ranked by size / aspect ratio
+IMAGE_PROBE_CONFIG = {
+    "enabled": os.environ.get('SCRAPER_IMAGE_PROBE', '1') == '1',
+    "probe_bytes": 32 * 1024,    # header bytes read per image (JPEG SOF usually sits in the first few KB)
+    "timeout": 4,                # seconds per probe
+    "per_host": 4,               # concurrent probes per image host
+    "max_candidates": 12,
+    "min_side": 200,             # smaller images are icons, swatches or placeholders
+    "good_side": 600,            # above this size only candidate order counts
+    "max_aspect": 3.0,           # wider/taller than 3:1 is a banner or logo strip
+    "cache_ttl": 600,
+    "cache_size": 4096,
+}
+
+# Request blocking defaults (see scrapers/request_blocking.py)
+# Sites can extend/override these with a "blocking" entry in SITE_CONFIGS:
+#   "resource_types": replaces the blocked resource types
+#   "deny": extra host/URL substrings to block
+#   "allow": URL substrings that are never blocked
+DEFAULT_BLOCKING = {
+    "resource_types": ["image", "media", "font"],
+    "deny": [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "googleadservices.com",
+        "doubleclick.net",
+        "connect.facebook.net",
+        "facebook.com/tr",
+        "analytics.tiktok.com",
+        "bat.bing.com",
+        "clarity.ms",
+        "hotjar.com",
+        "criteo.com",
+        "criteo.net",
+        "mc.yandex.ru",
+        "ct.pinterest.com",
+        "sc-static.net",
+        "adform.net",
+        "taboola.com",
+        "segment.io",
+        "nr-data.net",
+        "newrelic.com",
+        "/collect?",
+    ],
+    "allow": [],
+}
 
 # Site-specific configurations
 SITE_CONFIGS = {
@@ -42,7 +104,10 @@ SITE_CONFIGS = {
             "h1.product-name",
             "h1.product-title",
             ".product-name"
-        ]
+        ],
+        "blocking": {
+            "deny": ["useinsider.com"]
+        }
     },
     "defacto.com.tr": {
         "image_selectors": [
@@ -85,6 +150,10 @@ SITE_CONFIGS = {
         ]
     },
     "pullandbear.com": {
+        # Bot protection blocks bursts: one page at a time, one request every 2 s
+        "max_concurrency": 1,
+        "requests_per_second": 0.5,
+        "burst": 1,
         "image_selectors": [
             "img[data-qa-image]",
             "img#product-image",
@@ -119,7 +188,13 @@ SITE_CONFIGS = {
             "h1.product-title",
             ".product-name",
             "h1"
-        ]
+        ],
+        "blocking": {
+            "deny": ["dynatrace", "ruxitagentjs", "bluecore"],
+            # OneTrust consent button is clicked during the scrape
+            "allow": ["cookielaw.org", "onetrust"]
+        },
+        "engine": "browser"
     },
     "marksandspencer.com.tr": {
         "image_selectors": [
@@ -153,6 +228,10 @@ SITE_CONFIGS = {
         ]
     },
     "bershka.com": {
+        # Bot protection blocks bursts: one page at a time, one request every 2 s
+        "max_concurrency": 1,
+        "requests_per_second": 0.5,
+        "burst": 1,
         "image_selectors": [
             "img[data-qa-anchor='pdpMainImage']",
             "img[src*='static.bershka.net']",
@@ -172,9 +251,17 @@ SITE_CONFIGS = {
             "h1.product-name",
             "h1.product-title",
             ".product-name"
-        ]
+        ],
+        "blocking": {
+            "deny": ["dynatrace", "ruxitagentjs", "bluecore"]
+        },
+        "engine": "browser"
     },
     "shop.mango.com": {
+        # Bot protection blocks bursts: one page at a time, one request every 2 s
+        "max_concurrency": 1,
+        "requests_per_second": 0.5,
+        "burst": 1,
         "image_selectors": [
             "img.ImageGridItem_image__VVZxr",
             "img[src*='shop.mango.com/assets']",
@@ -206,9 +293,17 @@ SITE_CONFIGS = {
             "title",
             "h1[class*='product']",
             "h1[class*='title']"
-        ]
+        ],
+        "blocking": {
+            "deny": ["tealiumiq.com", "tiqcdn.com", "quantummetric.com", "contentsquare.net"]
+        },
+        "engine": "browser"
     },
     "stradivarius.com": {
+        # Bot protection blocks bursts: one page at a time, one request every 2 s
+        "max_concurrency": 1,
+        "requests_per_second": 0.5,
+        "burst": 1,
         "image_selectors": [
             "img.product-image",
             "img[class*='product-image']",
@@ -226,7 +321,8 @@ SITE_CONFIGS = {
             "h1.product-name",
             "h1.product-title",
             ".product-name"
-        ]
+        ],
+        "engine": "browser"
     },
     "kaft.com": {
         "image_selectors": [
@@ -287,6 +383,10 @@ SITE_CONFIGS = {
         ]
     },
     "zara.com": {
+        # Bot protection blocks bursts: one page at a time, one request every 2 s
+        "max_concurrency": 1,
+        "requests_per_second": 0.5,
+        "burst": 1,
         "image_selectors": [
             "img.product-detail-image",
             "img[src*='static.zara.net']",
@@ -305,7 +405,13 @@ SITE_CONFIGS = {
             "h1.product-name",
             "h1.product-title",
             ".product-name"
-        ]
+        ],
+        "blocking": {
+            "deny": ["dynatrace", "ruxitagentjs", "bluecore", "quantummetric.com"],
+            # Product data is rendered from the itxrest JSON API
+            "allow": ["/itxrest/"]
+        },
+        "engine": "browser"
     },
     "sportime.com.tr": {
         "image_selectors": [
@@ -328,6 +434,20 @@ SITE_CONFIGS = {
             "h1.product-single__title",
             ".product__title"
         ]
+    },
+    "teknosa.com": {
+        # Gallery images are lazy (data-srcset only); og:image is the main product image
+        "image_selectors": [],
+        "price_selectors": [
+            ".pdp-prices .prc-last",
+            ".pdp-prices .prc"
+        ],
+        "old_price_selectors": [
+            ".pdp-prices .prc-first"
+        ],
+        "title_selectors": [
+            "h1.pdp-title"
+        ]
     }
 }
 
@@ -340,27 +460,180 @@ TIMEOUT_CONFIG = {
     "default": 15000         # 15 seconds default
 }
 
+# Page readiness deadlines (in milliseconds); waits end as soon as content is ready
+READINESS_CONFIG = {
+    "content": 10000,        # product page: JSON-LD / price / stable DOM
+    "warmup": 3000,          # homepage warm-up visits
+    "scroll": 1000,          # each lazy-load scroll step
+    "stable_ms": 500,        # DOM quiet window that counts as "stable"
+    "poll_interval": 100,
+}
+
+# Bulk scrape scheduling (add_product bulk import)
+SCHEDULER_CONFIG = {
+    "max_concurrency": int(os.environ.get('SCRAPER_MAX_CONCURRENCY', '8')),   # all domains
+    "per_domain": int(os.environ.get('SCRAPER_PER_DOMAIN_CONCURRENCY', '2')),
+    # Per-domain token bucket (requests/second, burst); SITE_CONFIGS may set
+    # "max_concurrency", "requests_per_second" and "burst" per site
+    "rate": float(os.environ.get('SCRAPER_DOMAIN_RATE', '2')),
+    "burst": int(os.environ.get('SCRAPER_DOMAIN_BURST', '4')),
+    "price_check_workers": int(os.environ.get('SCRAPER_PRICE_CHECK_WORKERS', '4')),  # concurrent price checks
+    "batch_timeout": 240,    # seconds; stays below the 300 s gunicorn timeout
+    # Longest a sync caller (request / executor thread) waits in the queue before TimeoutError
+    "queue_timeout": int(os.environ.get('SCRAPER_QUEUE_TIMEOUT', '120')),
+}
+
+# Pooled Chromium recycling: a browser is drained and replaced once any limit is hit (0 = no limit)
+BROWSER_GOVERNOR_CONFIG = {
+    "max_served": int(os.environ.get('SCRAPER_BROWSER_MAX_SERVED', '200')),   # contexts served per browser
+    "max_age": int(os.environ.get('SCRAPER_BROWSER_MAX_AGE', '1800')),       # seconds since launch
+    "max_rss_mb": int(os.environ.get('SCRAPER_BROWSER_MAX_RSS_MB', '1024')), # browser + renderer processes
+    "rss_interval": 15,      # seconds between RSS measurements per browser (/proc scan)
+}
+
+# Sampled background re-verification of newly added products (0 = off)
+REVERIFY_CONFIG = {
+    "sample_rate": float(os.environ.get('SCRAPER_REVERIFY_SAMPLE', '0')),
+}
+
+# Single-flight scrapes: concurrent callers for one URL share a single scrape.
+# The cross-process variant serialises gunicorn workers through per-URL file locks.
+SINGLE_FLIGHT_CONFIG = {
+    "cross_process": os.environ.get('SCRAPER_SINGLE_FLIGHT_CROSS_PROCESS', '1') == '1',
+    "lock_dir": os.environ.get('SCRAPER_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'favit-scrape-locks')),
+    "lock_timeout": float(os.environ.get('SCRAPER_LOCK_TIMEOUT', '120')),   # seconds; then scrape anyway
+    "poll_interval": 0.2,    # seconds between lock attempts
+    "result_max_age": 3600,  # seconds before shared result files are pruned
+}
+
+# Per-domain session warm-up: the homepage visit (and consent click) that used to run
+# before every scrape now runs once per TTL; the resulting Playwright storage_state
+# (cookies + localStorage) is injected into new contexts (see scrapers/session_warmup.py)
+SESSION_WARMUP_CONFIG = {
+    "ttl": int(os.environ.get('SCRAPER_STORAGE_STATE_TTL', '10800')),   # seconds
+    "state_dir": os.environ.get('SCRAPER_STATE_DIR', os.path.join(tempfile.gettempdir(), 'favit-storage-state')),
+    "sites": {
+        "mango.com": {"url": "https://shop.mango.com/tr"},
+        "zara.com": {"url": "https://www.zara.com/tr/"},
+        "bershka.com": {"url": "https://www.bershka.com/tr/"},
+        "pullandbear.com": {"url": "https://www.pullandbear.com/tr/", "consent_selector": "#onetrust-accept-btn-handler"},
+        "lesbenjamins.com": {"url": "https://lesbenjamins.com/"},
+    },
+}
+
+# Dynamic brand store (see scrapers/brand_store.py). "json" keeps dynamic_brands.json;
+# "sqlite" shares a brands table between gunicorn workers.
+BRAND_STORE_CONFIG = {
+    "backend": os.environ.get('BRAND_STORE', 'json'),
+    "json_path": os.environ.get('BRAND_STORE_FILE', 'dynamic_brands.json'),
+    "db_path": os.environ.get('BRAND_STORE_DB', 'favit.db'),
+    "flush_interval": 2.0,   # seconds new automatic brands are batched before writing
+    "check_interval": 1.0,   # seconds between mtime/version checks
+}
+
+# Per-scrape stage traces: per-domain histograms in memory, a sample appended to a JSONL file
+TRACE_CONFIG = {
+    "enabled": os.environ.get('SCRAPER_TRACING', '1') == '1',
+    "sample_rate": float(os.environ.get('SCRAPER_TRACE_SAMPLE', '0')),      # share of traces written to JSONL
+    "jsonl_path": os.environ.get('SCRAPER_TRACE_FILE', os.path.join(tempfile.gettempdir(), 'favit-traces.jsonl')),
+    "buckets_ms": [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000],
+    "recent": 50,            # last traces kept for the admin endpoint
+}
+
+# Per-domain circuit breaker: fail fast (or serve the last good result) while a shop blocks or fails
+CIRCUIT_BREAKER_CONFIG = {
+    "enabled": os.environ.get('SCRAPER_CIRCUIT_BREAKER', '1') == '1',
+    "failure_threshold": int(os.environ.get('SCRAPER_BREAKER_THRESHOLD', '5')),  # consecutive failures
+    "cooldown": float(os.environ.get('SCRAPER_BREAKER_COOLDOWN', '120')),        # seconds before a probe
+    "max_cooldown": 1800,    # cooldown doubles after each failed probe, up to this
+    "probe_timeout": 180,    # seconds after which an unanswered probe may be retried
+    "last_good_size": 2000,  # URLs whose last successful result is kept
+    "block_statuses": [403, 429, 503],
+}
+
+# Failed scrapes per normalised URL, kept apart from the success cache; TTL doubles per consecutive failure
+NEGATIVE_CACHE_CONFIG = {
+    "enabled": os.environ.get('SCRAPER_NEGATIVE_CACHE', '1') == '1',
+    "base_ttl": {            # seconds for the first failure, per failure class
+        "timeout": 60,
+        "block": 300,
+        "parse_miss": 120,
+        "error": 60,
+    },
+    "max_ttl": 6 * 3600,
+    "forget_after": 24 * 3600,  # failure streaks older than this start over
+    "max_entries": 5000,
+}
+
+# scraper.scrape_product attempts: retries per failure class, awaited exponential backoff with jitter
+RETRY_CONFIG = {
+    "max_attempts": 3,
+    "budgets": {             # retries allowed per failure class
+        "timeout": 2,
+        "block": 1,
+        "parse_miss": 1,
+        "error": 1,
+    },
+    "base_delay": 1.0,       # seconds before the first retry, doubled per retry
+    "max_delay": 8.0,
+    "jitter": 0.5,           # +-50% so retries of parallel scrapes do not line up
+    "escalate_on": ("block", "parse_miss"),  # failures that switch later attempts to the heavier strategy
+}
+
+# Persistent unified_scraper (puppeteer-extra) workers, NDJSON over stdio; needs `npm install` in unified_scraper
+NODE_WORKER_CONFIG = {
+    "enabled": os.environ.get('SCRAPER_NODE_WORKERS', '0') == '1',
+    "command": [os.environ.get('NODE_BINARY', 'node'), 'worker.js'],
+    "cwd": os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'unified_scraper'),
+    "workers": int(os.environ.get('SCRAPER_NODE_WORKER_COUNT', '2')),
+    "max_pages": 2,          # concurrent pages per worker
+    "request_timeout": 90,   # seconds, navigation timeout inside the worker is 75% of it
+    "max_rss_mb": 768,       # worker recycled once its Node RSS grows past this
+    "max_requests": 500,     # ... or after this many requests (bounds Chromium growth)
+    "domains": ("nike.com", "bershka.com", "decathlon"),  # routed to the worker ("decathlon": any suffix)
+}
+
+# Sampled page captures (gzipped HTML + JPEG screenshot) for debugging extraction, written off the request path
+DEBUG_CAPTURE_CONFIG = {
+    "enabled": os.environ.get('SCRAPER_DEBUG_CAPTURE', '1') == '1',
+    "dir": os.environ.get('SCRAPER_DEBUG_DIR', os.path.join(tempfile.gettempdir(), 'favit-debug-captures')),
+    "rates": {"success": 0.01, "failure": 1.0},  # share of scrapes captured per outcome
+    "domain_rates": {                            # per-domain overrides
+        "pullandbear.com": {"success": 0.05},
+    },
+    "max_bytes": int(os.environ.get('SCRAPER_DEBUG_MAX_MB', '200')) * 1024 * 1024,  # ring buffer size
+    "full_page": True,
+    "jpeg_quality": 60,
+}
+
+# Learned per-domain extraction order: tiers / selectors that (almost) never win are tried last
+STRATEGY_STATS_CONFIG = {
+    "enabled": os.environ.get('SCRAPER_LEARNED_ORDER', '1') == '1',
+    "db_path": os.environ.get('STRATEGY_STATS_DB', 'favit.db'),
+    "explore_rate": 0.1,     # share of scrapes that run the default order to keep the statistics fresh
+    "min_attempts": 5,       # attempts before a tier/selector can be demoted
+    "demote_below": 0.05,    # win rate under which it is demoted
+    "flush_interval": 5.0,   # seconds counters are batched before writing
+    "reload_interval": 60.0, # seconds between reloads (counters written by other workers)
+}
+
 def get_site_config(url):
-    """Get site configuration for a given URL"""
-    try:
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower().replace('www.', '')
-        
-        # Direct match
-        if domain in SITE_CONFIGS:
-            return SITE_CONFIGS[domain]
-        
-        # Partial match (e.g., "shop.mango.com" matches "mango.com")
-        for config_domain, config in SITE_CONFIGS.items():
-            if config_domain in domain or domain in config_domain:
-                return config
-        
-        return None
-    except Exception as e:
-        print(f"[ERROR] Error getting site config: {e}")
-        return None
+    """Get site configuration for a given URL (longest host suffix, e.g. "shop.mango.com" -> "mango.com")"""
+    return host_registry.lookup("site_config", url)
+
+def get_engine_preference(url):
+    """Get the first engine to try for a URL ('http' fast path or 'browser')"""
+    site_config = get_site_config(url) or {}
+    return site_config.get("engine", "http")
 
 def get_timeout(timeout_type="default"):
     """Get standardized timeout value"""
     return TIMEOUT_CONFIG.get(timeout_type, TIMEOUT_CONFIG["default"])
 
+def get_readiness_deadline(wait_type="content"):
+    """Get the maximum readiness wait for a wait type"""
+    return READINESS_CONFIG.get(wait_type, READINESS_CONFIG["content"])
+
+
+# Host suffix index for get_site_config / get_engine_preference
+host_registry.register("site_config", SITE_CONFIGS)
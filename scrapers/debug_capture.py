@@ -0,0 +1,160 @@
+"""
+Debug Capture
+Sampled page captures (gzipped HTML, JPEG screenshot, metadata) in a size-bounded directory outside static/
+"""
+import concurrent.futures
+import gzip
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from scrapers.config import DEBUG_CAPTURE_CONFIG
+from scrapers.host_registry import SuffixTrie, parse_host
+from scrapers.tracing import trace_stage
+
+# Files of one capture: <id>.json, <id>.html.gz, <id>.jpg
+KINDS = {"meta": ".json", "html": ".html.gz", "screenshot": ".jpg"}
+CAPTURE_ID = re.compile(r'^[\w.-]+$')
+
+
+class DebugCapture:
+    """
+    Captures the page of a sampled share of scrapes: `rates` per outcome
+    ("success" / "failure"), overridden per domain by `domain_rates`. Only
+    grabbing the HTML and the screenshot happens on the scrape; compression
+    and writing run on a single background thread, which then deletes the
+    oldest captures until the directory is under `max_bytes`.
+    """
+
+    def __init__(self, directory=None, rates=None, domain_rates=None, max_bytes=None, full_page=None,
+                 jpeg_quality=None, enabled=None):
+        config = DEBUG_CAPTURE_CONFIG
+        self.enabled = config["enabled"] if enabled is None else enabled
+        self.directory = directory or config["dir"]
+        self.rates = dict(config["rates"], **(rates or {}))
+        self.max_bytes = max_bytes or config["max_bytes"]
+        self.full_page = config["full_page"] if full_page is None else full_page
+        self.jpeg_quality = jpeg_quality or config["jpeg_quality"]
+        self._domain_rates = SuffixTrie()
+        for domain, domain_rate in (config["domain_rates"] if domain_rates is None else domain_rates).items():
+            self._domain_rates.insert(domain, domain_rate)
+        self._writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-capture")
+        self.stats = {"sampled": 0, "skipped": 0, "written": 0, "evicted": 0, "errors": 0}
+
+    # ========== Sampling ==========
+
+    def rate(self, url, outcome):
+        """Capture probability for `outcome` ("success" or a failure class) on `url`'s domain"""
+        key = "success" if outcome == "success" else "failure"
+        _, domain_rates = self._domain_rates.match(parse_host(url))
+        return (domain_rates or {}).get(key, self.rates.get(key, 0))
+
+    def should_capture(self, url, outcome):
+        if not self.enabled:
+            return False
+        if random.random() < self.rate(url, outcome):
+            self.stats["sampled"] += 1
+            return True
+        self.stats["skipped"] += 1
+        return False
+
+    # ========== Capture ==========
+
+    async def capture(self, page, url, outcome, details=None):
+        """Capture `page` if sampled; returns the capture id or None. Never raises."""
+        if not self.should_capture(url, outcome):
+            return None
+        capture_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{parse_host(url) or 'unknown'}-{uuid.uuid4().hex[:6]}"
+        meta = {"id": capture_id, "url": url, "outcome": outcome, "time": time.time(), "details": details or {}}
+        try:
+            with trace_stage("debug_capture"):
+                html = await page.content()
+                screenshot = await page.screenshot(type="jpeg", quality=self.jpeg_quality, full_page=self.full_page)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[UYARI] Debug capture alınamadı ({url}): {e}")
+            return None
+        self._writer.submit(self._write, capture_id, meta, html, screenshot)
+        return capture_id
+
+    def _write(self, capture_id, meta, html, screenshot):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, capture_id)
+            with gzip.open(base + KINDS["html"], 'wt', encoding='utf-8') as f:
+                f.write(html)
+            with open(base + KINDS["screenshot"], 'wb') as f:
+                f.write(screenshot)
+            # Metadata last: a capture is listed only once it is complete
+            with open(base + KINDS["meta"], 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            self.stats["written"] += 1
+            self._trim()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[UYARI] Debug capture yazılamadı ({capture_id}): {e}")
+
+    def _trim(self):
+        """Delete the oldest captures until the directory fits in max_bytes"""
+        captures = {}
+        for entry in os.scandir(self.directory):
+            suffix = next((suffix for suffix in KINDS.values() if entry.name.endswith(suffix)), None)
+            if suffix is None:
+                continue
+            capture_id = entry.name[:-len(suffix)]
+            size, mtime = captures.get(capture_id, (0, 0))
+            stat = entry.stat()
+            captures[capture_id] = (size + stat.st_size, max(mtime, stat.st_mtime))
+        total = sum(size for size, _ in captures.values())
+        for capture_id, (size, _) in sorted(captures.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            for suffix in KINDS.values():
+                try:
+                    os.remove(os.path.join(self.directory, capture_id + suffix))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            self.stats["evicted"] += 1
+
+    def flush(self, timeout=None):
+        """Wait for queued writes (tests, shutdown)"""
+        self._writer.submit(lambda: None).result(timeout)
+
+    # ========== Browsing ==========
+
+    def recent(self, limit=100):
+        """Metadata of the newest captures first"""
+        try:
+            names = sorted((name for name in os.listdir(self.directory) if name.endswith(KINDS["meta"])), reverse=True)
+        except FileNotFoundError:
+            return []
+        captures = []
+        for name in names[:limit]:
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    captures.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return captures
+
+    def read(self, capture_id, kind):
+        """Raw bytes of one capture file (HTML decompressed), None if unknown"""
+        if kind not in KINDS or not CAPTURE_ID.match(capture_id):
+            return None
+        path = os.path.join(self.directory, capture_id + KINDS[kind])
+        try:
+            if kind == "html":
+                with gzip.open(path, 'rb') as f:
+                    return f.read()
+            with open(path, 'rb') as f:
+                return f.read()
+        except (OSError, EOFError):
+            return None
+
+
+# Global instance
+debug_capture = DebugCapture()
@@ -0,0 +1,113 @@
+"""
+Background Event Loop
+One long-lived asyncio loop per worker process, driven from sync Flask views
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import os
+import threading
+
+# Upper bound for a blocking run() when the caller gives no timeout (seconds)
+DEFAULT_RUN_TIMEOUT = float(os.environ.get('SCRAPER_RUN_TIMEOUT', '180'))
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running forever in a daemon thread.
+
+    Everything loop-bound (Playwright browsers, aiohttp sessions, asyncio
+    semaphores) lives on this loop, so it survives across requests. Sync code
+    hands coroutines over with `submit()` (returns a concurrent future) or
+    `run()` (blocks with a timeout).
+    """
+
+    def __init__(self, name="scraper-loop"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._loop = None
+        self._thread = None
+
+    def _ensure_loop(self):
+        """Start the loop thread on first use (and again in a forked child)"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked (gunicorn --preload): the parent's thread does not exist here
+                self._pid = os.getpid()
+                self._loop = None
+                self._thread = None
+
+            if self._loop is not None and self._thread is not None and self._thread.is_alive():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            thread.start()
+            ready.wait()
+
+            self._loop = loop
+            self._thread = thread
+            return loop
+
+    @property
+    def loop(self):
+        return self._ensure_loop()
+
+    def is_current(self):
+        """True when called from a coroutine running on this loop"""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def is_running(self):
+        return (self._pid == os.getpid() and self._thread is not None
+                and self._thread.is_alive() and not self._loop.is_closed())
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop; returns a concurrent.futures.Future"""
+        if self.is_current():
+            coro.close()
+            raise RuntimeError("submit() would deadlock when called from the background loop; await instead")
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block until it finishes or times out"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout or DEFAULT_RUN_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            # Same exception type the request handlers already catch
+            raise asyncio.TimeoutError(f"Coroutine did not finish within {timeout or DEFAULT_RUN_TIMEOUT}s")
+        except Exception:
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout=5):
+        """Stop the loop and join its thread (atexit / gunicorn worker_exit)"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or self._pid != os.getpid():
+                return
+            self._loop = None
+            self._thread = None
+
+        if thread is not None and thread.is_alive() and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
+
+
+# Global instance (one per worker process)
+background_loop = BackgroundLoop()
+atexit.register(background_loop.shutdown)
@@ -0,0 +1,342 @@
+"""
+Extraction Plan
+Compiles every selector candidate for a page into one page.evaluate round trip
+"""
+from functools import lru_cache
+
+from scrapers.request_blocking import blocked_images
+from scrapers.tracing import current_trace, trace_stage
+from universal_scraper import universal_scraper
+
+# Matches kept per selector / for the img fallback, and body text kept for the regex tier
+MAX_MATCHES = 20
+MAX_FALLBACK_IMAGES = 80
+MAX_TEXT_LENGTH = 200000
+
+# Site config keys feeding each plan field
+FIELD_KEYS = {
+    "title": "title_selectors",
+    "price": "price_selectors",
+    "old_price": "old_price_selectors",
+    "image": "image_selectors",
+}
+
+# Resolution order per field. Structured data first, then the site config
+# selectors ("site", empty without a site config), then UniversalScraper's
+# generic order: meta > DOM > text/img fallback.
+TIERS = {
+    "title": ("jsonld", "site", "meta", "dom"),
+    "price": ("jsonld", "site", "meta", "dom", "regex"),
+    "image": ("jsonld", "site", "meta", "dom", "fallback"),
+}
+
+# Injected once per extraction. Returns, for every field, one match list per
+# selector (same order as the plan), plus JSON-LD, meta values, body text and
+# a capped list of all <img> elements for the last-resort image tier. An <img>
+# is a placeholder only if its request was answered by the RequestBlocker
+# (a real 1x1 tracking pixel is not).
+COLLECT_JS = """
+([fields, metaSelectors, maxMatches, maxImages, maxText, blockedImages]) => {
+    const blocked = new Set(blockedImages);
+    const ATTRS = ['content', 'src', 'srcset', 'data-src', 'data-lazy-src', 'alt'];
+    const describe = el => {
+        const item = {text: (el.textContent || '').trim().slice(0, 500)};
+        for (const attr of ATTRS) {
+            const value = el.getAttribute(attr);
+            if (value !== null) item[attr] = value;
+        }
+        if (el.tagName === 'IMG') {
+            const rect = el.getBoundingClientRect();
+            item.width = rect.width;
+            item.height = rect.height;
+            item.placeholder = blocked.has(el.currentSrc || el.src);
+        }
+        return item;
+    };
+    const queryAll = (selector, limit) => {
+        try {
+            return Array.from(document.querySelectorAll(selector)).slice(0, limit);
+        } catch (e) {
+            return [];
+        }
+    };
+
+    const result = {fields: {}, meta: {}};
+    for (const [field, selectors] of Object.entries(fields)) {
+        result.fields[field] = selectors.map(selector => queryAll(selector, maxMatches).map(describe));
+    }
+    for (const selector of metaSelectors) {
+        result.meta[selector] = queryAll(selector, maxMatches)
+            .map(el => el.getAttribute('content'))
+            .filter(Boolean);
+    }
+    result.jsonld = queryAll('script[type="application/ld+json"]', maxMatches).map(el => el.textContent);
+    result.images = Array.from(document.images).slice(0, maxImages).map(describe);
+    result.text = document.body ? (document.body.innerText || '').slice(0, maxText) : '';
+    return result;
+}
+"""
+
+
+def _unique(selectors):
+    """Drop duplicates while keeping first-seen priority"""
+    return list(dict.fromkeys(s for s in selectors if s))
+
+
+class ExtractionPlan:
+    """
+    Merged, de-duplicated selector lists for one site.
+
+    Site config selectors come first, then any caller extras, then the
+    UniversalScraper lists, so list order is also resolution priority.
+    """
+
+    def __init__(self, site_config=None, extra=None, scraper=None):
+        self.scraper = scraper or universal_scraper
+        site_config = site_config or {}
+        extra = extra or {}
+
+        generic = {
+            "title": self.scraper.title_selectors,
+            "price": self.scraper.price_selectors,
+            "old_price": [],
+            "image": self.scraper.image_selectors,
+        }
+        self.site_fields = {
+            field: _unique(list(site_config.get(key) or []) + list(extra.get(field, [])))
+            for field, key in FIELD_KEYS.items()
+        }
+        self.fields = {
+            field: _unique(self.site_fields[field] + generic[field])
+            for field in FIELD_KEYS
+        }
+        self.meta_selectors = _unique(self.scraper.title_meta_selectors
+                                      + self.scraper.price_meta_selectors
+                                      + self.scraper.image_meta_selectors)
+
+    async def collect(self, page, url=None):
+        """Run the whole plan in the page (one CDP round trip)"""
+        with trace_stage("extract.collect"):
+            snapshot = await page.evaluate(
+                COLLECT_JS,
+                [self.fields, self.meta_selectors, MAX_MATCHES, MAX_FALLBACK_IMAGES, MAX_TEXT_LENGTH,
+                 sorted(blocked_images(page))],
+            )
+        return PageCandidates(self, snapshot, url or page.url)
+
+
+class PageCandidates:
+    """Collected candidates for one page; all ranking and parsing happens here"""
+
+    def __init__(self, plan, snapshot, url):
+        self.plan = plan
+        self.scraper = plan.scraper
+        self.url = url
+        self.snapshot = snapshot or {}
+        self.jsonld = [c for c in self.snapshot.get("jsonld", []) if c]
+        # field -> tiers run by the last resolution (for StrategyStats)
+        self.tried = {}
+        self._matches = None
+
+    @property
+    def text(self):
+        """Body text for the regex tier"""
+        return self.snapshot.get("text", "")
+
+    def fallback_images(self):
+        """All <img> descriptions for the last-resort image tier"""
+        return self.snapshot.get("images", [])
+
+    def query_all(self, field, selector):
+        """Collected matches of one selector (page.query_selector_all equivalent)"""
+        if self._matches is None:
+            fields = self.snapshot.get("fields", {})
+            self._matches = {
+                name: dict(zip(selectors, fields.get(name, [])))
+                for name, selectors in self.plan.fields.items()
+            }
+        return self._matches.get(field, {}).get(selector, [])
+
+    def query(self, field, selector):
+        """First collected match of one selector (page.query_selector equivalent)"""
+        matches = self.query_all(field, selector)
+        return matches[0] if matches else None
+
+    def elements(self, field, selectors=None, first_only=False):
+        """(selector, element) pairs in priority order, optionally limited to `selectors`"""
+        for selector in (selectors if selectors is not None else self.plan.fields.get(field, [])):
+            found = self.query_all(field, selector)
+            for element in (found[:1] if first_only else found):
+                yield selector, element
+
+    def texts(self, field, selectors=None, first_only=False):
+        """(selector, text) pairs with non-empty text"""
+        for selector, element in self.elements(field, selectors, first_only):
+            if element.get("text"):
+                yield selector, element["text"]
+
+    def meta(self, selectors):
+        """Meta content values for `selectors`, in order and de-duplicated"""
+        values = []
+        for selector in selectors:
+            for value in self.snapshot.get("meta", {}).get(selector, []):
+                value = value.strip()
+                if value and value not in values:
+                    values.append(value)
+        return values
+
+    # ========== Resolution tiers ==========
+    # Each tier returns the field value (title / (price, old_price) / (image, images)) or None
+
+    def _title_site(self):
+        for selector, text in self.texts("title", self.plan.site_fields["title"], first_only=True):
+            return self.scraper._clean_title(text)
+
+    def _title_jsonld(self):
+        for content in self.jsonld:
+            title = self.scraper._title_from_jsonld(content)
+            if title:
+                return self.scraper._clean_title(title)
+
+    def _title_meta(self):
+        titles = self.meta(self.scraper.title_meta_selectors)
+        if titles:
+            return self.scraper._clean_title(titles[0])
+
+    def _title_dom(self):
+        for selector, text in self.texts("title", self.scraper.title_selectors, first_only=True):
+            return self.scraper._clean_title(text)
+
+    def _price_site(self):
+        # Site selectors point at one price element, so the first selector that parses wins
+        for selector in self.plan.site_fields["price"]:
+            price_data = self.scraper._prices_from_texts(
+                [text for _, text in self.texts("price", [selector], first_only=True)]
+            )
+            if price_data:
+                old_texts = [text for _, text in self.texts("old_price", self.plan.site_fields["old_price"], first_only=True)]
+                old_data = self.scraper._prices_from_texts(old_texts[:1])
+                return price_data["current"], old_data["current"] if old_data else price_data.get("old")
+
+    def _price_jsonld(self):
+        for content in self.jsonld:
+            try:
+                price_data = self.scraper._price_from_jsonld(content)
+            except Exception:
+                continue
+            if price_data and price_data.get("current"):
+                return price_data["current"], price_data.get("old")
+
+    def _price_meta(self):
+        prices = self.meta(self.scraper.price_meta_selectors)
+        if prices:
+            return self.scraper._format_price(prices[0]), None
+
+    def _price_dom(self):
+        texts = [text for _, text in self.texts("price", self.scraper.price_selectors)]
+        price_data = self.scraper._prices_from_texts(texts)
+        if price_data:
+            return price_data["current"], price_data.get("old")
+
+    def _price_regex(self):
+        price_data = self.scraper._prices_from_text(self.text)
+        if price_data and price_data.get("current"):
+            return price_data["current"], price_data.get("old")
+
+    def _image_site(self):
+        elements = [element for _, element in self.elements("image", self.plan.site_fields["image"])]
+        image_data = self.scraper._images_from_elements(elements, self.url)
+        if image_data:
+            return image_data["primary"], image_data["all"]
+
+    def _image_jsonld(self):
+        for content in self.jsonld:
+            image_data = self.scraper._images_from_jsonld(content, self.url)
+            if image_data and image_data.get("primary"):
+                return image_data["primary"], image_data["all"]
+
+    def _image_meta(self):
+        image_data = self.scraper._images_from_urls(self.meta(self.scraper.image_meta_selectors), self.url)
+        if image_data and image_data.get("primary"):
+            return image_data["primary"], image_data["all"]
+
+    def _image_dom(self):
+        elements = [element for _, element in self.elements("image", self.scraper.image_selectors)]
+        image_data = self.scraper._images_from_elements(elements, self.url)
+        if image_data:
+            return image_data["primary"], image_data["all"]
+
+    def _image_fallback(self):
+        image_data = self.scraper._images_from_fallback(self.fallback_images(), self.url)
+        if image_data:
+            return image_data["primary"], image_data["all"]
+
+    def resolve_field(self, field, tiers=None):
+        """(value, tier) from the first tier that yields `field`; tiers default to TIERS[field]"""
+        trace = current_trace()
+        self.tried[field] = tried = []
+        for tier in (TIERS[field] if tiers is None else tiers):
+            if tier not in TIERS[field]:
+                continue
+            tried.append(tier)
+            if trace is None:
+                value = getattr(self, f"_{field}_{tier}")()
+            else:
+                with trace.stage(f"extract.{tier}"):
+                    value = getattr(self, f"_{field}_{tier}")()
+            if value:
+                if trace is not None:
+                    trace.claim(field, tier)
+                return value, tier
+        return None, None
+
+    def resolve_title(self, tiers=None):
+        return self.resolve_field("title", tiers)
+
+    def resolve_price(self, tiers=None):
+        value, tier = self.resolve_field("price", tiers)
+        return (value or (None, None)) + (tier,)
+
+    def resolve_image(self, tiers=None):
+        value, tier = self.resolve_field("image", tiers)
+        return (value or (None, [])) + (tier,)
+
+    def resolve(self, tiers=None):
+        """
+        Generic title/price/image resolution; missing fields are None.
+
+        `tiers` restricts/reorders the tiers: one sequence for every field or a
+        {field: sequence} dict (tiers a field does not have are skipped).
+        """
+        if not isinstance(tiers, dict):
+            tiers = {field: tiers for field in TIERS}
+        title, title_source = self.resolve_title(tiers.get("title"))
+        price, old_price, price_source = self.resolve_price(tiers.get("price"))
+        image, images, image_source = self.resolve_image(tiers.get("image"))
+        return {
+            "title": title,
+            "price": price,
+            "old_price": old_price,
+            "image": image,
+            "images": images,
+            "sources": {"title": title_source, "price": price_source, "image": image_source},
+        }
+
+
+def _selector_key(mapping, keys):
+    """Hashable (key, selectors) pairs of a selector mapping"""
+    return tuple((key, tuple(mapping.get(key) or ())) for key in keys)
+
+
+@lru_cache(maxsize=256)
+def _compile(site_key, extra_key):
+    return ExtractionPlan(dict(site_key), dict(extra_key))
+
+
+def compile_plan(site_config=None, extra=None):
+    """
+    Get the (cached) ExtractionPlan for a site config plus optional extra selectors.
+    Plans only depend on the selector lists, so those (not the dict objects) are the cache key.
+    """
+    extra = extra or {}
+    return _compile(_selector_key(site_config or {}, FIELD_KEYS.values()), _selector_key(extra, sorted(extra)))
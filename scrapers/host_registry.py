@@ -0,0 +1,147 @@
+"""
+Host Registry
+Per-host lookup of site config, brand, selectors and engine through reversed-label suffix tries
+"""
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# Sentinel key holding a trie node's (domain, value)
+_ENTRY = object()
+
+# Two-label public suffixes: "levis.com.tr" is registrable label "levis" under "com.tr"
+MULTI_LABEL_SUFFIXES = {
+    "com.tr", "net.tr", "org.tr", "gen.tr", "biz.tr", "web.tr",
+    "co.uk", "org.uk", "com.au", "co.jp", "co.kr", "co.nz", "co.za", "co.in",
+    "com.br", "com.mx", "com.ar", "com.cn", "com.hk", "com.sg",
+}
+
+
+def registrable_label(host):
+    """Label directly under the host's public suffix ("m.levis.com.tr" -> "levis"), else None"""
+    labels = host.split('.') if host else []
+    suffix_length = 2 if '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 1
+    if len(labels) <= suffix_length:
+        return None
+    return labels[-suffix_length - 1]
+
+
+def parse_host(url_or_host):
+    """Lower-cased host without scheme, port, credentials or leading www. (accepts bare hosts)"""
+    value = (url_or_host or '').strip()
+    if '://' not in value:
+        value = '//' + value
+    try:
+        host = urlparse(value).hostname or ''
+    except ValueError:
+        return ''
+    host = host.rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+class SuffixTrie:
+    """
+    Domains stored label by label from the TLD inwards ("shop.mango.com" ->
+    com / mango / shop), so a host lookup walks at most len(labels) nodes and
+    only matches whole labels: "gap.com" no longer matches "abcgap.com".
+    A registrable domain ("levis.com") also matches its label under any other
+    public suffix ("levis.com.tr"), unless that host has its own entry.
+    """
+
+    def __init__(self):
+        self._root = {}
+        self._labels = {}
+        self._registrable = {}
+
+    def insert(self, domain, value):
+        """Add `domain`; the first value registered for a domain wins (duplicate lists)"""
+        domain = parse_host(domain) or domain.strip().lower()
+        if '.' not in domain:
+            # Bare brand label ("amazon"): matches the label under any suffix
+            self._labels.setdefault(domain, (domain, value))
+            return
+        node = self._root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        node.setdefault(_ENTRY, (domain, value))
+        label = registrable_label(domain)
+        if label and domain.startswith(label + '.'):
+            self._registrable.setdefault(label, (domain, value))
+
+    def match(self, host):
+        """Longest registered suffix of `host` as (domain, value), else (None, None)"""
+        labels = host.split('.') if host else []
+        node, found = self._root, None
+        for label in reversed(labels):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(_ENTRY, found)
+        if found is None:
+            found = self._registrable.get(registrable_label(host))
+        if found is None and self._labels:
+            for label in labels:
+                if label in self._labels:
+                    return self._labels[label]
+        return found or (None, None)
+
+
+class HostRegistry:
+    """
+    Named suffix tables (site configs, brands, selector sets, ...).
+
+    The host is parsed once per lookup; (table, host) results are kept in a
+    small LRU so the hosts of a batch or of the hourly price check resolve
+    without walking the trie again. Re-registering a table drops the cache.
+    """
+
+    def __init__(self, cache_size=2048):
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._cache = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def register(self, name, entries):
+        """(Re)build table `name` from a dict or (domain, value) pairs"""
+        trie = SuffixTrie()
+        for domain, value in (entries.items() if isinstance(entries, dict) else entries):
+            if domain:
+                trie.insert(domain, value)
+        with self._lock:
+            self._tables[name] = trie
+            self._cache.clear()
+
+    def tables(self):
+        with self._lock:
+            return list(self._tables)
+
+    def match(self, name, url_or_host):
+        """(registered domain, value) for the longest matching suffix, else (None, None)"""
+        host = parse_host(url_or_host)
+        key = (name, host)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._cache[key]
+            trie = self._tables.get(name)
+        if trie is None or not host:
+            return None, None
+
+        result = trie.match(host)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def lookup(self, name, url_or_host, default=None):
+        """Value registered for the URL's host in table `name`"""
+        domain, value = self.match(name, url_or_host)
+        return default if domain is None else value
+
+
+# Global instance
+host_registry = HostRegistry()
@@ -0,0 +1,323 @@
+"""
+Static HTML Extraction
+Runs the live extraction plan (JSON-LD > meta > DOM selectors > regex) on stored or fetched HTML, no browser
+"""
+import re
+from functools import lru_cache
+
+from lxml import etree
+from lxml import html as lxml_html
+
+try:
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    # cssselect not installed: only compound selectors (tag/#id/.class/[attr]) run, see DocumentIndex
+    CSSSelector = None
+
+from scrapers.extraction_plan import (
+    MAX_MATCHES, MAX_FALLBACK_IMAGES, MAX_TEXT_LENGTH, PageCandidates, compile_plan,
+)
+from scrapers.strategy_stats import strategy_stats
+
+# Attributes COLLECT_JS copies from every matched element
+DESCRIBE_ATTRS = ('content', 'src', 'srcset', 'data-src', 'data-lazy-src', 'alt')
+
+# Text nodes that are not rendered (regex tier input mirrors document.body.innerText)
+_VISIBLE_TEXT = etree.XPath('.//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::noscript)]')
+_JSONLD = etree.XPath('//script[@type="application/ld+json"]')
+_IMAGES = etree.XPath('//img')
+
+# One compound selector: optional tag, then #id / .class / [attr] / [attr=|*=|^=|$=value] parts
+_COMPOUND_TAG_RE = re.compile(r'([a-zA-Z][\w-]*|\*)?')
+_COMPOUND_PART_RE = re.compile(
+    r'''\#([\w-]+)|\.([\w-]+)|\[\s*([\w-]+)\s*(?:([*^$]?=)\s*(?:"([^"]*)"|'([^']*)'|([\w-]+))\s*)?\]'''
+)
+_ATTR_TESTS = {
+    '=': lambda actual, value: actual == value,
+    '*=': lambda actual, value: bool(value) and value in actual,
+    '^=': lambda actual, value: bool(value) and actual.startswith(value),
+    '$=': lambda actual, value: bool(value) and actual.endswith(value),
+}
+
+# <meta charset="..."> / http-equiv content="...; charset=..." in the first bytes of a document
+_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+def _dimension(value):
+    try:
+        return float(str(value).strip().rstrip('px'))
+    except (TypeError, ValueError):
+        return None
+
+
+def describe(el):
+    """Python equivalent of COLLECT_JS `describe` for an lxml element"""
+    item = {"text": (el.text_content() or '').strip()[:500]}
+    for attr in DESCRIBE_ATTRS:
+        value = el.get(attr)
+        if value is not None:
+            item[attr] = value
+    if el.tag == 'img':
+        # No layout without a browser: width/height attributes stand in for the rendered box,
+        # and an image of unknown size is kept as a candidate like a blocked (placeholder) one
+        width, height = _dimension(el.get('width')), _dimension(el.get('height'))
+        item["width"] = width or 0
+        item["height"] = height or 0
+        item["placeholder"] = width is None or height is None
+    return item
+
+
+@lru_cache(maxsize=4096)
+def parse_compound(selector):
+    """
+    (tag, id, classes, [(attr, op, value)]) for a single compound selector,
+    None for anything else (combinators, pseudo-classes, selector lists).
+    """
+    selector = selector.strip()
+    tag = _COMPOUND_TAG_RE.match(selector).group(0)
+    pos, element_id, classes, attrs = len(tag), None, [], []
+    while pos < len(selector):
+        match = _COMPOUND_PART_RE.match(selector, pos)
+        if not match:
+            return None
+        id_part, class_part, attr, op, dq, sq, bare = match.groups()
+        if id_part:
+            element_id = id_part
+        elif class_part:
+            classes.append(class_part)
+        else:
+            attrs.append((attr.lower(), op, next((v for v in (dq, sq, bare) if v is not None), None)))
+        pos = match.end()
+    if not (tag or element_id or classes or attrs):
+        return None
+    return (tag.lower() if tag and tag != '*' else None), element_id, tuple(classes), tuple(attrs)
+
+
+class DocumentIndex:
+    """
+    Selector lookups for one document. Class/id postings are built in one pass
+    on first use, tags come from lxml's own iterator. Compound selectors
+    (nearly every plan selector) start from the smallest candidate list
+    instead of an XPath walk over the whole tree, which keeps the DOM tier
+    cheap on 1 MB product pages.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.by_class, self.by_id = None, None
+        self.by_attr = {}
+
+    def _postings(self):
+        """Class/id postings (one pass, on the first class or id selector)"""
+        if self.by_class is None:
+            self.by_class, self.by_id = {}, {}
+            with_class = self.by_attr['class'] = []
+            for el in self.doc.iter(etree.Element):
+                classes = el.get('class')
+                if classes is not None:
+                    with_class.append(el)
+                    for token in set(classes.split()):
+                        self.by_class.setdefault(token, []).append(el)
+                element_id = el.get('id')
+                if element_id:
+                    self.by_id.setdefault(element_id, []).append(el)
+        return self.by_class, self.by_id
+
+    def _with_attr(self, name):
+        if name == 'class':
+            self._postings()
+        if name not in self.by_attr:
+            self.by_attr[name] = [el for el in self.doc.iter(etree.Element) if name in el.attrib]
+        return self.by_attr[name]
+
+    def select(self, compound, limit):
+        tag, element_id, classes, attrs = compound
+        if element_id:
+            candidates = self._postings()[1].get(element_id, [])
+        elif classes:
+            candidates = self._postings()[0].get(classes[0], [])
+        elif tag:
+            candidates = self.doc.iter(tag)
+        else:
+            candidates = self._with_attr(attrs[0][0])
+
+        found = []
+        for el in candidates:
+            if tag and el.tag != tag:
+                continue
+            if len(classes) > 1 and not set(classes).issubset((el.get('class') or '').split()):
+                continue
+            if not all(attr in el.attrib and (op is None or _ATTR_TESTS[op](el.get(attr), value))
+                       for attr, op, value in attrs):
+                continue
+            found.append(el)
+            if len(found) >= limit:
+                break
+        return found
+
+
+class StaticCandidates(PageCandidates):
+    """
+    PageCandidates over an lxml document, queried lazily.
+
+    A browser pays one round trip for the whole plan; here every selector is a
+    tree walk, so selectors, body text and the img fallback are only evaluated
+    when resolution actually reaches their tier (JSON-LD pages touch none).
+    """
+
+    def __init__(self, extractor, doc, plan, url):
+        super().__init__(plan, {"jsonld": [el.text_content() for el in _JSONLD(doc)[:MAX_MATCHES]]}, url)
+        self.extractor = extractor
+        self.doc = doc
+        self._index = None
+        self._queried = {}
+        self._text = None
+
+    def select(self, selector):
+        if self._index is None:
+            self._index = DocumentIndex(self.doc)
+        return self.extractor.query_all(self.doc, selector, index=self._index)
+
+    def query_all(self, field, selector):
+        if selector not in self._queried:
+            self._queried[selector] = [describe(el) for el in self.select(selector)]
+        return self._queried[selector]
+
+    def meta(self, selectors):
+        values = []
+        for selector in selectors:
+            for el in self.select(selector):
+                value = (el.get('content') or '').strip()
+                if value and value not in values:
+                    values.append(value)
+        return values
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self.extractor.visible_text(self.doc)
+        return self._text
+
+    def fallback_images(self):
+        return [describe(el) for el in _IMAGES(self.doc)[:MAX_FALLBACK_IMAGES]]
+
+
+class HtmlExtractor:
+    """
+    Browserless counterpart of the live extraction.
+
+    Resolution, scoring and price parsing are the exact PageCandidates code the
+    browser path runs, on the same plan selector lists. Compound selectors go
+    through DocumentIndex, anything more complex is compiled to XPath once per
+    process; `snapshot()` gives the full COLLECT_JS-shaped dict at once.
+    """
+
+    def __init__(self):
+        self._selectors = {}
+        self._parsers = {}
+
+    def _parser(self, encoding):
+        """HTML parser with a fixed input encoding (cached per encoding)"""
+        if encoding not in self._parsers:
+            try:
+                self._parsers[encoding] = lxml_html.HTMLParser(encoding=encoding)
+            except LookupError:
+                self._parsers[encoding] = self._parsers.get('utf-8') or lxml_html.HTMLParser(encoding='utf-8')
+        return self._parsers[encoding]
+
+    def parse(self, html):
+        """Parse an HTML string/bytes into an lxml document (None if empty)"""
+        if not html:
+            return None
+        try:
+            if isinstance(html, str):
+                # lxml rejects str input that carries an <?xml encoding?> declaration
+                return lxml_html.document_fromstring(html.encode('utf-8'), parser=self._parser('utf-8'))
+            # Raw bytes: declared charset, else UTF-8 (libxml2 alone would guess Latin-1)
+            match = _CHARSET_RE.search(html[:4096])
+            encoding = match.group(1).decode('ascii').lower() if match else 'utf-8'
+            return lxml_html.document_fromstring(html, parser=self._parser(encoding))
+        except Exception as e:
+            print(f"[DEBUG] HTML parse hatası: {e}")
+            return None
+
+    def _compiled(self, selector):
+        """Compiled selector, or None when cssselect is missing or the selector is unsupported"""
+        if selector not in self._selectors:
+            compiled = None
+            if CSSSelector is not None:
+                try:
+                    compiled = CSSSelector(selector, translator='html')
+                except Exception:
+                    # document.querySelectorAll would throw too; the JS side skips it the same way
+                    compiled = None
+            self._selectors[selector] = compiled
+        return self._selectors[selector]
+
+    def query_all(self, doc, selector, limit=MAX_MATCHES, index=None):
+        """Elements matching a CSS selector in document order (at most `limit`)"""
+        compound = parse_compound(selector)
+        if compound is not None:
+            return (index or DocumentIndex(doc)).select(compound, limit)
+        compiled = self._compiled(selector)
+        if compiled is None:
+            return []
+        return compiled(doc)[:limit]
+
+    def visible_text(self, doc):
+        """Body text without script/style content"""
+        body = doc.find('body')
+        root = body if body is not None else doc
+        return ' '.join(t.strip() for t in _VISIBLE_TEXT(root) if t.strip())[:MAX_TEXT_LENGTH]
+
+    def snapshot(self, doc, plan):
+        """COLLECT_JS-shaped dict for `plan` (fields per selector, meta, JSON-LD, images, text)"""
+        index = DocumentIndex(doc)
+        return {
+            "fields": {
+                field: [[describe(el) for el in self.query_all(doc, selector, index=index)] for selector in selectors]
+                for field, selectors in plan.fields.items()
+            },
+            "meta": {
+                selector: [el.get('content') for el in self.query_all(doc, selector, index=index) if el.get('content')]
+                for selector in plan.meta_selectors
+            },
+            "jsonld": [el.text_content() for el in _JSONLD(doc)[:MAX_MATCHES]],
+            "images": [describe(el) for el in _IMAGES(doc)[:MAX_FALLBACK_IMAGES]],
+            "text": self.visible_text(doc),
+        }
+
+    def candidates(self, doc, url, site_config=None, extra=None):
+        """PageCandidates for a parsed document (same object the browser path resolves)"""
+        return StaticCandidates(self, doc, compile_plan(site_config, extra), url)
+
+    def extract_brand(self, doc, scraper):
+        """Brand name from the JSON-LD Product (None when absent)"""
+        for el in _JSONLD(doc):
+            product_data = scraper._load_jsonld_product(el.text_content())
+            brand = product_data.get('brand') if product_data else None
+            if isinstance(brand, dict):
+                brand = brand.get('name')
+            if isinstance(brand, str) and brand.strip():
+                return brand.strip()
+        return None
+
+    # ========== Entry point ==========
+
+    def extract(self, html, url, site_config=None, extra=None, learned=False):
+        """
+        Extract title/price/image from raw HTML (str or bytes); missing fields are None.
+        `learned` resolves in the domain's learned tier order and records the outcome.
+        """
+        doc = self.parse(html)
+        if doc is None:
+            return None
+
+        candidates = self.candidates(doc, url, site_config, extra)
+        data = strategy_stats.resolve(candidates) if learned else candidates.resolve()
+        data["brand"] = self.extract_brand(doc, candidates.scraper)
+        return data
+
+
+# Global instance
+html_extractor = HtmlExtractor()
@@ -0,0 +1,220 @@
+"""
+HTTP Fast Path
+Tier-0 scraping: pooled plain-HTTP fetch + static extraction, browser only when needed
+"""
+import asyncio
+import contextvars
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from scrapers.config import HTTP_FIRST_CONFIG, get_engine_preference, get_site_config
+from scrapers.html_extractor import html_extractor
+from scrapers.price_parser import parse_price
+from scrapers.tracing import current_trace, trace_stage
+
+# Brotli is not guaranteed to be installed, so only gzip/deflate are advertised
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': 'gzip, deflate',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Challenge / bot-wall markers in otherwise 200 responses
+BLOCK_MARKERS = (
+    'access denied',
+    'bot detected',
+    'are you a robot',
+    'captcha-delivery',
+    'cf-chl-',
+    'px-captcha',
+    '_incapsula_resource',
+)
+
+
+class HttpFetcher:
+    """Keep-alive HTTP client (aiohttp, falling back to a pooled requests.Session)"""
+
+    def __init__(self, config=None):
+        self.config = config or HTTP_FIRST_CONFIG
+        self._session = None
+        self._session_loop = None
+        self._requests_session = None
+
+    def _get_requests_session(self):
+        if self._requests_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.config["pool_size"],
+                                  pool_maxsize=self.config["per_host"])
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(HTTP_HEADERS)
+            self._requests_session = session
+        return self._requests_session
+
+    async def _get_aiohttp_session(self):
+        loop = asyncio.get_running_loop()
+        # aiohttp sessions are bound to their loop
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.config["pool_size"],
+                                             limit_per_host=self.config["per_host"],
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, headers=HTTP_HEADERS)
+            self._session_loop = loop
+        return self._session
+
+    async def _fetch_aiohttp(self, url):
+        session = await self._get_aiohttp_session()
+        timeout = aiohttp.ClientTimeout(total=self.config["timeout"])
+        async with session.get(url, timeout=timeout, allow_redirects=True) as response:
+            body = await response.content.read(self.config["max_bytes"])
+            encoding = response.charset or 'utf-8'
+            return response.status, str(response.url), body.decode(encoding, errors='replace')
+
+    def _fetch_requests(self, url):
+        session = self._get_requests_session()
+        with session.get(url, timeout=self.config["timeout"], stream=True, allow_redirects=True) as response:
+            body = response.raw.read(self.config["max_bytes"], decode_content=True)
+            encoding = response.encoding or 'utf-8'
+            return response.status_code, response.url, body.decode(encoding, errors='replace')
+
+    async def fetch(self, url):
+        """Fetch a document; returns dict(status, url, html, bytes, elapsed) or None"""
+        started = time.monotonic()
+        try:
+            if aiohttp is not None:
+                status, final_url, html = await self._fetch_aiohttp(url)
+            else:
+                loop = asyncio.get_running_loop()
+                status, final_url, html = await loop.run_in_executor(None, self._fetch_requests, url)
+        except Exception as e:
+            print(f"[DEBUG] HTTP fetch hatası ({url}): {e}")
+            return None
+
+        trace = current_trace()
+        if trace is not None:
+            trace.add("http_fetch", time.monotonic() - started)
+            trace.add_bytes("http", len(html))
+        return {
+            "status": status,
+            "url": final_url,
+            "html": html,
+            "bytes": len(html),
+            "elapsed": time.monotonic() - started,
+        }
+
+    async def _fetch_range_aiohttp(self, url, length, headers, timeout):
+        session = await self._get_aiohttp_session()
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout),
+                               allow_redirects=True) as response:
+            # read(n) returns what is buffered; servers ignoring Range are cut off after `length` bytes
+            body = b''
+            while len(body) < length:
+                chunk = await response.content.read(length - len(body))
+                if not chunk:
+                    break
+                body += chunk
+            return response.status, response.headers, body
+
+    def _fetch_range_requests(self, url, length, headers, timeout):
+        session = self._get_requests_session()
+        with session.get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True) as response:
+            return response.status_code, response.headers, response.raw.read(length)
+
+    async def fetch_range(self, url, length, headers=None, timeout=None):
+        """
+        First `length` bytes of a resource over the same keep-alive pool (Range request).
+        Returns dict(status, content_type, total, body) or None; `total` is the full size when known.
+        """
+        headers = dict(headers or {}, Range=f"bytes=0-{length - 1}")
+        timeout = timeout or self.config["timeout"]
+        try:
+            if aiohttp is not None:
+                status, response_headers, body = await self._fetch_range_aiohttp(url, length, headers, timeout)
+            else:
+                loop = asyncio.get_running_loop()
+                status, response_headers, body = await loop.run_in_executor(
+                    None, self._fetch_range_requests, url, length, headers, timeout
+                )
+        except Exception as e:
+            print(f"[DEBUG] HTTP range hatası ({url}): {e}")
+            return None
+
+        total = None
+        content_range = response_headers.get('Content-Range', '')
+        if '/' in content_range and content_range.rsplit('/', 1)[1].isdigit():
+            total = int(content_range.rsplit('/', 1)[1])
+        elif status == 200 and (response_headers.get('Content-Length') or '').isdigit():
+            total = int(response_headers['Content-Length'])
+        return {
+            "status": status,
+            "content_type": (response_headers.get('Content-Type') or '').split(';')[0].strip().lower(),
+            "total": total,
+            "body": body,
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._requests_session is not None:
+            self._requests_session.close()
+            self._requests_session = None
+
+
+def looks_blocked(html):
+    """Detect bot walls / challenge pages served with HTTP 200"""
+    head = html[:20000].lower()
+    return any(marker in head for marker in BLOCK_MARKERS)
+
+
+def is_complete(data, config=None):
+    """True when the static result can be returned without a browser"""
+    config = config or HTTP_FIRST_CONFIG
+    if not data or not (data.get("title") and data.get("price") and data.get("image")):
+        return False
+    if parse_price(data["price"]) is None:
+        return False
+    return data["sources"].get("price") in config["trusted_price_sources"]
+
+
+async def fast_scrape(url):
+    """
+    Tier-0 scrape. Returns the static extraction (with a "complete" flag) or None
+    when the fast path is disabled, skipped for JS-only domains, or the fetch failed.
+    """
+    if not HTTP_FIRST_CONFIG["enabled"] or get_engine_preference(url) == "browser":
+        return None
+
+    page = await http_fetcher.fetch(url)
+    if not page or page["status"] != 200 or looks_blocked(page["html"]):
+        status = page["status"] if page else None
+        print(f"[DEBUG] HTTP fast path atlandı (status={status}): {url}")
+        return None
+
+    # lxml parsing is CPU-bound; keep the event loop free for other scrapes
+    # copy_context: executor threads do not inherit the trace
+    loop = asyncio.get_running_loop()
+    with trace_stage("extract.static"):
+        data = await loop.run_in_executor(
+            None, contextvars.copy_context().run,
+            html_extractor.extract, page["html"], page["url"], get_site_config(page["url"]), None, True
+        )
+    if not data:
+        return None
+
+    data["complete"] = is_complete(data)
+    data["fetch"] = {"status": page["status"], "bytes": page["bytes"], "elapsed": round(page["elapsed"], 3)}
+    return data
+
+
+# Global instance
+http_fetcher = HttpFetcher()
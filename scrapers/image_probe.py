@@ -0,0 +1,221 @@
+"""
+Image Probe
+Post-extraction image check: candidate URLs probed in parallel (Range requests, header-only parsing), ranked by size and aspect ratio
+"""
+import asyncio
+import struct
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from scrapers.config import IMAGE_PROBE_CONFIG
+from scrapers.http_fetcher import http_fetcher
+from scrapers.tracing import trace_stage
+
+IMAGE_HEADERS = {
+    'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+    'Accept-Encoding': 'identity',
+}
+
+# JPEG start-of-frame markers (DHT/JPG/DAC share the C4/C8/CC range but carry no size)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Statuses that usually mean "not for bots / hotlink protection", not "no image": kept, unverified
+_UNVERIFIED_STATUSES = {401, 403, 405, 429}
+
+
+def _jpeg_size(data):
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None, None
+
+
+def _webp_size(data):
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30 and data[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25 and data[20] == 0x2F:
+        bits = struct.unpack('<I', data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(data) >= 30:
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None, None
+
+
+def _isobmff_size(data):
+    # AVIF / HEIC: image spatial extents ("ispe") property
+    index = data.find(b'ispe')
+    if index == -1 or len(data) < index + 16:
+        return None, None
+    return struct.unpack('>II', data[index + 8:index + 16])
+
+
+def image_info(data):
+    """(type, width, height) from the first bytes of an image; unknown parts are None"""
+    if data.startswith(b'\x89PNG\r\n\x1a\n') and len(data) >= 24:
+        return ("png",) + struct.unpack('>II', data[16:24])
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return ("gif",) + struct.unpack('<HH', data[6:10])
+    if data.startswith(b'\xff\xd8'):
+        return ("jpeg",) + _jpeg_size(data)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return ("webp",) + _webp_size(data)
+    if data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis', b'heic', b'heix', b'mif1'):
+        return ("avif" if data[8:11] == b'avi' else "heic",) + _isobmff_size(data)
+    head = data[:512].lstrip().lower()
+    if head.startswith(b'<svg') or (head.startswith(b'<?xml') and b'<svg' in head):
+        return "svg", None, None
+    return None, None, None
+
+
+class ImageProber:
+    """
+    Checks extracted image candidates before one is stored.
+
+    Every candidate is probed concurrently over the shared keep-alive HTTP
+    pool (at most `per_host` at a time per image host) with a Range request
+    for its first `probe_bytes`, enough to read the type and dimensions.
+    Candidates that are definitely not product images (not images, SVGs,
+    missing (404), 1px placeholders) are always dropped. Real images smaller
+    than `min_side` or more elongated than `max_aspect` are weak: dropped by
+    default (the fast path then falls back to the browser), ranked last with
+    `keep_weak` (the browser path, where nothing better is coming). The rest
+    are ordered by a size score that stops growing at `good_side`, so among
+    large images the extraction order still decides; candidates that could
+    not be verified (timeouts, hotlink protection) follow the verified ones.
+    Probe results are cached for `cache_ttl` seconds.
+    """
+
+    def __init__(self, config=None, fetcher=None):
+        self.config = dict(IMAGE_PROBE_CONFIG, **(config or {}))
+        self.fetcher = fetcher or http_fetcher
+        self._cache = OrderedDict()
+        self._loop = None
+        self._host_limits = {}
+        self.stats = {"ranked": 0, "probes": 0, "cache_hits": 0, "rejected": 0, "unverified": 0, "weak": 0}
+
+    # ========== Probing ==========
+
+    def _host_limit(self, url):
+        # Semaphores are loop-bound (recreated if the pool loop restarted)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._host_limits = {}
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.config["per_host"])
+        return self._host_limits[host]
+
+    def _cached(self, url):
+        entry = self._cache.get(url)
+        if entry is None or entry[1] < time.monotonic():
+            return False, None
+        self._cache.move_to_end(url)
+        self.stats["cache_hits"] += 1
+        return True, entry[0]
+
+    def _store(self, url, probe):
+        self._cache[url] = (probe, time.monotonic() + self.config["cache_ttl"])
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.config["cache_size"]:
+            self._cache.popitem(last=False)
+
+    async def probe(self, url, referer=None):
+        """dict(status, content_type, type, width, height, bytes) for one image URL, None if unreachable"""
+        hit, probe = self._cached(url)
+        if hit:
+            return probe
+        headers = dict(IMAGE_HEADERS, Referer=referer) if referer else IMAGE_HEADERS
+        async with self._host_limit(url):
+            self.stats["probes"] += 1
+            response = await self.fetcher.fetch_range(url, self.config["probe_bytes"], headers, self.config["timeout"])
+        probe = None
+        if response is not None:
+            image_type, width, height = image_info(response["body"])
+            probe = {
+                "status": response["status"],
+                "content_type": response["content_type"],
+                "type": image_type,
+                "width": width,
+                "height": height,
+                "bytes": response["total"],
+            }
+        self._store(url, probe)
+        return probe
+
+    # ========== Ranking ==========
+
+    def score(self, probe):
+        """(group, score): group 2 verified, 1 unverified, 0 weak (small / elongated), None rejected"""
+        if probe is None or probe["status"] in _UNVERIFIED_STATUSES or probe["status"] >= 500:
+            return 1, 0
+        if probe["status"] >= 400:
+            return None, 0
+        if probe["type"] is None:
+            # Unknown format: trust an image content type, an HTML error page is no image
+            is_image = probe["content_type"].startswith("image/") and "svg" not in probe["content_type"]
+            return (1, 0) if is_image else (None, 0)
+        if probe["type"] == "svg":
+            return None, 0
+        width, height = probe["width"], probe["height"]
+        if not width or not height:
+            return 1, 0
+        if width <= 1 or height <= 1:
+            # Tracking pixel / spacer
+            return None, 0
+        aspect = max(width / height, height / width)
+        if min(width, height) < self.config["min_side"] or aspect > self.config["max_aspect"]:
+            return 0, 0
+        good = self.config["good_side"]
+        size = min(width, good) * min(height, good)
+        # Product shots are roughly square to 2:3; wider/taller ones lose score
+        return 2, size * min(1.0, 1.6 / aspect)
+
+    async def rank(self, urls, referer=None, keep_weak=False):
+        """
+        {"image": best candidate or None, "images": accepted candidates best first, "probes": {url: probe}}.
+        With probing disabled the candidates come back in their original order.
+        """
+        candidates = list(dict.fromkeys(u for u in urls if u and u.startswith(('http://', 'https://'))))
+        candidates = candidates[:self.config["max_candidates"]]
+        if not self.config["enabled"] or not candidates:
+            return {"image": candidates[0] if candidates else None, "images": candidates, "probes": {}}
+
+        self.stats["ranked"] += 1
+        with trace_stage("image_probe"):
+            probes = await asyncio.gather(*(self.probe(u, referer) for u in candidates))
+
+        ranked = []
+        for index, (candidate, probe) in enumerate(zip(candidates, probes)):
+            group, score = self.score(probe)
+            if group is None or (group == 0 and not keep_weak):
+                self.stats["rejected"] += 1
+                print(f"[DEBUG] Görsel elendi ({probe}): {candidate}")
+                continue
+            if group == 1:
+                self.stats["unverified"] += 1
+            elif group == 0:
+                self.stats["weak"] += 1
+            ranked.append((-group, -score, index, candidate))
+        images = [candidate for *_, candidate in sorted(ranked)]
+        return {"image": images[0] if images else None, "images": images, "probes": dict(zip(candidates, probes))}
+
+
+# Global instance
+image_prober = ImageProber()
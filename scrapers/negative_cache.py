@@ -0,0 +1,102 @@
+"""
+Negative Cache
+Recent scrape failures per normalised URL with their failure class; TTL grows with consecutive failures
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from scrapers.circuit_breaker import ScrapeBlocked
+from scrapers.config import NEGATIVE_CACHE_CONFIG
+from scrapers.single_flight import flight_key
+
+# Failure classes (also used as circuit breaker reasons)
+TIMEOUT, BLOCK, PARSE_MISS, ERROR = "timeout", "block", "parse_miss", "error"
+
+
+def classify_failure(error):
+    """Failure class of a scrape exception"""
+    if isinstance(error, ScrapeBlocked):
+        return BLOCK
+    if isinstance(error, TimeoutError) or 'Timeout' in type(error).__name__:
+        return TIMEOUT
+    return ERROR
+
+
+class NegativeCache:
+    """
+    Failed URLs are skipped until their entry expires: `base_ttl[class]`
+    seconds after the first failure, doubling with each consecutive failure
+    up to `max_ttl`. A success drops the entry. Expired entries are kept
+    (for `forget_after`) so the next failure continues the streak.
+    Kept separate from the success cache, so a failure never looks like
+    product data. Per process.
+    """
+
+    def __init__(self, enabled=None, base_ttl=None, max_ttl=None, forget_after=None, max_entries=None):
+        config = NEGATIVE_CACHE_CONFIG
+        self.enabled = config["enabled"] if enabled is None else enabled
+        self.base_ttl = dict(config["base_ttl"], **(base_ttl or {}))
+        self.max_ttl = config["max_ttl"] if max_ttl is None else max_ttl
+        self.forget_after = config["forget_after"] if forget_after is None else forget_after
+        self.max_entries = max_entries or config["max_entries"]
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0, "cleared": 0, "failures": {}}
+
+    def get(self, url, bypass=False):
+        """Active failure entry for `url` ({"failure", "failures", "retry_after"}) or None"""
+        if not self.enabled:
+            return None
+        if bypass:
+            self.stats["bypassed"] += 1
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(flight_key(url))
+            if entry is None or now >= entry["until"]:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return {"failure": entry["failure"], "failures": entry["failures"],
+                    "retry_after": round(entry["until"] - now, 1)}
+
+    def record_failure(self, url, failure=ERROR):
+        """Store a failure; returns the TTL it got"""
+        if not self.enabled:
+            return 0
+        key = flight_key(url)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            failures = 1
+            if entry is not None and now - entry["last_failed"] < self.forget_after:
+                failures = entry["failures"] + 1
+            ttl = min(self.max_ttl, self.base_ttl.get(failure, self.base_ttl[ERROR]) * 2 ** (failures - 1))
+            self._entries[key] = {"failure": failure, "failures": failures, "last_failed": now, "until": now + ttl}
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stats["stored"] += 1
+            self.stats["failures"][failure] = self.stats["failures"].get(failure, 0) + 1
+        return ttl
+
+    def record_success(self, url):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._entries.pop(flight_key(url), None) is not None:
+                self.stats["cleared"] += 1
+
+    def summary(self):
+        """Counters plus the number of currently active entries per failure class"""
+        now = time.monotonic()
+        with self._lock:
+            active = {}
+            for entry in self._entries.values():
+                if now < entry["until"]:
+                    active[entry["failure"]] = active.get(entry["failure"], 0) + 1
+            return dict(self.stats, failures=dict(self.stats["failures"]), entries=len(self._entries), active=active)
+
+
+# Global instance
+negative_cache = NegativeCache()
@@ -0,0 +1,220 @@
+"""
+Node Worker Bridge
+Client for long-lived unified_scraper workers (warm puppeteer-extra browser, newline-delimited JSON over stdio)
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import itertools
+import json
+import os
+import subprocess
+import threading
+
+from scrapers.config import NODE_WORKER_CONFIG
+from scrapers.host_registry import SuffixTrie, parse_host
+
+
+class NodeWorkerError(Exception):
+    """The worker answered with an error or exited before answering"""
+
+
+class NodeWorker:
+    """
+    One worker process. Requests carry an id and are written to stdin as one
+    JSON line each; a reader thread resolves the matching future from every
+    response line, so many requests can be in flight at once and complete out
+    of order. Closing stdin lets the worker drain and exit.
+    """
+
+    def __init__(self, command, cwd=None, max_pages=None):
+        env = dict(os.environ, WORKER_MAX_PAGES=str(max_pages)) if max_pages else None
+        self.process = subprocess.Popen(
+            command, cwd=cwd, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding='utf-8', bufsize=1,
+        )
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.served = 0
+        self.rss = 0
+        self._reader = threading.Thread(target=self._read, name=f"node-worker-{self.process.pid}", daemon=True)
+        self._reader.start()
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    @property
+    def alive(self):
+        return self.process.poll() is None and self._reader.is_alive()
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def submit(self, payload):
+        """Send one request; returns a concurrent.futures.Future resolving to the response's `data`"""
+        future = concurrent.futures.Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            try:
+                self.process.stdin.write(json.dumps(dict(payload, id=request_id)) + '\n')
+                self.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                self._pending.pop(request_id, None)
+                future.set_exception(NodeWorkerError(f"Worker {self.pid} not writable: {e}"))
+        # A caller that gives up (timeout / cancel) must not leave the id pending
+        future.add_done_callback(lambda f: self._forget(request_id))
+        return future
+
+    def _forget(self, request_id):
+        with self._lock:
+            self._pending.pop(request_id, None)
+
+    def _read(self):
+        for line in self.process.stdout:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                print(f"[UYARI] Node worker {self.pid} geçersiz satır: {line[:200]!r}")
+                continue
+            self.rss = response.get("rss") or self.rss
+            with self._lock:
+                future = self._pending.pop(response.get("id"), None)
+                if response.get("id") is not None:
+                    self.served += 1
+            if future is None or future.done():
+                continue
+            if response.get("ok"):
+                future.set_result(response.get("data") or {})
+            else:
+                future.set_exception(NodeWorkerError(response.get("error") or "unknown error"))
+
+        # stdout closed: the process exited (crash, kill or drained shutdown)
+        code = self.process.wait()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(NodeWorkerError(f"Worker {self.pid} exited with code {code}"))
+
+    def close(self, timeout=10):
+        """Drain and stop: close stdin, wait for the exit, kill if it hangs"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self._reader.join(timeout)
+
+
+class NodeWorkerPool:
+    """
+    A few NodeWorkers started on first use. Each request goes to the live
+    worker with the fewest in-flight requests. Workers that crashed are
+    replaced on the next request; workers past `max_rss_mb` or
+    `max_requests` are retired (drained in the background) and replaced.
+    Thread-safe; `scrape()` blocks, `scrape_async()` awaits.
+    """
+
+    def __init__(self, size=None, command=None, cwd=None, max_pages=None, request_timeout=None,
+                 max_rss_mb=None, max_requests=None, domains=None, enabled=None):
+        config = NODE_WORKER_CONFIG
+        self.enabled = config["enabled"] if enabled is None else enabled
+        self.size = max(1, size or config["workers"])
+        self.command = list(command or config["command"])
+        self.cwd = config["cwd"] if cwd is None else cwd
+        self.max_pages = max_pages or config["max_pages"]
+        self.request_timeout = request_timeout or config["request_timeout"]
+        self.max_rss_mb = max_rss_mb or config["max_rss_mb"]
+        self.max_requests = max_requests or config["max_requests"]
+        self._lock = threading.Lock()
+        self._workers = []
+        self._domains = SuffixTrie()
+        for domain in (domains or config["domains"]):
+            self._domains.insert(domain, True)
+        self.stats = {"requests": 0, "errors": 0, "timeouts": 0, "started": 0, "restarted": 0, "recycled": 0}
+
+    def routes(self, url):
+        """Whether `url` should be scraped by the Node workers"""
+        return self.enabled and self._domains.match(parse_host(url))[0] is not None
+
+    def _retire(self, worker):
+        self.stats["recycled"] += 1
+        threading.Thread(target=worker.close, name=f"node-worker-retire-{worker.pid}", daemon=True).start()
+
+    def _worker(self):
+        with self._lock:
+            for worker in list(self._workers):
+                if not worker.alive:
+                    print(f"[UYARI] Node worker {worker.pid} kapanmış (kod {worker.process.poll()}), yeniden başlatılıyor")
+                    self._workers.remove(worker)
+                    self.stats["restarted"] += 1
+                elif worker.rss > self.max_rss_mb * 1024 * 1024 or worker.served >= self.max_requests:
+                    print(f"[DEBUG] Node worker {worker.pid} yenileniyor "
+                          f"({worker.rss // (1024 * 1024)} MB, {worker.served} istek)")
+                    self._workers.remove(worker)
+                    self._retire(worker)
+            while len(self._workers) < self.size:
+                self._workers.append(NodeWorker(self.command, self.cwd, self.max_pages))
+                self.stats["started"] += 1
+            return min(self._workers, key=lambda worker: worker.pending)
+
+    def submit(self, url, timeout=None):
+        """Future of the worker's data for `url`"""
+        timeout = timeout or self.request_timeout
+        self.stats["requests"] += 1
+        # Navigation gives up before the client does, so the worker reports its own timeout
+        return self._worker().submit({"op": "scrape", "url": url, "timeout": int(timeout * 750)})
+
+    def scrape(self, url, timeout=None):
+        """Worker data for `url`; raises NodeWorkerError or TimeoutError"""
+        timeout = timeout or self.request_timeout
+        future = self.submit(url, timeout)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.stats["timeouts"] += 1
+            raise TimeoutError(f"Node worker did not answer within {timeout}s: {url}")
+        except NodeWorkerError:
+            self.stats["errors"] += 1
+            raise
+
+    async def scrape_async(self, url, timeout=None):
+        """scrape() for coroutines (does not block the event loop)"""
+        timeout = timeout or self.request_timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self.submit(url, timeout)), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        except NodeWorkerError:
+            self.stats["errors"] += 1
+            raise
+
+    def workers(self):
+        """pid / in-flight / served / RSS per live worker"""
+        with self._lock:
+            return [
+                {"pid": worker.pid, "alive": worker.alive, "pending": worker.pending,
+                 "served": worker.served, "rss_mb": round(worker.rss / (1024 * 1024), 1)}
+                for worker in self._workers
+            ]
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+# Global instance
+node_bridge = NodeWorkerPool()
+atexit.register(node_bridge.shutdown)
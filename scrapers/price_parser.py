@@ -0,0 +1,184 @@
+"""
+Price Parser
+One parser for every price string in the app: Turkish/EU/US grouping, currencies, ranges and multi-price text
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Amount tokens, most specific first:
+#   1 299,99 / 1'299.99  grouping with (narrow) no-break spaces or apostrophes
+#   1 299,99             grouping with plain spaces, only when decimals follow (so "100 200" stays two numbers)
+#   1.299,99 / 1,299.99 / 1299.99 / 1.299 / 1299
+NUMBER_RE = re.compile(r"""
+    \d{1,3}(?:[\u00a0\u202f']\d{3})+(?:[.,]\d{1,2})?(?!\d)
+  | \d{1,3}(?:\ \d{3})+[.,]\d{1,2}(?!\d)
+  | \d+(?:[.,]\d+)*
+""", re.X)
+
+GROUPING_CHARS_RE = re.compile(r"[\s\u00a0\u202f']")
+
+# Letter codes may touch digits ("1.299,99TL") but not other letters ("TLS", "ÖTL")
+CURRENCY_RE = re.compile(r"₺|\$|€|£|(?<![^\W\d_])(?:TL|TRY|USD|EUR|GBP)(?![^\W\d_])", re.I)
+CURRENCY_CODES = {
+    "₺": "TRY", "tl": "TRY", "try": "TRY",
+    "$": "USD", "usd": "USD",
+    "€": "EUR", "eur": "EUR",
+    "£": "GBP", "gbp": "GBP",
+}
+
+# Text between two amounts that makes them a range ("1.299 - 1.599 TL", "₺100 – ₺150")
+RANGE_GAP_RE = re.compile(r"^\s*(?:₺|TL|TRY|\$|USD|€|EUR|£|GBP)?\s*[-–—~]\s*(?:₺|TL|TRY|\$|USD|€|EUR|£|GBP)?\s*$", re.I)
+
+# How far (characters of whitespace) a currency mark may sit from the amount it belongs to
+CURRENCY_WINDOW = 3
+
+# Longest string whose parse is cached (price fields, not page texts)
+CACHE_MAX_LENGTH = 256
+
+PriceInfo = namedtuple("PriceInfo", ["amount", "currency", "values", "is_range"])
+
+
+def _to_float(token):
+    """Float value of one amount token, deciding which separator is the decimal point"""
+    token = GROUPING_CHARS_RE.sub("", token)
+    last_dot, last_comma = token.rfind("."), token.rfind(",")
+
+    if last_dot >= 0 and last_comma >= 0:
+        # Both present: the right-most one is the decimal separator (1.299,99 / 1,299.99)
+        decimal = "," if last_comma > last_dot else "."
+        group = "." if decimal == "," else ","
+        token = token.replace(group, "").replace(decimal, ".")
+    elif last_dot >= 0 or last_comma >= 0:
+        sep = "." if last_dot >= 0 else ","
+        integer, _, fraction = token.rpartition(sep)
+        if token.count(sep) > 1 or (len(fraction) == 3 and integer.lstrip("0")):
+            # 1.299.999 / 1.299 / 1,299: grouping
+            token = token.replace(sep, "")
+        else:
+            # 12.99 / 129,90 / 0.299: decimal
+            token = token.replace(sep, ".")
+
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def detect_currency(text):
+    """ISO code of the first currency mark in `text` (TRY/USD/EUR/GBP) or None"""
+    match = CURRENCY_RE.search(text or "")
+    return CURRENCY_CODES.get(match.group(0).lower()) if match else None
+
+
+def _currency_owners(text, spans):
+    """Indexes of the amounts that own a currency mark ("1.299 TL 38" -> only 1.299)"""
+    # Spans and marks are both in text order and never overlap, so one pass suffices:
+    # only the nearest amount on either side of a mark can be separated from it by spaces alone
+    owners = set()
+    i = 0
+    for mark in CURRENCY_RE.finditer(text):
+        while i < len(spans) and spans[i][1] <= mark.start():
+            i += 1
+        # Suffix style ("1.299 TL") first, then prefix style ("₺1.299", "TL 1.299")
+        if i > 0:
+            end = spans[i - 1][1]
+            if mark.start() - end <= CURRENCY_WINDOW and not text[end:mark.start()].strip(" \u00a0\u202f"):
+                owners.add(i - 1)
+                continue
+        if i < len(spans):
+            start = spans[i][0]
+            if start - mark.end() <= CURRENCY_WINDOW and not text[mark.end():start].strip(" \u00a0\u202f"):
+                owners.add(i)
+    return owners
+
+
+def _parse_text(text):
+    """(values, is_range, currency) for a string; short strings (field values) are cached"""
+    if len(text) <= CACHE_MAX_LENGTH:
+        return _parse_text_cached(text)
+    return _parse_text_uncached(text)
+
+
+def _parse_text_uncached(text):
+    candidates = []
+    for match in NUMBER_RE.finditer(text):
+        start, end = match.span()
+        # "%20 indirim" / "20%" are discounts, not prices
+        if text[end:end + 1] == "%" or text[max(0, start - 1):start] == "%":
+            continue
+        value = _to_float(match.group(0))
+        if value is not None:
+            candidates.append((value, start, end, False))
+
+    owners = _currency_owners(text, [(c[1], c[2]) for c in candidates])
+    candidates = [c[:3] + (i in owners,) for i, c in enumerate(candidates)]
+
+    # "1.299 - 1.599 TL": both ends of a range share the currency mark
+    ranges = [
+        i for i in range(len(candidates) - 1)
+        if RANGE_GAP_RE.match(text[candidates[i][2]:candidates[i + 1][1]])
+    ]
+    for i in ranges:
+        if candidates[i][3] or candidates[i + 1][3]:
+            candidates[i] = candidates[i][:3] + (True,)
+            candidates[i + 1] = candidates[i + 1][:3] + (True,)
+
+    # When some amounts carry a currency, the bare numbers are sizes, counts or installments
+    if any(c[3] for c in candidates):
+        candidates = [c for c in candidates if c[3]]
+
+    values = tuple(c[0] for c in candidates)
+    is_range = len(candidates) == 2 and bool(RANGE_GAP_RE.match(text[candidates[0][2]:candidates[1][1]]))
+    return values, is_range, detect_currency(text)
+
+
+# Field values repeat a lot; whole page texts (regex tier) would only bloat the cache
+_parse_text_cached = lru_cache(maxsize=8192)(_parse_text_uncached)
+
+
+def parse_price_info(value):
+    """
+    Full parse of one price string.
+
+    Returns PriceInfo(amount, currency, values, is_range): `values` are all
+    amounts in order, `amount` is the first one (the low end for ranges).
+    """
+    if value is None or isinstance(value, bool):
+        return PriceInfo(None, None, (), False)
+    if isinstance(value, (int, float)):
+        return PriceInfo(float(value), None, (float(value),), False)
+    values, is_range, currency = _parse_text(str(value).strip())
+    return PriceInfo(values[0] if values else None, currency, values, is_range)
+
+
+def parse_price(value, default=None):
+    """Numeric amount of a price string/number ("1.299,99 TL" -> 1299.99); `default` if none found"""
+    amount = parse_price_info(value).amount
+    return default if amount is None else amount
+
+
+def parse_prices(value):
+    """Every amount in a multi-price string ("1.599,99 TL 1.299,99 TL" -> [1599.99, 1299.99])"""
+    return list(parse_price_info(value).values)
+
+
+def parse_many(values, default=None):
+    """parse_price over a list (history charts, search filters, price checks); same length as input"""
+    result = []
+    for value in values:
+        if isinstance(value, str):
+            parsed = _parse_text(value.strip())[0]
+            result.append(parsed[0] if parsed else default)
+        else:
+            result.append(parse_price(value, default))
+    return result
+
+
+def format_price(value, currency="TL"):
+    """Turkish display format: 1299.9 -> "1.299,90 TL" (strings are parsed first); None if no amount"""
+    amount = parse_price(value)
+    if amount is None:
+        return None
+    formatted = f"{amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"{formatted} {currency}" if currency else formatted
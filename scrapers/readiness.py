@@ -0,0 +1,131 @@
+"""
+Page Readiness
+Event-driven replacement for fixed sleeps: waits end as soon as extraction targets exist
+"""
+import time
+
+try:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+except ImportError:
+    PlaywrightTimeoutError = TimeoutError
+
+from scrapers.config import READINESS_CONFIG, get_readiness_deadline
+from scrapers.tracing import current_trace
+
+# Generic price selectors that only match product prices (no mini-cart / filter widgets)
+DEFAULT_PRICE_SELECTORS = [
+    '[itemprop="price"]',
+    '[data-price]',
+    '.product-price',
+    '.product__price',
+    '.current-price',
+    '.sale-price',
+    '.final-price',
+]
+
+# Ready signals, checked in this order
+SIGNALS = ("jsonld", "price", "dom")
+
+# Runs inside the page on every poll. The MutationObserver is installed on the
+# first poll of each document, so the DOM quiet window restarts after navigation.
+READINESS_JS = """
+([signals, priceSelectors, stableMs]) => {
+    let state = window.__scrapeReadiness;
+    if (!state) {
+        state = window.__scrapeReadiness = {mutations: 0, last: performance.now()};
+        new MutationObserver(records => {
+            state.mutations += records.length;
+            state.last = performance.now();
+        }).observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    }
+
+    if (signals.includes('jsonld')) {
+        for (const script of document.querySelectorAll('script[type="application/ld+json"]')) {
+            if (/"@type"\\s*:\\s*\\[?\\s*"Product"/.test(script.textContent)) return 'jsonld';
+        }
+    }
+
+    if (signals.includes('price')) {
+        for (const selector of priceSelectors) {
+            let el = null;
+            try { el = document.querySelector(selector); } catch (e) { continue; }
+            const text = el && (el.textContent || el.getAttribute('content') || '');
+            if (text && /\\d/.test(text)) return 'price';
+        }
+    }
+
+    if (signals.includes('dom') && document.readyState !== 'loading' && document.body
+            && performance.now() - state.last >= stableMs) {
+        return 'dom-stable';
+    }
+    return false;
+}
+"""
+
+# Process-wide wait timings, keyed by wait label
+READINESS_STATS = {}
+
+
+def _record(label, reason, elapsed_ms):
+    stats = READINESS_STATS.setdefault(label, {
+        "count": 0, "timeouts": 0, "total_ms": 0, "max_ms": 0, "reasons": {}
+    })
+    stats["count"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    if reason == "timeout":
+        stats["timeouts"] += 1
+    stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+
+
+def get_readiness_stats():
+    """Per-label wait summary (count, timeouts, avg/max milliseconds, reasons)"""
+    summary = {}
+    for label, stats in READINESS_STATS.items():
+        summary[label] = dict(stats, avg_ms=round(stats["total_ms"] / stats["count"]) if stats["count"] else 0)
+    return summary
+
+
+async def wait_until_ready(page, price_selectors=None, deadline=None, signals=SIGNALS,
+                           stable_ms=None, label="content"):
+    """
+    Wait until the page has a JSON-LD Product, a price element with digits or a
+    quiet DOM - whichever comes first - but never longer than `deadline` ms.
+
+    Returns dict(label, reason, elapsed_ms, timed_out). Never raises: a timeout
+    or navigation during the wait just means extraction runs on what is there.
+    """
+    deadline = deadline or get_readiness_deadline(label)
+    stable_ms = stable_ms or READINESS_CONFIG["stable_ms"]
+    selectors = list(price_selectors or []) + DEFAULT_PRICE_SELECTORS
+
+    started = time.monotonic()
+    try:
+        handle = await page.wait_for_function(
+            READINESS_JS,
+            arg=[list(signals), selectors, stable_ms],
+            polling=READINESS_CONFIG["poll_interval"],
+            timeout=deadline,
+        )
+        reason = await handle.json_value()
+    except PlaywrightTimeoutError:
+        reason = "timeout"
+    except Exception as e:
+        # Page navigated or closed mid-wait
+        print(f"[DEBUG] Readiness bekleme hatası ({label}): {e}")
+        reason = "error"
+
+    elapsed = time.monotonic() - started
+    elapsed_ms = int(elapsed * 1000)
+    _record(label, reason, elapsed_ms)
+    trace = current_trace()
+    if trace is not None:
+        trace.add("readiness" if label == "content" else f"readiness.{label}", elapsed)
+    print(f"[DEBUG] Sayfa hazır ({label}): {reason} - {elapsed_ms}ms")
+    return {"label": label, "reason": reason, "elapsed_ms": elapsed_ms, "timed_out": reason == "timeout"}
+
+
+async def wait_for_dom_stable(page, deadline=None, stable_ms=None, label="dom"):
+    """Wait only for a quiet DOM (warm-up visits, lazy-load scrolling)"""
+    return await wait_until_ready(page, deadline=deadline, signals=("dom",),
+                                  stable_ms=stable_ms, label=label)
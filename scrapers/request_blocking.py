@@ -0,0 +1,118 @@
+"""
+Request Blocking
+page.route based filter that keeps heavy assets and trackers out of scrapes
+"""
+import os
+import base64
+import weakref
+from urllib.parse import urlparse
+
+from scrapers.config import DEFAULT_BLOCKING, get_site_config
+
+# 1x1 transparent GIF served instead of real image bytes. Fulfilling (rather than
+# aborting) keeps <img src> intact and avoids onerror handlers swapping it out.
+_PLACEHOLDER_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+# Process-wide counters (all scrapes)
+BLOCKING_STATS = {"allowed": 0, "blocked": 0, "blocked_by_type": {}}
+
+# Page / BrowserContext -> attached RequestBlocker (for blocked_images)
+_BLOCKERS = weakref.WeakKeyDictionary()
+
+
+def blocking_enabled():
+    """Global kill switch: SCRAPER_BLOCK_REQUESTS=0 disables blocking"""
+    return os.environ.get('SCRAPER_BLOCK_REQUESTS', '1') not in ('0', 'false', 'False')
+
+
+def get_blocking_config(url):
+    """Merge the default blocking profile with the site's overrides"""
+    site_config = get_site_config(url) or {}
+    site_blocking = site_config.get("blocking", {})
+
+    return {
+        "resource_types": set(site_blocking.get("resource_types", DEFAULT_BLOCKING["resource_types"])),
+        "deny": list(DEFAULT_BLOCKING["deny"]) + list(site_blocking.get("deny", [])),
+        "allow": list(DEFAULT_BLOCKING["allow"]) + list(site_blocking.get("allow", [])),
+    }
+
+
+class RequestBlocker:
+    """Blocks requests for one scrape and counts what it let through"""
+
+    def __init__(self, url, config=None):
+        self.url = url
+        self.config = config or get_blocking_config(url)
+        self.stats = {"allowed": 0, "blocked": 0, "blocked_by_type": {}}
+        # Image URLs answered with the placeholder GIF
+        self.blocked_images = set()
+
+    def should_block(self, request_url, resource_type):
+        """Decide whether a request is dropped (documents are never blocked)"""
+        if resource_type == "document":
+            return False
+
+        url_lower = request_url.lower()
+        if any(pattern in url_lower for pattern in self.config["allow"]):
+            return False
+        if resource_type in self.config["resource_types"]:
+            return True
+
+        host = urlparse(url_lower).netloc
+        return any(pattern in host or pattern in url_lower for pattern in self.config["deny"])
+
+    def _count(self, blocked, resource_type):
+        key = "blocked" if blocked else "allowed"
+        self.stats[key] += 1
+        BLOCKING_STATS[key] += 1
+        if blocked:
+            for stats in (self.stats, BLOCKING_STATS):
+                by_type = stats["blocked_by_type"]
+                by_type[resource_type] = by_type.get(resource_type, 0) + 1
+
+    async def _handle(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        blocked = self.should_block(request.url, resource_type)
+        self._count(blocked, resource_type)
+
+        try:
+            if not blocked:
+                await route.continue_()
+            elif resource_type == "image":
+                self.blocked_images.add(request.url)
+                await route.fulfill(status=200, content_type="image/gif", body=_PLACEHOLDER_GIF)
+            else:
+                await route.abort("blockedbyclient")
+        except Exception:
+            # Page/context closed while the request was in flight
+            pass
+
+    async def attach(self, target):
+        """Install on a Page or BrowserContext (context also covers warm-up navigations)"""
+        await target.route("**/*", self._handle)
+        _BLOCKERS[target] = self
+        return self
+
+    def summary(self):
+        return f"{self.stats['blocked']} blocked / {self.stats['allowed']} allowed"
+
+
+def blocked_images(page):
+    """Image URLs of `page` (or its context) that a RequestBlocker answered with the placeholder"""
+    urls = set()
+    for target in (page, getattr(page, "context", None)):
+        try:
+            blocker = _BLOCKERS.get(target)
+        except TypeError:
+            blocker = None
+        if blocker:
+            urls |= blocker.blocked_images
+    return urls
+
+
+async def block_requests(target, url, config=None):
+    """Attach a RequestBlocker for `url` to a page or context; None when disabled"""
+    if not blocking_enabled():
+        return None
+    return await RequestBlocker(url, config).attach(target)
@@ -0,0 +1,95 @@
+"""
+Retry Policy
+Awaited exponential backoff with jitter, per-failure-class retry budgets and strategy escalation for scrape attempts
+"""
+import asyncio
+import logging
+import random
+
+from scrapers.circuit_breaker import is_block_title
+from scrapers.config import RETRY_CONFIG
+from scrapers.negative_cache import classify_failure, BLOCK, PARSE_MISS
+from scrapers.tracing import trace_stage
+
+# Attempt strategies, lightest first; an escalation moves later attempts one step right
+STRATEGIES = ("default", "thorough")
+
+
+def classify_result(result):
+    """Failure class of an attempt's result, None when it is usable"""
+    if not result or not result.get("title"):
+        return PARSE_MISS
+    if is_block_title(result["title"]):
+        return BLOCK
+    return None
+
+
+class RetryPolicy:
+    """
+    Runs `attempt(url, strategy)` until it returns a usable result.
+
+    Each failed attempt is classified (timeout / block / parse_miss / error)
+    and retried while its class has budget left and `max_attempts` is not used
+    up. Waits grow as base_delay * 2**n (capped at `max_delay`, +-`jitter`)
+    and are awaited, so retries share the caller's event loop and browser.
+    Failures in `escalate_on` switch later attempts to the next heavier
+    strategy.
+    """
+
+    def __init__(self, max_attempts=None, budgets=None, base_delay=None, max_delay=None, jitter=None,
+                 escalate_on=None):
+        config = RETRY_CONFIG
+        self.max_attempts = max(1, max_attempts or config["max_attempts"])
+        self.budgets = dict(config["budgets"], **(budgets or {}))
+        self.base_delay = config["base_delay"] if base_delay is None else base_delay
+        self.max_delay = config["max_delay"] if max_delay is None else max_delay
+        self.jitter = config["jitter"] if jitter is None else jitter
+        self.escalate_on = frozenset(config["escalate_on"] if escalate_on is None else escalate_on)
+        self.stats = {"attempts": 0, "retries": 0, "escalations": 0, "succeeded": 0, "exhausted": 0, "failures": {}}
+
+    def delay(self, retry):
+        """Seconds to wait before retry number `retry` (1-based)"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run(self, url, attempt):
+        """
+        Result of the first usable attempt. When the attempts run out, the last
+        result is returned if it at least has a title (bot pages stay visible
+        to the caller), else None.
+        """
+        used = {}
+        level = 0
+        for number in range(1, self.max_attempts + 1):
+            strategy = STRATEGIES[level]
+            self.stats["attempts"] += 1
+            try:
+                result = await attempt(url, strategy)
+                failure = classify_result(result)
+            except Exception as e:
+                result, failure = None, classify_failure(e)
+                logging.debug(f"Attempt {number}/{self.max_attempts} ({strategy}) failed: {e}")
+            if failure is None:
+                self.stats["succeeded"] += 1
+                return result
+
+            self.stats["failures"][failure] = self.stats["failures"].get(failure, 0) + 1
+            used[failure] = used.get(failure, 0) + 1
+            if number == self.max_attempts or used[failure] > self.budgets.get(failure, 0):
+                break
+            if failure in self.escalate_on and level < len(STRATEGIES) - 1:
+                level += 1
+                self.stats["escalations"] += 1
+            self.stats["retries"] += 1
+            delay = self.delay(number)
+            logging.debug(f"Retrying {url} in {delay:.1f}s after {failure} (strategy: {STRATEGIES[level]})")
+            with trace_stage("retry_wait"):
+                await asyncio.sleep(delay)
+
+        self.stats["exhausted"] += 1
+        logging.error(f"All attempts failed for {url} (last failure: {failure})")
+        return result if result and result.get("title") else None
+
+
+# Global instance
+retry_policy = RetryPolicy()
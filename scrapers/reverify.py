@@ -0,0 +1,84 @@
+"""
+Sampled Re-verification
+Re-scrapes a random sample of newly added products off the request path and tracks disagreement per domain
+"""
+import asyncio
+import random
+import threading
+
+from scrapers.browser_pool import browser_pool
+from scrapers.config import REVERIFY_CONFIG
+from scrapers.scheduler import domain_key
+
+
+class ReverifySampler:
+    """
+    Background spot-checks of scrape results.
+
+    A sampled URL is scraped again (fresh, no cache) on the browser pool loop;
+    `check(fresh_data)` then runs in a worker thread and returns the list of
+    fields that disagreed (and may fix the stored row).
+    """
+
+    def __init__(self, sample_rate=None, pool=None):
+        self.sample_rate = REVERIFY_CONFIG["sample_rate"] if sample_rate is None else sample_rate
+        self.pool = pool or browser_pool
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def should_sample(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def maybe_schedule(self, url, rescrape, check):
+        """Schedule a re-verification for `url` if it falls in the sample; never blocks"""
+        if not self.should_sample():
+            return None
+        try:
+            return self.pool.submit(self._verify(url, rescrape, check))
+        except Exception as e:
+            print(f"[UYARI] Yeniden doğrulama planlanamadı ({url}): {e}")
+            return None
+
+    async def _verify(self, url, rescrape, check):
+        try:
+            fresh_data = await rescrape(url)
+            if not fresh_data:
+                self._record(url, None)
+                return None
+            # check() touches the database; keep it off the event loop
+            loop = asyncio.get_running_loop()
+            fields = await loop.run_in_executor(None, check, fresh_data)
+            self._record(url, fields or [])
+            return fields
+        except Exception as e:
+            print(f"[UYARI] Yeniden doğrulama hatası ({url}): {e}")
+            self._record(url, None)
+            return None
+
+    def _record(self, url, fields):
+        domain = domain_key(url)
+        with self._lock:
+            stats = self._stats.setdefault(domain, {"checked": 0, "disagreed": 0, "errors": 0, "fields": {}})
+            if fields is None:
+                stats["errors"] += 1
+                return
+            stats["checked"] += 1
+            if fields:
+                stats["disagreed"] += 1
+                for field in fields:
+                    stats["fields"][field] = stats["fields"].get(field, 0) + 1
+        if fields:
+            print(f"[DEBUG] Yeniden doğrulama uyuşmazlığı ({domain}): {', '.join(fields)}")
+
+    def stats(self):
+        """Per-domain counters with disagreement_rate (disagreed / checked)"""
+        with self._lock:
+            summary = {}
+            for domain, stats in self._stats.items():
+                rate = stats["disagreed"] / stats["checked"] if stats["checked"] else 0.0
+                summary[domain] = dict(stats, fields=dict(stats["fields"]), disagreement_rate=round(rate, 3))
+            return summary
+
+
+# Global instance
+reverify_sampler = ReverifySampler()
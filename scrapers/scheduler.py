@@ -0,0 +1,297 @@
+"""
+Scrape Scheduler
+Politeness layer for all scrape traffic: per-domain token buckets and concurrency caps,
+a global cap, fair queuing across users, results in completion order
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from scrapers.browser_pool import browser_pool
+from scrapers.config import SCHEDULER_CONFIG, get_site_config
+from scrapers.tracing import tracer
+
+# Who a scrape is for (user id, "price-tracking", ...); slots are handed out round-robin per owner
+_owner = contextvars.ContextVar("scrape_owner", default=None)
+
+# Domains whose slot the current task already holds: nested scheduled calls
+# (run_batch -> app.scrape_product, ScrapingService -> scraper) must not queue twice
+_held = contextvars.ContextVar("scheduler_held", default=frozenset())
+
+
+class QueueTimeout(TimeoutError):
+    """No scrape slot became free in time (local congestion, not a failure of the shop)"""
+
+
+# Seconds a sync caller waits past queue_timeout for the loop itself to answer
+QUEUE_TIMEOUT_MARGIN = 5
+
+
+def domain_key(url):
+    """Host used for per-domain limits (www. stripped)"""
+    return urlparse(url).netloc.lower().replace('www.', '')
+
+
+@contextmanager
+def scrape_owner(owner):
+    """Attribute scrapes started in this block to `owner` for fair queuing"""
+    token = _owner.set(owner)
+    try:
+        yield
+    finally:
+        _owner.reset(token)
+
+
+class FairLimiter:
+    """
+    Counting semaphore that hands free slots to waiting owners round-robin,
+    so one user's 50-URL import cannot starve another user's single scrape.
+    Loop-bound like asyncio.Semaphore.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._queues = OrderedDict()
+
+    @property
+    def waiting(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def waiting_by_owner(self):
+        return {str(owner): len(queue) for owner, queue in self._queues.items()}
+
+    async def acquire(self, owner=None):
+        if self.active < self.limit and not self._queues:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(owner, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted in the same iteration we were cancelled: pass the slot on
+                self.release()
+            else:
+                queue = self._queues.get(owner)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self._queues[owner]
+            raise
+
+    def release(self):
+        self.active -= 1
+        while self.active < self.limit and self._queues:
+            owner, queue = self._queues.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                # Owner goes to the back of the rotation
+                self._queues[owner] = queue
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+
+
+class TokenBucket:
+    """`rate` requests per second with bursts of up to `burst`; rate <= 0 disables pacing"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+
+    def reserve(self):
+        """Take one token; returns the seconds to wait before using it (tokens may go negative)"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class ScrapeScheduler:
+    """
+    Runs scrape coroutines on the browser pool's event loop.
+
+    A scrape takes, in order: a slot of its domain (`max_concurrency` in the
+    site config, else `per_domain`), a token of the domain's bucket
+    (`requests_per_second` / `burst` in the site config, else the defaults)
+    and one of the `max_concurrency` global slots. Waiting for the domain
+    first keeps requests for a busy shop from holding global slots other
+    shops could use. Both slot kinds are handed out round-robin across
+    owners. Sync callers use `call()`.
+    """
+
+    def __init__(self, max_concurrency=None, per_domain=None, rate=None, burst=None, pool=None, queue_timeout=None):
+        self.max_concurrency = max(1, max_concurrency or SCHEDULER_CONFIG["max_concurrency"])
+        self.per_domain = max(1, per_domain or SCHEDULER_CONFIG["per_domain"])
+        self.rate = SCHEDULER_CONFIG["rate"] if rate is None else rate
+        self.burst = SCHEDULER_CONFIG["burst"] if burst is None else burst
+        self.queue_timeout = queue_timeout or SCHEDULER_CONFIG["queue_timeout"]
+        self.pool = pool or browser_pool
+        self._loop = None
+        self._global = None
+        self._domains = {}
+        self._buckets = {}
+        self.stats = {"scheduled": 0, "completed": 0, "failed": 0, "in_flight": 0, "paced": 0, "queue_timeouts": 0}
+
+    def _domain_settings(self, domain):
+        site = get_site_config(domain) or {}
+        return (
+            max(1, site.get("max_concurrency", self.per_domain)),
+            site.get("requests_per_second", self.rate),
+            site.get("burst", self.burst),
+        )
+
+    def _limits(self, domain):
+        # Limiters must be created on the loop that awaits them (recreated if the pool restarted)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._global = FairLimiter(self.max_concurrency)
+            self._domains = {}
+            self._buckets = {}
+        if domain not in self._domains:
+            limit, rate, burst = self._domain_settings(domain)
+            self._domains[domain] = FairLimiter(limit)
+            self._buckets[domain] = TokenBucket(rate, burst)
+        return self._global, self._domains[domain], self._buckets[domain]
+
+    async def _acquire(self, domain, owner):
+        global_limit, domain_limit, bucket = self._limits(domain)
+        await domain_limit.acquire(owner)
+        try:
+            delay = bucket.reserve()
+            if delay:
+                self.stats["paced"] += 1
+                await asyncio.sleep(delay)
+            await global_limit.acquire(owner)
+        except BaseException:
+            domain_limit.release()
+            raise
+        self.stats["in_flight"] += 1
+
+    def _release(self, domain):
+        self.stats["in_flight"] -= 1
+        self._global.release()
+        self._domains[domain].release()
+
+    async def run(self, url, scrape, owner=None):
+        """Run `scrape(url)` once the domain slot, a domain token and a global slot are available"""
+        domain = domain_key(url)
+        held = _held.get()
+        if domain in held:
+            return await scrape(url)
+        with tracer.trace(url, "scheduler") as trace:
+            queued = time.perf_counter()
+            await self._acquire(domain, owner if owner is not None else _owner.get())
+            if trace is not None:
+                trace.add("queue_wait", time.perf_counter() - queued)
+            token = _held.set(held | {domain})
+            try:
+                return await scrape(url)
+            finally:
+                _held.reset(token)
+                self._release(domain)
+
+    def call(self, url, func, *args, owner=None):
+        """
+        Run a blocking `func(url, *args)` in the calling thread under the same limits.
+        For sync scrape paths (ScrapingService, Celery tasks, RenderScraper); not from the loop itself.
+        Raises QueueTimeout (a TimeoutError) if no slot is free within `queue_timeout` seconds.
+        """
+        domain = domain_key(url)
+        held = _held.get()
+        if domain in held:
+            return func(url, *args)
+        with tracer.trace(url, "scheduler") as trace:
+            queued = time.perf_counter()
+            # The deadline runs on the loop, so a waiter that times out leaves the FairLimiter queue
+            # there (a slot granted at the same moment is kept); the thread-side wait only adds a
+            # margin for a stalled loop
+            acquired = self.pool.submit(asyncio.wait_for(
+                self._acquire(domain, owner if owner is not None else _owner.get()), self.queue_timeout))
+            try:
+                acquired.result(self.queue_timeout + QUEUE_TIMEOUT_MARGIN)
+            except (asyncio.TimeoutError, concurrent.futures.TimeoutError):
+                acquired.cancel()
+                self.stats["queue_timeouts"] += 1
+                raise QueueTimeout(f"No scrape slot for {domain} within {self.queue_timeout}s: {url}")
+            if trace is not None:
+                trace.add("queue_wait", time.perf_counter() - queued)
+            token = _held.set(held | {domain})
+            try:
+                return func(url, *args)
+            finally:
+                _held.reset(token)
+                self._loop.call_soon_threadsafe(self._release, domain)
+
+    def queue_depths(self):
+        """Per-domain waiting / in-flight counts (busiest first) plus the global slot usage"""
+        loop = self._loop
+        if loop is None or self._global is None:
+            return {"global": {"active": 0, "waiting": 0, "limit": self.max_concurrency}, "domains": {}}
+        domains = {
+            domain: {
+                "active": limiter.active,
+                "waiting": limiter.waiting,
+                "limit": limiter.limit,
+                "waiting_by_owner": limiter.waiting_by_owner(),
+                "tokens": round(self._buckets[domain].tokens, 2),
+            }
+            for domain, limiter in list(self._domains.items())
+            if limiter.active or limiter.waiting
+        }
+        return {
+            "global": {"active": self._global.active, "waiting": self._global.waiting, "limit": self.max_concurrency},
+            "domains": dict(sorted(domains.items(), key=lambda item: -(item[1]["waiting"] + item[1]["active"]))),
+        }
+
+    def run_batch(self, urls, scrape, timeout=None, owner=None):
+        """
+        Scrape many URLs concurrently from sync code.
+
+        Yields (url, result, error) as each scrape finishes, so callers can
+        persist results immediately. URLs still running at the deadline are
+        cancelled and yielded with a TimeoutError.
+        """
+        timeout = timeout or SCHEDULER_CONFIG["batch_timeout"]
+        started = time.monotonic()
+        futures = {}
+        for url in urls:
+            futures[self.pool.submit(self.run(url, scrape, owner))] = url
+            self.stats["scheduled"] += 1
+
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=timeout):
+                url = futures.pop(future)
+                try:
+                    result, error = future.result(), None
+                    self.stats["completed"] += 1
+                except Exception as e:
+                    result, error = None, e
+                    self.stats["failed"] += 1
+                yield url, result, error
+        except concurrent.futures.TimeoutError:
+            pass
+        finally:
+            # Deadline hit (or caller stopped iterating): cancel what is left
+            for future in futures:
+                future.cancel()
+
+        for url in futures.values():
+            self.stats["failed"] += 1
+            yield url, None, TimeoutError(f"Batch deadline exceeded after {time.monotonic() - started:.0f}s")
+
+
+# Global instance
+scrape_scheduler = ScrapeScheduler()
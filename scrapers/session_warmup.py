@@ -0,0 +1,165 @@
+"""
+Session Warm-up Cache
+Per-domain Playwright storage_state captured once from the shop homepage and reused by new contexts
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from scrapers.browser_pool import browser_pool
+from scrapers.config import SESSION_WARMUP_CONFIG, get_timeout
+from scrapers.readiness import wait_for_dom_stable
+from scrapers.request_blocking import block_requests
+from scrapers.scheduler import domain_key
+from scrapers.tracing import trace_stage
+
+
+class SessionWarmup:
+    """
+    Cookies/localStorage per warm-up domain, in memory and on disk, with a TTL.
+
+    `storage_state(url)` returns a fresh state for the URL's domain, warming
+    up (homepage visit + optional consent click in a throwaway context) only
+    when the state is missing or expired. Concurrent scrapes of one domain
+    share a single warm-up. Domains without a warm-up entry get None.
+    """
+
+    def __init__(self, sites=None, ttl=None, state_dir=None, pool=None):
+        self.sites = SESSION_WARMUP_CONFIG["sites"] if sites is None else sites
+        self.ttl = ttl or SESSION_WARMUP_CONFIG["ttl"]
+        self.state_dir = state_dir or SESSION_WARMUP_CONFIG["state_dir"]
+        self.pool = pool or browser_pool
+        self._lock = threading.Lock()
+        self._states = {}
+        self._loop = None
+        self._domain_locks = {}
+        self.stats = {"hits": 0, "misses": 0, "warmups": 0, "failures": 0, "invalidations": 0}
+
+    def site_for(self, url):
+        """(domain, site settings) of the warm-up entry covering `url`, else (None, None)"""
+        host = domain_key(url)
+        for domain, site in self.sites.items():
+            if host == domain or host.endswith('.' + domain):
+                return domain, site
+        return None, None
+
+    # ========== Storage ==========
+
+    def _path(self, domain):
+        return os.path.join(self.state_dir, hashlib.sha1(domain.encode()).hexdigest() + '.json')
+
+    def _fresh(self, saved_at):
+        return time.time() - saved_at < self.ttl
+
+    def get(self, domain):
+        """Fresh cached state for `domain` (memory first, then disk) or None"""
+        with self._lock:
+            entry = self._states.get(domain)
+        if entry is None:
+            try:
+                with open(self._path(domain), encoding='utf-8') as f:
+                    entry = json.load(f)
+                # Another worker (or a previous run) warmed this domain up
+                with self._lock:
+                    self._states[domain] = entry
+            except (OSError, ValueError):
+                return None
+        if not self._fresh(entry.get("saved_at", 0)):
+            return None
+        return entry.get("state")
+
+    def put(self, domain, state):
+        """Store `state` in memory and atomically on disk (owner-only permissions)"""
+        entry = {"saved_at": time.time(), "state": state}
+        with self._lock:
+            self._states[domain] = entry
+        path = self._path(domain)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[UYARI] Oturum durumu diske yazılamadı ({domain}): {e}")
+
+    def invalidate(self, domain):
+        """Drop the state for `domain` (e.g. the shop answered 403 despite it)"""
+        self.stats["invalidations"] += 1
+        with self._lock:
+            self._states.pop(domain, None)
+        try:
+            os.remove(self._path(domain))
+        except OSError:
+            pass
+
+    # ========== Warm-up ==========
+
+    def _domain_lock(self, domain):
+        # asyncio locks belong to the loop that awaits them (recreated if the loop changed)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._domain_locks = {}
+        if domain not in self._domain_locks:
+            self._domain_locks[domain] = asyncio.Lock()
+        return self._domain_locks[domain]
+
+    async def storage_state(self, url, context_options=None, init_script=None):
+        """State to pass as new_context(storage_state=...) for `url`; None if not needed or warm-up failed"""
+        domain, site = self.site_for(url)
+        if domain is None:
+            return None
+
+        state = self.get(domain)
+        if state is not None:
+            self.stats["hits"] += 1
+            return state
+
+        with trace_stage("warmup"):
+            async with self._domain_lock(domain):
+                # A concurrent scrape may have warmed up while we waited
+                state = self.get(domain)
+                if state is not None:
+                    self.stats["hits"] += 1
+                    return state
+                self.stats["misses"] += 1
+                return await self._warm_up(domain, site, context_options or {}, init_script)
+
+    async def _warm_up(self, domain, site, context_options, init_script):
+        started = time.monotonic()
+        try:
+            async with self.pool.context(**context_options) as context:
+                await block_requests(context, site["url"])
+                page = await context.new_page()
+                if init_script:
+                    await page.add_init_script(init_script)
+                await page.goto(site["url"], wait_until="domcontentloaded", timeout=get_timeout("navigation"))
+                await wait_for_dom_stable(page, label="warmup")
+
+                if site.get("consent_selector"):
+                    try:
+                        await page.click(site["consent_selector"], timeout=get_timeout("element_wait"))
+                        print(f"[DEBUG] Çerezler kabul edildi ({domain})")
+                    except Exception:
+                        pass
+
+                state = await context.storage_state()
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"[UYARI] Warm-up başarısız ({domain}): {e}")
+            return None
+
+        self.put(domain, state)
+        self.stats["warmups"] += 1
+        print(f"[DEBUG] Warm-up tamamlandı ({domain}): {len(state.get('cookies', []))} cookie, "
+              f"{time.monotonic() - started:.1f}s")
+        return state
+
+
+# Global instance
+session_warmup = SessionWarmup()
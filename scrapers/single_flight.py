@@ -0,0 +1,309 @@
+"""
+Single-Flight Scrapes
+Concurrent callers for the same URL share one scrape, inside a worker and across gunicorn workers
+"""
+import asyncio
+import concurrent.futures
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: in-process coalescing only
+    fcntl = None
+
+from scrapers.config import SINGLE_FLIGHT_CONFIG
+from scrapers.tracing import trace_stage
+
+# Query parameters that never change the product a URL points at
+TRACKING_PARAMS = {'gclid', 'fbclid', 'yclid', 'msclkid', '_ga', 'igshid'}
+
+# Shared result files are pruned once every this many writes
+PRUNE_EVERY = 200
+
+
+def flight_key(url):
+    """Normalised URL: host case, www., scheme, fragment, trailing slash and tracking params ignored"""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith('utm_')
+    )
+    key = host + (parsed.path.rstrip('/') or '/')
+    return f"{key}?{urlencode(query)}" if query else key
+
+
+class _LeaderCancelled(Exception):
+    """The leading scrape was cancelled; followers retry instead of sharing the cancellation"""
+
+
+class _FileLock:
+    """Non-blocking flock polled until a deadline (usable from threads and from the event loop)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.contended = False
+        self._fd = None
+
+    def _try(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.contended = True
+            return False
+        # Keep held locks young so pruning never unlinks an active lock file
+        os.utime(self.path)
+        return True
+
+    def acquire(self, timeout, poll_interval):
+        deadline = time.monotonic() + timeout
+        while not self._try():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    async def acquire_async(self, timeout, poll_interval):
+        deadline = time.monotonic() + timeout
+        while not self._try():
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(poll_interval)
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class SingleFlight:
+    """
+    Keyed in-flight registry for one scrape function.
+
+    The first caller for a URL (the leader) runs the scrape; concurrent callers
+    wait on the leader's future and get a copy of its result or its exception.
+    With `cross_process` the leader also takes a per-URL file lock. A worker
+    that had to wait for that lock reuses the result the other worker wrote
+    while it waited instead of scraping again.
+
+    `name` namespaces the lock files, so different scrape functions (with
+    different result formats) never share results. Only results passing
+    `shareable` (default: truthy) are written for other workers; failures,
+    including truthy error placeholders, are not shared, so the next worker
+    tries for itself.
+    """
+
+    def __init__(self, name="scrape", cross_process=None, lock_dir=None, lock_timeout=None, shareable=None):
+        self.name = name
+        self.shareable = shareable or bool
+        if cross_process is None:
+            cross_process = SINGLE_FLIGHT_CONFIG["cross_process"]
+        self.cross_process = cross_process and fcntl is not None
+        self.lock_dir = lock_dir or SINGLE_FLIGHT_CONFIG["lock_dir"]
+        self.lock_timeout = lock_timeout or SINGLE_FLIGHT_CONFIG["lock_timeout"]
+        self.poll_interval = SINGLE_FLIGHT_CONFIG["poll_interval"]
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._writes = 0
+        self.stats = {"leaders": 0, "coalesced": 0, "shared": 0, "lock_timeouts": 0}
+
+    # ========== In-process registry ==========
+
+    def _join(self, key):
+        """Return (future, is_leader) for `key`"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            future = self._inflight[key] = concurrent.futures.Future()
+            self.stats["leaders"] += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def in_flight(self):
+        """Keys currently being scraped in this process"""
+        with self._lock:
+            return list(self._inflight)
+
+    # ========== Shared results (cross-process) ==========
+
+    def _path(self, key, suffix):
+        digest = hashlib.sha1(f"{self.name}:{key}".encode()).hexdigest()
+        return os.path.join(self.lock_dir, digest + suffix)
+
+    def _file_lock(self, key):
+        os.makedirs(self.lock_dir, exist_ok=True)
+        return _FileLock(self._path(key, ".lock"))
+
+    def _read_result(self, key, since):
+        """Result written by another worker after `since` (i.e. while we waited), else None"""
+        path = self._path(key, ".json")
+        try:
+            if os.path.getmtime(path) < since:
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, key, result):
+        if not self.shareable(result):
+            # Failures are not shared: the next worker tries for itself
+            return
+        path = self._path(key, ".json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[UYARI] Single-flight sonucu paylaşılamadı ({key}): {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self, max_age=None):
+        """Delete lock and result files untouched for `max_age` seconds"""
+        cutoff = time.time() - (max_age or SINGLE_FLIGHT_CONFIG["result_max_age"])
+        removed = 0
+        try:
+            names = os.listdir(self.lock_dir)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.lock_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def _shared_or_none(self, key, lock, acquired, waited_since):
+        if not acquired:
+            self.stats["lock_timeouts"] += 1
+            print(f"[UYARI] Single-flight kilidi {self.lock_timeout}s içinde alınamadı, yine de çekiliyor: {key}")
+            return None
+        if lock.contended:
+            shared = self._read_result(key, waited_since)
+            if shared is not None:
+                self.stats["shared"] += 1
+                print(f"[DEBUG] Başka worker'ın sonucu kullanıldı: {key}")
+                return shared
+        return None
+
+    # ========== Leaders ==========
+
+    async def _lead_async(self, key, scrape):
+        if not self.cross_process:
+            return await scrape()
+        lock = self._file_lock(key)
+        waited_since = time.time()
+        acquired = await lock.acquire_async(self.lock_timeout, self.poll_interval)
+        try:
+            shared = self._shared_or_none(key, lock, acquired, waited_since)
+            if shared is not None:
+                return shared
+            result = await scrape()
+            self._write_result(key, result)
+            return result
+        finally:
+            lock.release()
+
+    def _lead(self, key, scrape):
+        if not self.cross_process:
+            return scrape()
+        lock = self._file_lock(key)
+        waited_since = time.time()
+        acquired = lock.acquire(self.lock_timeout, self.poll_interval)
+        try:
+            shared = self._shared_or_none(key, lock, acquired, waited_since)
+            if shared is not None:
+                return shared
+            result = scrape()
+            self._write_result(key, result)
+            return result
+        finally:
+            lock.release()
+
+    # ========== Public API ==========
+
+    async def run_async(self, url, scrape):
+        """`await scrape()` once for all concurrent callers of `url` (coroutine callers)"""
+        key = flight_key(url)
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    # shield: a cancelled follower must not cancel the shared future
+                    with trace_stage("flight_wait"):
+                        result = await asyncio.shield(asyncio.wrap_future(future))
+                except _LeaderCancelled:
+                    continue
+                print(f"[DEBUG] Devam eden scrape sonucu paylaşıldı: {url}")
+                return copy.deepcopy(result)
+
+            try:
+                result = await self._lead_async(key, scrape)
+            except asyncio.CancelledError:
+                self._finish(key, future, error=_LeaderCancelled(key))
+                raise
+            except Exception as e:
+                self._finish(key, future, error=e)
+                raise
+            self._finish(key, future, result)
+            return result
+
+    def run(self, url, scrape):
+        """Call `scrape()` once for all concurrent callers of `url` (thread callers)"""
+        key = flight_key(url)
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    with trace_stage("flight_wait"):
+                        result = future.result()
+                except _LeaderCancelled:
+                    continue
+                print(f"[DEBUG] Devam eden scrape sonucu paylaşıldı: {url}")
+                return copy.deepcopy(result)
+
+            try:
+                result = self._lead(key, scrape)
+            except BaseException as e:
+                self._finish(key, future, error=e if isinstance(e, Exception) else _LeaderCancelled(key))
+                raise
+            self._finish(key, future, result)
+            return result
@@ -0,0 +1,222 @@
+"""
+Strategy Statistics
+Per-domain win counts of extraction tiers and selectors, persisted in SQLite, used to try winners first
+"""
+import atexit
+import random
+import re
+import sqlite3
+import threading
+import time
+
+from scrapers.config import STRATEGY_STATS_CONFIG
+from scrapers.extraction_plan import TIERS
+from scrapers.host_registry import parse_host
+
+# Bare tag selectors ("span", "div", "p") match almost anything: a list's trailing catch-alls stay last
+CATCH_ALL_SELECTOR = re.compile(r'^(?:\*|[a-z][a-z0-9]*)$', re.I)
+
+
+class StrategyStats:
+    """
+    Attempt / win counters per (domain, field, kind, name), kind being "tier" or "selector".
+
+    Only tiers and selectors that were actually tried are counted, so a
+    winner at position k means everything before it came up empty. `order()`
+    moves the ones that (almost) never win behind the rest and otherwise keeps
+    the default priority: on a shop where the same tier nearly always wins it
+    becomes the first one tried, but a tier that merely wins more often never
+    overtakes a higher-priority tier that also yields results. Demoted
+    selectors only move behind the other specific selectors; the catch-alls
+    ending a selector list ("span", "div", "p") stay last. An
+    `explore_rate` share of calls returns the default order, so demoted
+    entries get re-tested when a shop changes its markup.
+
+    Counters are kept in memory, written in batches and reloaded periodically
+    (other workers write to the same table).
+    """
+
+    def __init__(self, db_path=None, enabled=None, explore_rate=None, min_attempts=None,
+                 demote_below=None, flush_interval=None, reload_interval=None):
+        config = STRATEGY_STATS_CONFIG
+        self.db_path = db_path or config["db_path"]
+        self.enabled = config["enabled"] if enabled is None else enabled
+        self.explore_rate = config["explore_rate"] if explore_rate is None else explore_rate
+        self.min_attempts = config["min_attempts"] if min_attempts is None else min_attempts
+        self.demote_below = config["demote_below"] if demote_below is None else demote_below
+        self.flush_interval = config["flush_interval"] if flush_interval is None else flush_interval
+        self.reload_interval = config["reload_interval"] if reload_interval is None else reload_interval
+        self._lock = threading.RLock()
+        self._counts = None
+        self._pending = {}
+        self._loaded_at = 0
+        self._timer = None
+        self.stats = {"reordered": 0, "explored": 0, "flushes": 0, "reloads": 0}
+
+    # ========== Storage ==========
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS extraction_strategy_stats (
+                domain TEXT NOT NULL,
+                field TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                wins INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (domain, field, kind, name)
+            )
+        ''')
+        return conn
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._counts is not None and now - self._loaded_at < self.reload_interval:
+            return
+        self._loaded_at = now
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    'SELECT domain, field, kind, name, attempts, wins FROM extraction_strategy_stats'
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[UYARI] Strateji istatistikleri yüklenemedi: {e}")
+            if self._counts is None:
+                self._counts = {}
+            return
+
+        counts = {}
+        for domain, field, kind, name, attempts, wins in rows:
+            counts.setdefault((domain, field, kind), {})[name] = [attempts, wins]
+        # Unflushed local counters stay on top of the reloaded ones
+        for (domain, field, kind, name), (attempts, wins) in self._pending.items():
+            entry = counts.setdefault((domain, field, kind), {}).setdefault(name, [0, 0])
+            entry[0] += attempts
+            entry[1] += wins
+        self._counts = counts
+        self.stats["reloads"] += 1
+
+    def _schedule_flush(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Add pending counters to the table in one transaction"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+        try:
+            conn = self._connect()
+            try:
+                conn.executemany('''
+                    INSERT INTO extraction_strategy_stats (domain, field, kind, name, attempts, wins)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (domain, field, kind, name) DO UPDATE SET
+                        attempts = attempts + excluded.attempts,
+                        wins = wins + excluded.wins,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', [key + tuple(value) for key, value in pending.items()])
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[HATA] Strateji istatistikleri kaydedilemedi: {e}")
+            with self._lock:
+                for key, (attempts, wins) in pending.items():
+                    entry = self._pending.setdefault(key, [0, 0])
+                    entry[0] += attempts
+                    entry[1] += wins
+                self._schedule_flush()
+            return
+        self.stats["flushes"] += 1
+
+    # ========== Ordering ==========
+
+    def _demoted(self, counts, name):
+        attempts, wins = counts.get(name, (0, 0))
+        return attempts >= self.min_attempts and wins < attempts * self.demote_below
+
+    def order(self, url, field, kind, names):
+        """`names` (default priority order) with the domain's demoted entries moved behind the others"""
+        names = list(names)
+        if not self.enabled or len(names) < 2:
+            return names
+        if random.random() < self.explore_rate:
+            self.stats["explored"] += 1
+            return names
+        with self._lock:
+            self._refresh()
+            counts = self._counts.get((parse_host(url), field, kind))
+            if not counts:
+                return names
+            # Demotion happens within the specific selectors and within the trailing catch-alls;
+            # sorted() is stable, so within each group the default priority is kept
+            split = len(names)
+            while kind == "selector" and split > 0 and CATCH_ALL_SELECTOR.match(names[split - 1]):
+                split -= 1
+            ordered = [name for group in (names[:split], names[split:])
+                       for name in sorted(group, key=lambda name: self._demoted(counts, name))]
+        if ordered != names:
+            self.stats["reordered"] += 1
+        return ordered
+
+    def tiers_for(self, url):
+        """{field: tiers} for PageCandidates.resolve()"""
+        return {field: tuple(self.order(url, field, "tier", tiers)) for field, tiers in TIERS.items()}
+
+    # ========== Recording ==========
+
+    def record(self, url, field, kind, tried, winner=None):
+        """Count one attempt for every name in `tried` and a win for `winner`"""
+        if not self.enabled or not tried:
+            return
+        domain = parse_host(url)
+        with self._lock:
+            self._refresh()
+            counts = self._counts.setdefault((domain, field, kind), {})
+            for name in tried:
+                won = int(name == winner)
+                for entry in (counts.setdefault(name, [0, 0]), self._pending.setdefault((domain, field, kind, name), [0, 0])):
+                    entry[0] += 1
+                    entry[1] += won
+            self._schedule_flush()
+
+    def record_selectors(self, url, field, selectors, winner=None):
+        """Record a first-match selector loop: everything up to the winner (or all of them) was probed"""
+        selectors = list(selectors)
+        tried = selectors[:selectors.index(winner) + 1] if winner in selectors else selectors
+        self.record(url, field, "selector", tried, winner)
+
+    def resolve(self, candidates):
+        """candidates.resolve() in the domain's learned tier order, recording the tiers that ran and won"""
+        data = candidates.resolve(self.tiers_for(candidates.url))
+        for field, tried in candidates.tried.items():
+            self.record(candidates.url, field, "tier", tried, data["sources"].get(field))
+        return data
+
+    def counts(self, url_or_host):
+        """{(field, kind): {name: (attempts, wins)}} for one domain"""
+        domain = parse_host(url_or_host)
+        with self._lock:
+            self._refresh()
+            return {
+                (field, kind): {name: tuple(entry) for name, entry in names.items()}
+                for (key_domain, field, kind), names in self._counts.items()
+                if key_domain == domain
+            }
+
+
+# Global instance
+strategy_stats = StrategyStats()
+atexit.register(strategy_stats.flush)
@@ -0,0 +1,328 @@
+"""
+Scrape Tracing
+One trace per scrape with per-stage durations, byte counts and winning tiers, aggregated into per-domain histograms
+"""
+import contextvars
+import functools
+import inspect
+import json
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+from scrapers.config import TRACE_CONFIG
+from scrapers.host_registry import parse_host
+
+# Trace of the scrape running in this thread / asyncio task. asyncio tasks and
+# BackgroundLoop.submit() (run_coroutine_threadsafe) inherit it from the caller;
+# run_in_executor does not, so wrap executor calls in copy_context().run.
+_current = contextvars.ContextVar("scrape_trace", default=None)
+
+
+def current_trace():
+    """Active ScrapeTrace or None (stages recorded outside a scrape are dropped)"""
+    return _current.get()
+
+
+@contextmanager
+def trace_stage(name):
+    """Time a block into the active trace, if any"""
+    trace = _current.get()
+    if trace is None:
+        yield None
+        return
+    with trace.stage(name):
+        yield trace
+
+
+def trace_mark(name=None):
+    """ScrapeTrace.mark on the active trace, if any"""
+    trace = _current.get()
+    if trace is not None:
+        trace.mark(name)
+
+
+def trace_claims(data, tier, fields=("title", "price", "image")):
+    """Claim every field already filled in `data` for `tier` (fields claimed earlier keep their tier)"""
+    trace = _current.get()
+    if trace is not None and data:
+        for field in fields:
+            if data.get(field):
+                trace.claim(field, tier)
+
+
+class ScrapeTrace:
+    """Stage durations (seconds, summed per name), byte counts and the tier that won each field"""
+
+    def __init__(self, url, source):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.domain = parse_host(url)
+        self.source = source
+        self.started_at = time.time()
+        self.outcome = None
+        self.error = None
+        self.stages = {}
+        self.bytes = {}
+        self.tiers = {}
+        self._started = time.perf_counter()
+        self._mark = None
+        self.total = None
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def mark(self, name=None):
+        """
+        Close the running checkpoint stage and start `name` (None just closes).
+        For long linear code where wrapping every step in `with` is impractical.
+        """
+        now = time.perf_counter()
+        if self._mark is not None:
+            self.add(self._mark[0], now - self._mark[1])
+        self._mark = (name, now) if name else None
+
+    def add_bytes(self, name, count):
+        if count:
+            self.bytes[name] = self.bytes.get(name, 0) + int(count)
+
+    def claim(self, field, tier):
+        """Record the tier that produced `field` (first claim wins)"""
+        if tier and field not in self.tiers:
+            self.tiers[field] = tier
+
+    def finish(self, outcome=None):
+        self.mark(None)
+        if self.outcome is None:
+            self.outcome = outcome
+        self.total = time.perf_counter() - self._started
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "url": self.url,
+            "domain": self.domain,
+            "source": self.source,
+            "started_at": round(self.started_at, 3),
+            "outcome": self.outcome,
+            "error": self.error,
+            "total_ms": round((self.total or 0) * 1000, 1),
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()},
+            "bytes": dict(self.bytes),
+            "tiers": dict(self.tiers),
+        }
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (ms); percentiles are bucket upper bounds"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, q):
+        target, seen = q * self.count, 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return self.bounds[i] if i < len(self.bounds) else round(self.max, 1)
+        return 0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 1),
+            "mean_ms": round(self.sum / self.count, 1) if self.count else 0,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 1),
+            "buckets": dict(zip([f"<={b}" for b in self.bounds] + ["inf"], self.counts)),
+        }
+
+
+class Tracer:
+    """
+    Creates traces and aggregates finished ones per domain (per process).
+
+    The outermost caller owns a trace; nested entry points (app route ->
+    scrape_product, ScrapingService -> scraper.scrape_product -> fetch_data)
+    join it, so one scrape yields one trace. A `sample_rate` share of the
+    finished traces is appended to a JSONL file.
+    """
+
+    def __init__(self, enabled=None, sample_rate=None, jsonl_path=None, buckets_ms=None, recent=None):
+        self.enabled = TRACE_CONFIG["enabled"] if enabled is None else enabled
+        self.sample_rate = TRACE_CONFIG["sample_rate"] if sample_rate is None else sample_rate
+        self.jsonl_path = jsonl_path or TRACE_CONFIG["jsonl_path"]
+        self.buckets_ms = buckets_ms or TRACE_CONFIG["buckets_ms"]
+        self._lock = threading.Lock()
+        self._domains = {}
+        self._recent = deque(maxlen=recent or TRACE_CONFIG["recent"])
+        self.stats = {"traces": 0, "sampled": 0, "sample_errors": 0}
+
+    # ========== Trace lifecycle ==========
+
+    def begin(self, url, source):
+        """
+        Start (or join) the trace for `url` in the current context.
+        Returns a handle for end(); joined traces are only finished by their owner.
+        """
+        trace = _current.get()
+        if trace is not None and trace.url == url:
+            return trace, None
+        if not self.enabled:
+            return None, None
+        trace = ScrapeTrace(url, source)
+        return trace, _current.set(trace)
+
+    def end(self, handle, outcome=None, error=None):
+        trace, token = handle
+        if token is None:
+            return
+        _current.reset(token)
+        if error is not None:
+            trace.error = f"{type(error).__name__}: {error}"[:200]
+        trace.finish(outcome or ("error" if error is not None else "ok"))
+        self.record(trace)
+
+    @contextmanager
+    def trace(self, url, source):
+        handle = self.begin(url, source)
+        try:
+            yield handle[0]
+        except BaseException as e:
+            self.end(handle, error=e)
+            raise
+        self.end(handle)
+
+    def traced(self, source):
+        """Decorator for scrape entry points taking the URL first (sync or async)"""
+        def decorator(func):
+            def outcome(result):
+                return "ok" if result else "empty"
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(url, *args, **kwargs):
+                    handle = self.begin(url, source)
+                    try:
+                        result = await func(url, *args, **kwargs)
+                    except BaseException as e:
+                        self.end(handle, error=e)
+                        raise
+                    self.end(handle, outcome(result))
+                    return result
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(url, *args, **kwargs):
+                handle = self.begin(url, source)
+                try:
+                    result = func(url, *args, **kwargs)
+                except BaseException as e:
+                    self.end(handle, error=e)
+                    raise
+                self.end(handle, outcome(result))
+                return result
+            return wrapper
+        return decorator
+
+    # ========== Aggregation ==========
+
+    def _domain(self, domain):
+        stats = self._domains.get(domain)
+        if stats is None:
+            stats = self._domains[domain] = {
+                "total": Histogram(self.buckets_ms), "stages": {}, "outcomes": {}, "tiers": {}, "bytes": {},
+            }
+        return stats
+
+    def _observe(self, stats, stage, ms):
+        if stage not in stats["stages"]:
+            stats["stages"][stage] = Histogram(self.buckets_ms)
+        stats["stages"][stage].observe(ms)
+
+    def record(self, trace):
+        with self._lock:
+            stats = self._domain(trace.domain)
+            stats["total"].observe((trace.total or 0) * 1000)
+            for stage, seconds in trace.stages.items():
+                self._observe(stats, stage, seconds * 1000)
+            stats["outcomes"][trace.outcome] = stats["outcomes"].get(trace.outcome, 0) + 1
+            for field, tier in trace.tiers.items():
+                by_tier = stats["tiers"].setdefault(field, {})
+                by_tier[tier] = by_tier.get(tier, 0) + 1
+            for name, count in trace.bytes.items():
+                stats["bytes"][name] = stats["bytes"].get(name, 0) + count
+            self._recent.append(trace.to_dict())
+            self.stats["traces"] += 1
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            self._sample(trace)
+
+    def observe(self, url, stage, seconds):
+        """Add a stage timing to the domain histograms without a trace (e.g. batch DB writes)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._observe(self._domain(parse_host(url)), stage, seconds * 1000)
+
+    def _sample(self, trace):
+        line = json.dumps(trace.to_dict(), ensure_ascii=False) + "\n"
+        try:
+            # One append per line: concurrent workers interleave whole lines
+            with self._lock, open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self.stats["sampled"] += 1
+        except OSError as e:
+            self.stats["sample_errors"] += 1
+            print(f"[UYARI] Trace örneği yazılamadı: {e}")
+
+    def summary(self, domain=None):
+        """Per-domain histograms, most total scrape time first"""
+        with self._lock:
+            domains = {
+                name: {
+                    "total": stats["total"].summary(),
+                    "stages": dict(sorted(
+                        ((stage, histogram.summary()) for stage, histogram in stats["stages"].items()),
+                        key=lambda item: -item[1]["sum_ms"],
+                    )),
+                    "outcomes": dict(stats["outcomes"]),
+                    "tiers": {field: dict(tiers) for field, tiers in stats["tiers"].items()},
+                    "bytes": dict(stats["bytes"]),
+                }
+                for name, stats in self._domains.items()
+                if domain is None or name == domain
+            }
+        return dict(sorted(domains.items(), key=lambda item: -item[1]["total"]["sum_ms"]))
+
+    def recent(self, limit=None):
+        with self._lock:
+            traces = list(self._recent)
+        return traces[-limit:] if limit else traces
+
+
+# Global instance
+tracer = Tracer()
@@ -2,73 +2,23 @@
 Scraping Utilities
 Common helper functions for scraping
 """
-import re
 import json
 from urllib.parse import urlparse
 
+from scrapers.price_parser import parse_price, format_price as _format_price
+
 
 def format_price(price_value, min_price=10, max_price=1000000):
-    """Format price to Turkish format (X.XXX,XX TL)"""
-    try:
-        if isinstance(price_value, str):
-            # Clean price string
-            price_clean = re.sub(r'[^\d,\.]', '', price_value)
-            if ',' in price_clean and '.' in price_clean:
-                # Format: 12,999.00 (English)
-                price_clean = price_clean.replace(',', '')
-            elif '.' in price_clean:
-                # Format: 12.999,00 (Turkish)
-                price_clean = price_clean.replace('.', '').replace(',', '.')
-            elif ',' in price_clean:
-                # Format: 12999,00
-                price_clean = price_clean.replace(',', '.')
-            price_value = float(price_clean)
-        
-        if isinstance(price_value, (int, float)):
-            if min_price <= price_value <= max_price:
-                if price_value >= 1000:
-                    return f"{price_value:,.2f} TL".replace(',', 'X').replace('.', ',').replace('X', '.')
-                else:
-                    return f"{price_value:.2f} TL".replace('.', ',')
-    except (ValueError, TypeError):
-        pass
+    """Format price to Turkish format (X.XXX,XX TL); None outside [min_price, max_price]"""
+    amount = parse_price(price_value)
+    if amount is not None and min_price <= amount <= max_price:
+        return _format_price(amount)
     return None
 
 
 def extract_price_from_text(text):
-    """Extract price from text using regex"""
-    if not text:
-        return None
-    
-    # Turkish format (12.999,00)
-    price_match = re.search(r'([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2})', text)
-    if not price_match:
-        # English format (12,999.00)
-        price_match = re.search(r'([0-9]{1,3}(?:,[0-9]{3})*\.[0-9]{2})', text)
-    if not price_match:
-        # Simple format (12999.00 or 12999,00)
-        price_match = re.search(r'([0-9]+[.,][0-9]{2})', text)
-    if not price_match:
-        # Just number (12999)
-        price_match = re.search(r'([0-9]{3,})', text)
-    
-    if price_match:
-        found_price_str = price_match.group(1)
-        try:
-            # Convert to float
-            if ',' in found_price_str and '.' in found_price_str:
-                price_clean = found_price_str.replace(',', '')
-            elif '.' in found_price_str:
-                price_clean = found_price_str.replace('.', '').replace(',', '.')
-            elif ',' in found_price_str:
-                price_clean = found_price_str.replace(',', '.')
-            else:
-                price_clean = found_price_str
-            
-            return float(price_clean)
-        except ValueError:
-            return None
-    return None
+    """Extract the first price from text (amounts next to a currency mark win)"""
+    return parse_price(text)
 
 
 async def extract_json_ld_price(page):
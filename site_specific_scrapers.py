@@ -4,7 +4,9 @@ import re
 import time
 import json
 from urllib.parse import urlparse
-from playwright.async_api import async_playwright
+from scrapers.browser_pool import browser_pool
+from scrapers.request_blocking import block_requests
+from scrapers.readiness import wait_until_ready
 from typing import Dict, List, Optional, Any
 import random
 
@@ -400,30 +402,15 @@ class SiteSpecificScrapers:
         if not config:
             return {"error": f"Site {domain} için konfigürasyon bulunamadı"}
         
-        async with async_playwright() as p:
-            # Render.com için browser ayarları
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-accelerated-2d-canvas',
-                    '--no-first-run',
-                    '--no-zygote',
-                    '--disable-gpu',
-                    '--disable-background-timer-throttling',
-                    '--disable-backgrounding-occluded-windows',
-                    '--disable-renderer-backgrounding',
-                    '--disable-features=TranslateUI',
-                    '--disable-ipc-flooding-protection'
-                ]
-            )
-            page = await browser.new_page()
+        # Kalıcı browser havuzundan sayfa al (her URL için Chromium başlatılmaz)
+        async with browser_pool.page() as page:
+            # Görsel/font/medya ve tracker isteklerini engelle
+            await block_requests(page, url)
             
             try:
                 await page.goto(url, wait_until="networkidle", timeout=config["timeout"])
-                await page.wait_for_timeout(config["wait_time"])
+                await wait_until_ready(page, price_selectors=config["selectors"]["current_price"],
+                                       deadline=config.get("wait_time"))
                 
                 # Ürün bilgilerini çek
                 product_data = {
@@ -444,8 +431,6 @@ class SiteSpecificScrapers:
             except Exception as e:
                 logging.error(f"Scraping hatası: {e}")
                 return {"error": str(e)}
-            finally:
-                await browser.close()
     
     async def _extract_text(self, page, selectors: List[str]) -> str:
         """
@@ -2,6 +2,8 @@
 Test Suite for Scraping Functionality
 Tests site-specific scrapers, cache, and timeout configurations
 """
+import asyncio
+import time
 import pytest
 import sys
 import os
@@ -12,6 +14,29 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from scrapers.config import SITE_CONFIGS, get_site_config, get_timeout, TIMEOUT_CONFIG
     from scrapers.utils import format_price, extract_price_from_text, normalize_image_url
+    from scrapers.price_parser import parse_price, parse_price_info, parse_prices, parse_many, _parse_text_cached
+    from scrapers.request_blocking import RequestBlocker, get_blocking_config, blocked_images
+    from scrapers.html_extractor import html_extractor
+    from scrapers.http_fetcher import is_complete
+    from scrapers.extraction_plan import ExtractionPlan, PageCandidates, compile_plan
+    from scrapers.browser_pool import BrowserPool
+    from scrapers.event_loop import BackgroundLoop
+    from scrapers.scheduler import ScrapeScheduler, FairLimiter, TokenBucket
+    from scrapers.reverify import ReverifySampler
+    from scrapers.single_flight import SingleFlight, flight_key
+    from scrapers.session_warmup import SessionWarmup
+    from scrapers.host_registry import HostRegistry, parse_host
+    from scrapers.brand_store import BrandStore, JsonBrandBackend, SqliteBrandBackend
+    from scrapers.readiness import wait_until_ready, get_readiness_stats, PlaywrightTimeoutError
+    from scrapers.tracing import Tracer, Histogram, current_trace, trace_stage
+    from scrapers.strategy_stats import StrategyStats
+    from scrapers.circuit_breaker import CircuitBreaker, CircuitOpenError, ScrapeBlocked, is_block_status, is_block_title
+    from scrapers.negative_cache import NegativeCache, classify_failure
+    from scrapers.retry_policy import RetryPolicy
+    from scrapers.node_bridge import NodeWorkerPool, NodeWorkerError
+    from scrapers.debug_capture import DebugCapture
+    from scrapers.image_probe import ImageProber, image_info
+    from scrapers.browser_governor import BrowserGovernor, MARKER_SWITCH, find_browser_process, process_tree_rss
 except ImportError:
     # Skip tests if scrapers module not available
     pytest.skip("Scrapers module not available", allow_module_level=True)
@@ -64,6 +89,40 @@ class TestPriceUtils:
         text = "Fiyat: 1.299,99 TL"
         result = extract_price_from_text(text)
         assert result == 1299.99
+    
+    def test_parse_price_grouping(self):
+        """Test that grouping and decimal separators are told apart"""
+        assert parse_price("1.299") == 1299
+        assert parse_price("12.99") == 12.99
+        assert parse_price("1,299.99 $") == 1299.99
+        assert parse_price("129,90 TL") == 129.9
+        assert parse_price("1 299,99 €") == 1299.99
+        assert parse_price("1299.5") == 1299.5
+        assert parse_price("Fiyat yok") is None
+    
+    def test_parse_price_multi_and_range(self):
+        """Test currency detection, discount noise, ranges and multi-price strings"""
+        info = parse_price_info("%20 indirim 1.599,99 TL 1.279,99 TL")
+        assert info.values == (1599.99, 1279.99)
+        assert info.currency == "TRY"
+        
+        info = parse_price_info("1.299 - 1.599 TL")
+        assert info.is_range and info.amount == 1299
+        
+        assert parse_prices("3 taksit, toplam 499 TL") == [499]
+    
+    def test_parse_many(self):
+        """Test that the batch API keeps input positions"""
+        assert parse_many(["1.299,99 TL", None, "yok", 250]) == [1299.99, None, None, 250.0]
+        assert parse_many(["", "99,90"], 0.0) == [0.0, 99.9]
+    
+    def test_page_text_parsed_but_not_cached(self):
+        """Test that long page texts keep currency ownership and stay out of the parse cache"""
+        text = " ".join(f"Ürün {i},99 TL beden 38 | ₺{i}" for i in range(1, 2001))
+        before = _parse_text_cached.cache_info().currsize
+        values = parse_prices(text)
+        assert len(values) == 4000 and values[:2] == [1.99, 1]
+        assert _parse_text_cached.cache_info().currsize == before
 
 
 class TestImageUtils:
@@ -82,5 +141,1226 @@ class TestImageUtils:
         assert result == "https://example.com/image.jpg"
 
 
+class TestRequestBlocking:
+    """Test request blocking decisions"""
+    
+    def test_document_never_blocked(self):
+        """Test that the main document always loads"""
+        blocker = RequestBlocker("https://www.zara.com/tr/p1.html")
+        assert blocker.should_block("https://www.zara.com/tr/p1.html", "document") is False
+    
+    def test_images_and_trackers_blocked(self):
+        """Test default resource type and tracker blocking"""
+        blocker = RequestBlocker("https://example.com/product")
+        assert blocker.should_block("https://example.com/a.jpg", "image") is True
+        assert blocker.should_block("https://www.google-analytics.com/g/collect?v=2", "xhr") is True
+        assert blocker.should_block("https://example.com/app.js", "script") is False
+    
+    def test_site_allow_list_overrides(self):
+        """Test that per-site allow list wins over blocking rules"""
+        config = get_blocking_config("https://www.pullandbear.com/tr/p.html")
+        blocker = RequestBlocker("https://www.pullandbear.com/tr/p.html", config)
+        assert "dynatrace" in config["deny"]
+        assert blocker.should_block("https://cdn.cookielaw.org/logos/x.png", "image") is False
+
+    def test_only_blocked_images_are_placeholders(self):
+        """Test that images answered by the blocker are tagged, untouched ones (tracking pixels) are not"""
+        class Route:
+            def __init__(self, url, resource_type):
+                self.request = type("Request", (), {"url": url, "resource_type": resource_type})()
+            async def continue_(self):
+                pass
+            async def fulfill(self, **kwargs):
+                pass
+        class Target:
+            async def route(self, pattern, handler):
+                self.handler = handler
+        
+        context = Target()
+        page = type("Page", (), {"context": context})()
+        config = dict(get_blocking_config("https://example.com/p"), allow=["pixel.gif"])
+        blocker = asyncio.run(RequestBlocker("https://example.com/p", config).attach(context))
+        asyncio.run(context.handler(Route("https://example.com/a.jpg", "image")))
+        asyncio.run(context.handler(Route("https://example.com/pixel.gif", "image")))
+        assert blocker.blocked_images == {"https://example.com/a.jpg"}
+        assert blocked_images(page) == {"https://example.com/a.jpg"}
+        assert blocked_images(object()) == set()
+
+
+class TestHtmlExtractor:
+    """Test browserless extraction used by the HTTP fast path"""
+    
+    JSONLD_HTML = """<html><head>
+    <script type="application/ld+json">{"@context": "https://schema.org", "@type": "Product",
+      "name": "Basic T-Shirt", "image": "/img/tshirt.jpg", "brand": {"name": "ACME"},
+      "offers": {"@type": "Offer", "price": "299.90", "priceCurrency": "TRY"}}</script>
+    </head><body><h1>Basic T-Shirt</h1></body></html>"""
+    
+    def test_extract_jsonld_product(self):
+        """Test that JSON-LD provides title, price, image and brand"""
+        data = html_extractor.extract(self.JSONLD_HTML, "https://example.com/p/1")
+        assert data["title"] == "BASIC T-SHIRT"
+        assert data["price"] == "299,90 TL"
+        assert data["image"] == "https://example.com/img/tshirt.jpg"
+        assert data["brand"] == "ACME"
+        assert data["sources"]["price"] == "jsonld"
+        assert is_complete(data) is True
+    
+    def test_regex_price_not_complete(self):
+        """Test that a regex-only price escalates to the browser"""
+        html = """<html><head><meta property="og:title" content="Sneaker">
+        <meta property="og:image" content="https://example.com/s.jpg"></head>
+        <body><span>1.299,99 TL</span></body></html>"""
+        data = html_extractor.extract(html, "https://example.com/p/2")
+        assert data["title"] == "SNEAKER"
+        assert data["sources"]["price"] == "regex"
+        assert is_complete(data) is False
+    
+    def test_aggregate_offer_uses_low_price(self):
+        """Test that an AggregateOffer yields lowPrice, never priceCurrency as the amount"""
+        html = self.JSONLD_HTML.replace(
+            '"offers": {"@type": "Offer", "price": "299.90", "priceCurrency": "TRY"}',
+            '"offers": {"@type": "AggregateOffer", "lowPrice": "249.90", "highPrice": "399.90", "priceCurrency": "TRY"}')
+        data = html_extractor.extract(html, "https://example.com/p/1")
+        assert data["price"] == "249,90 TL"
+        assert is_complete(data) is True
+
+        currency_only = html.replace('"lowPrice": "249.90", "highPrice": "399.90", ', '')
+        data = html_extractor.extract(currency_only, "https://example.com/p/1")
+        assert data["price"] != "TRY TL"
+        assert is_complete(data) is False
+        assert is_complete(dict(data, price="TRY TL", sources={"price": "jsonld"})) is False
+
+    def test_dom_selectors_without_browser(self):
+        """Test that the DOM selector tier runs on static HTML, site selectors first"""
+        html = """<html><body><h1>Keten Gömlek</h1>
+        <div class="product-price"><span class="old">899,90 TL</span> <span class="now">649,90 TL</span></div>
+        <img class="gallery-main" src="/img/gomlek.jpg" width="800" height="1000"></body></html>"""
+        site_config = {"price_selectors": [".product-price .now"], "image_selectors": [".gallery-main"]}
+        data = html_extractor.extract(html.encode("utf-8"), "https://example.com/p/3", site_config)
+        assert data["title"] == "KETEN GÖMLEK"
+        assert data["sources"] == {"title": "dom", "price": "site", "image": "site"}
+        assert data["price"] == "649,90 TL"
+        assert html_extractor.extract(html, "https://example.com/p/3")["sources"]["price"] == "dom"
+        assert data["image"] == "https://example.com/img/gomlek.jpg"
+
+    def test_snapshot_matches_collect_shape(self):
+        """Test that the static snapshot has one match list per plan selector"""
+        from scrapers.extraction_plan import compile_plan
+        plan = compile_plan()
+        doc = html_extractor.parse(self.JSONLD_HTML)
+        snapshot = html_extractor.snapshot(doc, plan)
+        assert set(snapshot) == {"fields", "meta", "jsonld", "images", "text"}
+        for field, selectors in plan.fields.items():
+            assert len(snapshot["fields"][field]) == len(selectors)
+        assert len(snapshot["jsonld"]) == 1
+        assert "Basic T-Shirt" in snapshot["text"]
+
+    def test_compound_selectors_match_cssselect(self):
+        """Test that indexed compound selectors return what cssselect returns, in order"""
+        from lxml.cssselect import CSSSelector
+        from scrapers.html_extractor import DocumentIndex, parse_compound
+        doc = html_extractor.parse("""<html><body>
+        <div class="price box" id="p"><span class="price old">1</span><span data-price="2" class="now">2</span></div>
+        <img class="product-image main" src="https://cdn.shopify.com/a.jpg" alt="Keten gömlek">
+        <img src="/b.jpg"></body></html>""")
+        index = DocumentIndex(doc)
+        for selector in ['.price', 'span.price.old', '#p', "[class*='price']", '[data-price]', "img[src*='shopify']",
+                         'img.product-image', "img[alt*='Keten']", 'img', "span[class*='o'][class*='ld']"]:
+            assert index.select(parse_compound(selector), 20) == CSSSelector(selector)(doc), selector
+        assert parse_compound('div.base-price span') is None
+        assert parse_compound('span.number:first-of-type') is None
+
+
+class _FakeHandle:
+    def __init__(self, value):
+        self.value = value
+    
+    async def json_value(self):
+        return self.value
+
+
+class _FakePage:
+    def __init__(self, reason=None):
+        self.reason = reason
+        self.calls = []
+    
+    async def wait_for_function(self, expression, arg=None, polling=None, timeout=None):
+        self.calls.append({"arg": arg, "timeout": timeout})
+        if self.reason is None:
+            raise PlaywrightTimeoutError("Timeout exceeded")
+        return _FakeHandle(self.reason)
+
+
+class TestReadiness:
+    """Test readiness waits (deadline and timing bookkeeping)"""
+    
+    def test_ready_signal_returned(self):
+        """Test that the first ready signal ends the wait"""
+        page = _FakePage("price")
+        result = asyncio.run(wait_until_ready(page, price_selectors=[".pdp-price"], label="test-ready"))
+        assert result["reason"] == "price"
+        assert result["timed_out"] is False
+        assert page.calls[0]["arg"][1][0] == ".pdp-price"
+        assert get_readiness_stats()["test-ready"]["count"] == 1
+    
+    def test_deadline_does_not_raise(self):
+        """Test that hitting the deadline is recorded instead of raised"""
+        page = _FakePage()
+        result = asyncio.run(wait_until_ready(page, deadline=250, label="test-timeout"))
+        assert result["timed_out"] is True
+        assert page.calls[0]["timeout"] == 250
+        assert get_readiness_stats()["test-timeout"]["timeouts"] == 1
+
+
+class TestExtractionPlan:
+    """Test selector plan compilation and Python-side resolution"""
+    
+    def test_plan_merges_and_dedupes(self):
+        """Test that site selectors come first and duplicates are dropped"""
+        site_config = {"price_selectors": [".pdp-price", ".price"]}
+        plan = ExtractionPlan(site_config)
+        assert plan.fields["price"][:2] == [".pdp-price", ".price"]
+        assert plan.fields["price"].count(".price") == 1
+    
+    def test_resolve_from_snapshot(self):
+        """Test that DOM candidates are ranked and parsed without the page"""
+        plan = ExtractionPlan({"price_selectors": [".pdp-price"]})
+        title_matches = [[] for _ in plan.fields["title"]]
+        title_matches[plan.fields["title"].index("h1")] = [{"text": "Kanvas Ayakkabı"}]
+        snapshot = {
+            "fields": {"title": title_matches},
+            "meta": {'meta[property="og:image"]': ["/img/1.jpg"],
+                     'meta[property="product:price:amount"]': ["999.00"]},
+            "jsonld": [],
+            "images": [],
+            "text": "",
+        }
+        candidates = PageCandidates(plan, snapshot, "https://example.com/p/1")
+        data = candidates.resolve()
+        assert data["title"] == "KANVAS AYAKKABI"
+        assert data["price"] == "999,00 TL"
+        assert data["image"] == "https://example.com/img/1.jpg"
+        assert data["sources"] == {"title": "dom", "price": "meta", "image": "meta"}
+        assert candidates.query("price", ".pdp-price") is None
+
+        limited = candidates.resolve(("jsonld", "dom"))
+        assert limited["title"] == "KANVAS AYAKKABI" and limited["price"] is None and limited["images"] == []
+        assert candidates.resolve({"price": ("regex",)})["sources"]["title"] == "dom"
+    
+    def test_compile_plan_keyed_on_selectors(self):
+        """Test that temporary configs get their own plan and equal selectors share one"""
+        plans = [compile_plan({"price_selectors": [f".s{i}"]}) for i in range(50)]
+        assert [plan.site_fields["price"] for plan in plans] == [[f".s{i}"] for i in range(50)]
+        assert compile_plan({"price_selectors": [".s1"], "domain": "x"}) is plans[1]
+        assert compile_plan(None, {"price": [".extra"]}).site_fields["price"] == [".extra"]
+
+
+class TestBackgroundLoop:
+    """Test the per-process background event loop"""
+    
+    def setup_method(self):
+        self.loop = BackgroundLoop(name="test-loop")
+    
+    def teardown_method(self):
+        self.loop.shutdown()
+    
+    def test_state_persists_across_calls(self):
+        """Test that consecutive run() calls share one loop"""
+        async def current_loop():
+            return asyncio.get_running_loop()
+        
+        assert self.loop.run(current_loop()) is self.loop.run(current_loop())
+    
+    def test_run_timeout(self):
+        """Test that a slow coroutine raises asyncio.TimeoutError"""
+        with pytest.raises(asyncio.TimeoutError):
+            self.loop.run(asyncio.sleep(1), timeout=0.05)
+
+
+class TestScrapeScheduler:
+    """Test bounded concurrent batch scraping"""
+    
+    def setup_method(self):
+        self.pool = BrowserPool(size=1)
+        self.in_flight = {}
+        self.peak = {}
+    
+    def teardown_method(self):
+        self.pool.shutdown()
+    
+    async def _scrape(self, url):
+        domain = url.split('/')[2]
+        self.in_flight[domain] = self.in_flight.get(domain, 0) + 1
+        self.peak[domain] = max(self.peak.get(domain, 0), self.in_flight[domain])
+        await asyncio.sleep(0.05)
+        self.in_flight[domain] -= 1
+        if url.endswith("/bad"):
+            raise ValueError("scrape failed")
+        return {"url": url}
+    
+    def test_per_domain_limit_and_errors(self):
+        """Test that domain caps hold and failures are yielded, not raised"""
+        scheduler = ScrapeScheduler(max_concurrency=4, per_domain=2, pool=self.pool)
+        urls = [f"https://a.com/{i}" for i in range(5)] + ["https://b.com/1", "https://b.com/bad"]
+        results = {url: (result, error) for url, result, error in scheduler.run_batch(urls, self._scrape)}
+        assert len(results) == len(urls)
+        assert self.peak["a.com"] == 2
+        assert isinstance(results["https://b.com/bad"][1], ValueError)
+        assert results["https://a.com/0"][0] == {"url": "https://a.com/0"}
+    
+    def test_batch_deadline(self):
+        """Test that unfinished scrapes are reported as timeouts"""
+        scheduler = ScrapeScheduler(max_concurrency=1, per_domain=1, pool=self.pool)
+        urls = [f"https://a.com/{i}" for i in range(5)]
+        errors = [error for _, _, error in scheduler.run_batch(urls, self._scrape, timeout=0.08)]
+        assert len(errors) == 5
+        assert any(isinstance(error, TimeoutError) for error in errors)
+    
+    def test_site_config_politeness(self):
+        """Test that site-config concurrency and token buckets pace one domain only"""
+        scheduler = ScrapeScheduler(max_concurrency=8, per_domain=4, rate=0, pool=self.pool)
+        urls = [f"https://www.zara.com/tr/{i}" for i in range(3)] + [f"https://a.com/{i}" for i in range(3)]
+        started = time.monotonic()
+        finished = {}
+        
+        async def scrape(url):
+            await self._scrape(url)
+            finished[url] = time.monotonic() - started
+        
+        list(scheduler.run_batch(urls, scrape))
+        assert self.peak["www.zara.com"] == 1 and self.peak["a.com"] == 3
+        # zara.com: 0.5 req/s, burst 1 -> the third request starts ~4 s after the first
+        assert finished["https://www.zara.com/tr/2"] > 3.5
+        assert max(finished[f"https://a.com/{i}"] for i in range(3)) < 1.0
+        assert scheduler.stats["paced"] == 2
+    
+    def test_nested_calls_take_one_slot(self):
+        """Test that a scheduled scrape calling the scheduler again does not queue twice"""
+        scheduler = ScrapeScheduler(max_concurrency=1, per_domain=1, rate=0, pool=self.pool)
+        
+        async def outer(url):
+            return await scheduler.run(url, self._scrape)
+        
+        results = list(scheduler.run_batch(["https://a.com/1"], outer, timeout=2))
+        assert results == [("https://a.com/1", {"url": "https://a.com/1"}, None)]
+        assert scheduler.call("https://a.com/2", lambda url: url.upper()) == "HTTPS://A.COM/2"
+        # call() hands the slot back to the loop thread asynchronously
+        self.pool.run(asyncio.sleep(0))
+        assert scheduler.queue_depths()["global"]["active"] == 0
+    
+    def test_call_queue_timeout(self):
+        """Test that a sync caller on a saturated domain times out and leaves the queue"""
+        scheduler = ScrapeScheduler(max_concurrency=4, per_domain=1, rate=0, pool=self.pool, queue_timeout=0.1)
+        
+        async def slow(url):
+            await asyncio.sleep(0.5)
+        
+        busy = self.pool.submit(scheduler.run("https://a.com/1", slow))
+        time.sleep(0.05)
+        with pytest.raises(TimeoutError):
+            scheduler.call("https://a.com/2", lambda url: url)
+        assert scheduler.stats["queue_timeouts"] == 1
+        assert scheduler.queue_depths()["domains"]["a.com"]["waiting"] == 0
+        busy.result(2)
+        assert scheduler.call("https://a.com/3", lambda url: url.upper()) == "HTTPS://A.COM/3"
+    
+    def test_fair_limiter_round_robin(self):
+        """Test that free slots rotate across owners instead of first-come order"""
+        order = []
+        
+        async def scenario():
+            limiter = FairLimiter(1)
+            await limiter.acquire("bulk")
+            
+            async def job(owner, name):
+                await limiter.acquire(owner)
+                order.append(name)
+                limiter.release()
+            
+            tasks = [asyncio.create_task(job("bulk", f"bulk{i}")) for i in range(3)]
+            tasks.append(asyncio.create_task(job("single", "single")))
+            await asyncio.sleep(0)
+            assert limiter.waiting == 4
+            limiter.release()
+            await asyncio.gather(*tasks)
+        
+        asyncio.run(scenario())
+        assert order == ["bulk0", "single", "bulk1", "bulk2"]
+    
+    def test_token_bucket_reserve(self):
+        """Test burst capacity and the wait for the next token"""
+        bucket = TokenBucket(rate=2, burst=2)
+        assert bucket.reserve() == 0 and bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.5, abs=0.05)
+        assert TokenBucket(rate=0, burst=1).reserve() == 0
+
+
+class TestReverifySampler:
+    """Test sampled background re-verification bookkeeping"""
+    
+    def test_disagreement_rate_per_domain(self):
+        """Test that disagreeing fields are counted per domain"""
+        pool = BrowserPool(size=1)
+        sampler = ReverifySampler(sample_rate=1.0, pool=pool)
+        
+        async def rescrape(url):
+            return {"price": "100,00 TL"}
+        
+        try:
+            sampler.maybe_schedule("https://www.shop.com/1", rescrape, lambda data: ["fiyat"]).result(5)
+            sampler.maybe_schedule("https://www.shop.com/2", rescrape, lambda data: []).result(5)
+        finally:
+            pool.shutdown()
+        
+        stats = sampler.stats()["shop.com"]
+        assert stats["checked"] == 2
+        assert stats["disagreement_rate"] == 0.5
+        assert stats["fields"] == {"fiyat": 1}
+    
+    def test_disabled_by_default_rate(self):
+        """Test that a zero sample rate never schedules work"""
+        sampler = ReverifySampler(sample_rate=0)
+        assert sampler.maybe_schedule("https://shop.com/1", None, None) is None
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent scrapes of one URL"""
+    
+    def test_flight_key_normalization(self):
+        """Test that cosmetic URL differences share a key"""
+        assert flight_key("https://www.Shop.com/p/1/?utm_source=x#top") == flight_key("http://shop.com/p/1")
+        assert flight_key("https://shop.com/p?id=1") != flight_key("https://shop.com/p?id=2")
+    
+    def test_concurrent_async_callers_share_one_scrape(self):
+        """Test that concurrent coroutines run the scrape once"""
+        flight = SingleFlight("test", cross_process=False)
+        calls = []
+        
+        async def scrape():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"name": "Ürün"}
+        
+        async def main():
+            return await asyncio.gather(*[
+                flight.run_async("https://shop.com/p/1", scrape) for _ in range(5)
+            ])
+        
+        results = asyncio.run(main())
+        assert len(calls) == 1
+        assert all(result == {"name": "Ürün"} for result in results)
+        assert flight.stats["coalesced"] == 4
+        assert flight.in_flight() == []
+    
+    def test_leader_error_reaches_followers(self):
+        """Test that followers see the leader's exception"""
+        flight = SingleFlight("test", cross_process=False)
+        
+        async def scrape():
+            await asyncio.sleep(0.05)
+            raise ValueError("scrape failed")
+        
+        async def main():
+            return await asyncio.gather(*[
+                flight.run_async("https://shop.com/p/1", scrape) for _ in range(3)
+            ], return_exceptions=True)
+        
+        assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
+    
+    def test_cross_process_waiter_reuses_result(self, tmp_path):
+        """Test that a second registry (another worker) reuses the result written under the file lock"""
+        import threading
+        import time
+        
+        workers = [SingleFlight("test", cross_process=True, lock_dir=str(tmp_path)) for _ in range(2)]
+        if not workers[0].cross_process:
+            pytest.skip("fcntl not available")
+        calls = []
+        results = []
+        
+        def scrape():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"name": "Ürün"}
+        
+        threads = [
+            threading.Thread(target=lambda w=worker: results.append(w.run("https://shop.com/p/1", scrape)))
+            for worker in workers
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join(5)
+        
+        assert len(calls) == 1
+        assert results == [{"name": "Ürün"}, {"name": "Ürün"}]
+        assert workers[1].stats["shared"] == 1
+    
+    def test_cross_process_error_placeholder_not_shared(self, tmp_path):
+        """Test that a waiting worker scrapes itself when the leader returned an error placeholder"""
+        import threading
+        import time
+        
+        workers = [SingleFlight("test", cross_process=True, lock_dir=str(tmp_path),
+                                shareable=lambda result: bool(result) and not result.get("error"))
+                   for _ in range(2)]
+        if not workers[0].cross_process:
+            pytest.skip("fcntl not available")
+        results = []
+        
+        def scrape():
+            time.sleep(0.2)
+            return {"error": "timeout"} if not results else {"name": "Ürün"}
+        
+        def run(worker):
+            results.append(worker.run("https://shop.com/p/1", scrape))
+        
+        threads = [threading.Thread(target=run, args=(worker,)) for worker in workers]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join(5)
+        
+        assert results == [{"error": "timeout"}, {"name": "Ürün"}]
+        assert workers[1].stats["shared"] == 0
+
+
+class TestSessionWarmup:
+    """Test the per-domain storage_state cache"""
+    
+    SITES = {"mango.com": {"url": "https://shop.mango.com/tr"}}
+    STATE = {"cookies": [{"name": "consent", "value": "1"}], "origins": []}
+    
+    def test_site_matching(self, tmp_path):
+        """Test that subdomains match and unknown shops need no warm-up"""
+        warmup = SessionWarmup(sites=self.SITES, state_dir=str(tmp_path))
+        assert warmup.site_for("https://shop.mango.com/tr/urun/1")[0] == "mango.com"
+        assert warmup.site_for("https://notmango.com/urun/1") == (None, None)
+        assert asyncio.run(warmup.storage_state("https://www.trendyol.com/p-1")) is None
+    
+    def test_state_shared_through_disk_and_expires(self, tmp_path):
+        """Test that another worker reads the saved state until the TTL passes"""
+        SessionWarmup(sites=self.SITES, state_dir=str(tmp_path)).put("mango.com", self.STATE)
+        assert SessionWarmup(sites=self.SITES, state_dir=str(tmp_path)).get("mango.com") == self.STATE
+        
+        expired = SessionWarmup(sites=self.SITES, state_dir=str(tmp_path), ttl=1)
+        expired._states["mango.com"] = {"saved_at": 0, "state": self.STATE}
+        assert expired.get("mango.com") is None
+    
+    def test_concurrent_scrapes_share_one_warmup(self, tmp_path):
+        """Test that a cold domain is warmed up once and then served from cache"""
+        warmup = SessionWarmup(sites=self.SITES, state_dir=str(tmp_path))
+        calls = []
+        
+        async def fake_warm_up(domain, site, context_options, init_script):
+            calls.append(domain)
+            await asyncio.sleep(0.05)
+            warmup.put(domain, self.STATE)
+            return self.STATE
+        
+        warmup._warm_up = fake_warm_up
+        
+        async def main():
+            return await asyncio.gather(*[
+                warmup.storage_state(f"https://shop.mango.com/tr/urun/{i}") for i in range(3)
+            ])
+        
+        assert asyncio.run(main()) == [self.STATE] * 3
+        assert calls == ["mango.com"]
+        assert warmup.stats["hits"] == 2
+
+
+class TestHostRegistry:
+    """Test host suffix lookups"""
+    
+    def setup_method(self):
+        self.registry = HostRegistry(cache_size=4)
+        self.registry.register("brand", [
+            ("gap.com", "Gap"), ("mango.com", "Mango"), ("shop.mango.com", "Mango Shop"),
+            ("gap.com", "Duplicate"), ("amazon", "Amazon"),
+        ])
+    
+    def test_parse_host(self):
+        """Test that scheme, port, www. and case are ignored"""
+        assert parse_host("https://WWW.Zara.com:443/tr/p1.html") == "zara.com"
+        assert parse_host("shop.mango.com") == "shop.mango.com"
+    
+    def test_whole_label_suffix_match(self):
+        """Test longest-suffix matching without substring misfires"""
+        assert self.registry.lookup("brand", "https://www.gap.com/p/1") == "Gap"
+        assert self.registry.lookup("brand", "https://abcgap.com/p/1") is None
+        assert self.registry.lookup("brand", "https://shop.mango.com/tr/p") == "Mango Shop"
+        assert self.registry.lookup("brand", "https://m.mango.com/tr/p") == "Mango"
+        assert self.registry.lookup("brand", "https://www.amazon.com.tr/dp/1") == "Amazon"
+    
+    def test_registrable_label_under_other_suffix(self):
+        """Test that brand domains also match their ccTLD sites, not look-alike labels"""
+        self.registry.register("brand", [
+            ("levis.com", "Levi's"), ("guess.com", "Guess"), ("benetton.com", "Benetton"),
+            ("nike.com", "Nike"), ("shop.mango.com", "Mango Shop"), ("nike.com.tr", "Nike TR"),
+        ])
+        assert self.registry.lookup("brand", "https://www.levis.com.tr/p/1") == "Levi's"
+        assert self.registry.lookup("brand", "https://guess.com.tr/p/1") == "Guess"
+        assert self.registry.lookup("brand", "https://m.benetton.com.tr/p/1") == "Benetton"
+        assert self.registry.lookup("brand", "https://www.nike.com.tr/p/1") == "Nike TR"
+        assert self.registry.lookup("brand", "https://www.nike.de/p/1") == "Nike"
+        assert self.registry.lookup("brand", "https://nikeshop.com.tr/p/1") is None
+        assert self.registry.lookup("brand", "https://levis.example.com/p/1") is None
+        assert self.registry.lookup("brand", "https://mango.com.tr/p/1") is None
+    
+    def test_cache_and_reregister(self):
+        """Test that repeated hosts hit the cache and re-registering invalidates it"""
+        self.registry.lookup("brand", "https://gap.com/1")
+        self.registry.lookup("brand", "https://gap.com/2")
+        assert self.registry.stats["hits"] == 1
+        self.registry.register("brand", {"gap.com": "GAP"})
+        assert self.registry.lookup("brand", "https://gap.com/3") == "GAP"
+    
+    def test_site_config_lookup(self):
+        """Test that get_site_config resolves subdomains through the index"""
+        assert get_site_config("https://shop.mango.com/tr/p/1") is SITE_CONFIGS["shop.mango.com"]
+        assert get_site_config("https://example.com/zara.com/p/1") is None
+
+
+class TestBrandStore:
+    """Test the in-memory dynamic brand store"""
+    
+    def test_batched_add_and_reload(self, tmp_path):
+        """Test that additions are batched and other workers see them after flush"""
+        path = str(tmp_path / "brands.json")
+        first = BrandStore(JsonBrandBackend(path), flush_interval=60, check_interval=0, table="test_brands_1")
+        second = BrandStore(JsonBrandBackend(path), flush_interval=60, check_interval=0, table="test_brands_2")
+        
+        assert first.add("kaft.com", "Kaft") == ("Kaft", True)
+        assert first.add("kaft.com", "Other") == ("Kaft", False)
+        assert first.lookup("https://www.kaft.com/p/1") == "Kaft"
+        assert not os.path.exists(path)
+        
+        second.add("mavi.com", "Mavi", flush=True)
+        first.flush()
+        # Neither worker lost the other's brand
+        assert dict(first.all()) == {"kaft.com": "Kaft", "mavi.com": "Mavi"}
+        assert second.get("kaft.com") == "Kaft"
+    
+    def test_remove(self, tmp_path):
+        """Test that deletions are written immediately"""
+        store = BrandStore(JsonBrandBackend(str(tmp_path / "brands.json")), check_interval=0, table="test_brands_3")
+        store.add("kaft.com", "Kaft", flush=True)
+        assert store.remove("kaft.com") == ("kaft.com", "Kaft")
+        assert store.remove("kaft.com") is None
+        assert store.lookup("kaft.com") is None
+    
+    def test_sqlite_backend_version(self, tmp_path):
+        """Test that SQLite writes bump the version other workers poll"""
+        backend = SqliteBrandBackend(str(tmp_path / "brands.db"))
+        version = backend.version()
+        backend.apply([("add", "kaft.com", "Kaft"), ("add", "kaft.com", "Duplicate")])
+        assert backend.version() == version + 1
+        assert backend.load() == {"kaft.com": "Kaft"}
+
+
+class TestExtractionBenchmark:
+    """Test the saved-page benchmark corpus and harness"""
+    
+    def test_site_config_strategy_is_accurate(self):
+        """Test that the full static path gets every corpus field right"""
+        from benchmarks.extraction import run
+        result = run(repeat=1, strategies=["site_config", "jsonld"])
+        site = result["strategies"]["site_config"]
+        assert site["misses"] == []
+        assert set(site["latency_ms"]) == {"p50", "p90", "p99", "max"}
+        assert result["strategies"]["jsonld"]["sources"]["sportime-jsonld"]["price"] == "jsonld"
+        assert result["meta"]["documents"] >= 6
+    
+    def test_compare_flags_regressions(self):
+        """Test that slower or less accurate runs are reported against a baseline"""
+        from benchmarks.extraction import compare
+        baseline = {"strategies": {"universal": {"docs_per_sec": 100.0, "accuracy": {"price": 1.0}}}}
+        current = {"strategies": {"universal": {"docs_per_sec": 95.0, "accuracy": {"price": 0.5}}}}
+        assert compare(current, baseline) == ["universal: price accuracy 1.0 -> 0.5"]
+        current["strategies"]["universal"]["docs_per_sec"] = 50.0
+        assert len(compare(current, baseline)) == 2
+
+
+class TestTracer:
+    """Test per-scrape traces and the per-domain histograms"""
+    
+    def test_nested_entry_points_share_one_trace(self):
+        """Test that inner entry points join the outer trace and only the owner records it"""
+        tracer = Tracer(enabled=True, sample_rate=0)
+        
+        @tracer.traced("inner")
+        def inner(url):
+            with trace_stage("goto"):
+                pass
+            current_trace().claim("price", "jsonld")
+            current_trace().claim("price", "dom")
+            return {"title": "x"}
+        
+        with tracer.trace("https://www.zara.com/tr/p1", "outer") as trace:
+            assert inner("https://www.zara.com/tr/p1") == {"title": "x"}
+            assert tracer.stats["traces"] == 0
+        
+        assert current_trace() is None
+        assert trace.tiers == {"price": "jsonld"}
+        assert "goto" in trace.stages
+        recent = tracer.recent()
+        assert len(recent) == 1 and recent[0]["source"] == "outer" and recent[0]["domain"] == "zara.com"
+    
+    def test_async_traced_outcomes(self):
+        """Test that async entry points record ok/empty/error outcomes per domain"""
+        tracer = Tracer(enabled=True, sample_rate=0)
+        
+        @tracer.traced("scraper")
+        async def fetch(url, fail=False):
+            current_trace().mark("extract.dom")
+            if fail:
+                raise ValueError("boom")
+            return None
+        
+        asyncio.run(fetch("https://www.mango.com/a"))
+        with pytest.raises(ValueError):
+            asyncio.run(fetch("https://www.mango.com/b", fail=True))
+        
+        summary = tracer.summary()["mango.com"]
+        assert summary["outcomes"] == {"empty": 1, "error": 1}
+        assert summary["stages"]["extract.dom"]["count"] == 2
+        assert tracer.recent(1)[0]["error"] == "ValueError: boom"
+    
+    def test_histogram_percentiles(self):
+        """Test that percentiles report bucket upper bounds"""
+        histogram = Histogram([10, 100, 1000])
+        for ms in (5, 50, 60, 70, 5000):
+            histogram.observe(ms)
+        assert histogram.percentile(0.5) == 100
+        assert histogram.percentile(0.99) == 5000
+        assert histogram.summary()["buckets"] == {"<=10": 1, "<=100": 3, "<=1000": 0, "inf": 1}
+    
+    def test_sampled_traces_written_as_jsonl(self, tmp_path):
+        """Test that sampled traces are appended one JSON object per line"""
+        import json
+        path = tmp_path / "traces.jsonl"
+        tracer = Tracer(enabled=True, sample_rate=1.0, jsonl_path=str(path))
+        for i in range(2):
+            with tracer.trace(f"https://www.lcw.com/p{i}", "test") as trace:
+                trace.add_bytes("http", 1024)
+        tracer.observe("https://www.lcw.com/p0", "db_write", 0.004)
+        
+        lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [line["url"] for line in lines] == ["https://www.lcw.com/p0", "https://www.lcw.com/p1"]
+        summary = tracer.summary("lcw.com")["lcw.com"]
+        assert summary["bytes"] == {"http": 2048}
+        assert summary["stages"]["db_write"]["count"] == 1
+
+
+class TestStrategyStats:
+    """Test learned per-domain tier and selector ordering"""
+    
+    def make_stats(self, tmp_path, **kwargs):
+        options = dict(db_path=str(tmp_path / "stats.db"), enabled=True, explore_rate=0,
+                       min_attempts=3, flush_interval=60, reload_interval=3600)
+        options.update(kwargs)
+        return StrategyStats(**options)
+    
+    def test_never_matching_selectors_demoted(self, tmp_path):
+        """Test that dead selectors move last while the default priority is otherwise kept"""
+        stats = self.make_stats(tmp_path)
+        selectors = [".price-current", ".sale-price", ".product-price", ".price"]
+        assert stats.order("https://www.mavi.com/p/1", "price", "selector", selectors) == selectors
+        for _ in range(3):
+            stats.record_selectors("https://www.mavi.com/p/1", "price", selectors, ".product-price")
+        assert stats.order("https://mavi.com/p/2", "price", "selector", selectors) == [
+            ".product-price", ".price", ".price-current", ".sale-price"]
+        assert stats.order("https://www.lcw.com/p/1", "price", "selector", selectors) == selectors
+        assert ".price" not in stats.counts("mavi.com")[("price", "selector")]
+    
+    def test_catch_all_selectors_stay_last(self, tmp_path):
+        """Test that demoted specific selectors are not moved behind trailing span/div/p"""
+        stats = self.make_stats(tmp_path)
+        selectors = [".product-price", ".price", "span", "div", "p"]
+        for _ in range(20):
+            stats.record_selectors("https://example.com/p/1", "price", selectors, ".price")
+        assert stats.order("https://example.com/p/2", "price", "selector", selectors) == [
+            ".price", ".product-price", "span", "div", "p"]
+    
+    def test_exploration_keeps_default_order(self, tmp_path):
+        """Test that exploration runs return the default order"""
+        stats = self.make_stats(tmp_path, explore_rate=1.0)
+        for _ in range(3):
+            stats.record_selectors("https://www.mavi.com/p/1", "title", ["h1.title", "h1"], "h1")
+        assert stats.order("https://www.mavi.com/p/1", "title", "selector", ["h1.title", "h1"]) == ["h1.title", "h1"]
+        assert stats.stats["explored"] == 1
+    
+    def test_counters_persist_between_workers(self, tmp_path):
+        """Test that flushed counters are added to the table and loaded by another instance"""
+        first, second = self.make_stats(tmp_path), self.make_stats(tmp_path)
+        first.record("https://www.zara.com/a", "price", "tier", ["jsonld", "site"], "site")
+        second.record("https://www.zara.com/b", "price", "tier", ["jsonld", "site"], "site")
+        first.flush()
+        second.flush()
+        counts = self.make_stats(tmp_path).counts("zara.com")[("price", "tier")]
+        assert counts == {"jsonld": (2, 0), "site": (2, 2)}
+    
+    def test_learned_tier_order_in_resolution(self, tmp_path):
+        """Test that resolution records tried tiers and skips ahead to the usual winner"""
+        stats = self.make_stats(tmp_path)
+        html = """<html><head><meta property="og:title" content="Sneaker">
+        <meta property="og:image" content="https://example.com/s.jpg">
+        <meta property="product:price:amount" content="1299.99"></head><body></body></html>"""
+        url = "https://example.com/p/1"
+        for _ in range(3):
+            data = stats.resolve(html_extractor.candidates(html_extractor.parse(html), url))
+            assert data["sources"]["price"] == "meta"
+        assert stats.counts(url)[("price", "tier")] == {"jsonld": (3, 0), "site": (3, 0), "meta": (3, 3)}
+        
+        candidates = html_extractor.candidates(html_extractor.parse(html), url)
+        data = stats.resolve(candidates)
+        assert data["price"] == "1.299,99 TL"
+        assert candidates.tried["price"] == ["meta"]
+
+
+class TestCircuitBreaker:
+    """Test the per-domain circuit breaker"""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Test that N consecutive failures open the breaker and a success resets the count"""
+        breaker = CircuitBreaker(enabled=True, failure_threshold=3, cooldown=60)
+        url = "https://www.zara.com/tr/p1"
+        breaker.record_failure(url, "error")
+        breaker.record_failure(url, "error")
+        breaker.record_success(url, {"price": "999,00 TL"})
+        breaker.record_failure(url, "block")
+        breaker.record_failure(url, "block")
+        breaker.check(url)
+        breaker.record_failure(url, "block")
+        
+        with pytest.raises(CircuitOpenError) as excinfo:
+            breaker.check(url)
+        assert excinfo.value.last_good == {"price": "999,00 TL"}
+        with pytest.raises(CircuitOpenError) as excinfo:
+            breaker.check("https://zara.com/tr/p2")
+        assert excinfo.value.last_good is None and excinfo.value.retry_after > 50
+        breaker.check("https://www.mango.com/p1")
+        
+        snapshot = breaker.snapshot()
+        assert list(snapshot)[0] == "zara.com"
+        assert snapshot["zara.com"]["state"] == "open" and snapshot["zara.com"]["last_reason"] == "block"
+    
+    def test_half_open_probe(self):
+        """Test that one probe goes through after the cooldown and its outcome decides the state"""
+        breaker = CircuitBreaker(enabled=True, failure_threshold=1, cooldown=0, max_cooldown=10)
+        url = "https://www.bershka.com/p1"
+        breaker.record_failure(url)
+        breaker.check(url)  # probe
+        with pytest.raises(CircuitOpenError):
+            breaker.check(url)
+        breaker.record_failure(url)
+        assert breaker.snapshot()["bershka.com"]["state"] == "open"
+        
+        breaker._domains["bershka.com"]["cooldown"] = 0
+        breaker.check(url)
+        breaker.record_success(url)
+        assert breaker.snapshot()["bershka.com"]["state"] == "closed"
+        breaker.check(url)
+        breaker.check(url)
+    
+    def test_released_probe_goes_to_next_caller(self):
+        """Test that a probe that never scraped (queue timeout) does not block the domain"""
+        breaker = CircuitBreaker(enabled=True, failure_threshold=1, cooldown=0)
+        url = "https://www.bershka.com/p1"
+        breaker.record_failure(url)
+        breaker.check(url)  # probe
+        breaker.release_probe(url)
+        breaker.check(url)  # next caller probes instead of waiting for probe_timeout
+        with pytest.raises(CircuitOpenError):
+            breaker.check(url)
+    
+    def test_block_detection(self):
+        """Test block statuses and challenge page titles"""
+        assert is_block_status(403) and is_block_status(429) and not is_block_status(404)
+        assert is_block_title("Access Denied") and not is_block_title("Keten Gömlek")
+
+
+class TestNegativeCache:
+    """Test the negative-result cache"""
+    
+    def test_backoff_and_success(self):
+        """Test that consecutive failures double the TTL and a success clears the entry"""
+        cache = NegativeCache(enabled=True, base_ttl={"parse_miss": 100}, max_ttl=300)
+        url = "https://www.zara.com/tr/p1?utm_source=mail"
+        assert cache.get(url) is None
+        assert cache.record_failure(url, "parse_miss") == 100
+        assert cache.record_failure(url, "parse_miss") == 200
+        assert cache.record_failure(url, "parse_miss") == 300
+        
+        entry = cache.get("https://zara.com/tr/p1/")
+        assert entry["failure"] == "parse_miss" and entry["failures"] == 3 and entry["retry_after"] > 200
+        assert cache.get(url, bypass=True) is None
+        assert cache.get("https://zara.com/tr/p2") is None
+        
+        cache.record_success(url)
+        assert cache.get(url) is None
+        assert cache.record_failure(url, "parse_miss") == 100
+        assert cache.summary()["active"] == {"parse_miss": 1}
+    
+    def test_expired_entry_keeps_streak(self):
+        """Test that an expired entry is a miss but the next failure continues the streak"""
+        cache = NegativeCache(enabled=True, base_ttl={"timeout": 0}, forget_after=60)
+        url = "https://www.mango.com/p1"
+        cache.record_failure(url, "timeout")
+        assert cache.get(url) is None
+        cache._entries[flight_key(url)]["failures"] = 4
+        cache.base_ttl["timeout"] = 10
+        assert cache.record_failure(url, "timeout") == 160
+    
+    def test_classify_failure(self):
+        """Test failure classes of scrape exceptions"""
+        assert classify_failure(ScrapeBlocked("HTTP 403")) == "block"
+        assert classify_failure(asyncio.TimeoutError()) == "timeout"
+        assert classify_failure(PlaywrightTimeoutError("goto")) == "timeout"
+        assert classify_failure(ValueError("x")) == "error"
+
+
+class TestRetryPolicy:
+    """Test the scrape retry policy"""
+    
+    @staticmethod
+    def run(policy, outcomes):
+        """Run the policy against scripted attempt outcomes; returns (result, strategies used)"""
+        strategies = []
+        
+        async def attempt(url, strategy):
+            strategies.append(strategy)
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        
+        return asyncio.run(policy.run("https://www.zara.com/tr/p1", attempt)), strategies
+    
+    def test_budgets_per_failure_class(self):
+        """Test that each failure class is retried only within its budget"""
+        policy = RetryPolicy(max_attempts=4, budgets={"timeout": 2, "parse_miss": 0}, base_delay=0)
+        result, strategies = self.run(policy, [PlaywrightTimeoutError("goto"), PlaywrightTimeoutError("goto"), {"title": "GÖMLEK"}])
+        assert result == {"title": "GÖMLEK"} and strategies == ["default"] * 3
+        
+        result, strategies = self.run(policy, [{"title": None}, {"title": "GÖMLEK"}])
+        assert result is None and len(strategies) == 1
+        assert policy.stats["failures"] == {"timeout": 2, "parse_miss": 1}
+    
+    def test_escalation(self):
+        """Test that a bot page escalates to the thorough strategy and stays visible when retries run out"""
+        policy = RetryPolicy(max_attempts=3, budgets={"block": 1}, base_delay=0)
+        result, strategies = self.run(policy, [ScrapeBlocked("HTTP 403"), {"title": "ACCESS DENIED"}])
+        assert strategies == ["default", "thorough"]
+        assert result == {"title": "ACCESS DENIED"}
+        assert policy.stats["escalations"] == 1 and policy.stats["exhausted"] == 1
+    
+    def test_backoff(self):
+        """Test exponential backoff with jitter and the delay cap"""
+        policy = RetryPolicy(base_delay=1, max_delay=3, jitter=0.5)
+        assert 0.5 <= policy.delay(1) <= 1.5
+        assert 1.0 <= policy.delay(2) <= 3.0
+        assert 1.5 <= policy.delay(5) <= 4.5
+
+
+# Stand-in for unified_scraper/worker.js speaking the same NDJSON protocol
+FAKE_NODE_WORKER = """
+import json, os, sys, threading, time
+lock = threading.Lock()
+def handle(request):
+    url = request.get("url", "")
+    if "crash" in url:
+        os._exit(1)
+    if "slow" in url:
+        time.sleep(0.5)
+    response = {"id": request["id"], "ok": "fail" not in url, "rss": 1000 * request["id"]}
+    if response["ok"]:
+        response["data"] = {"name": url, "pid": os.getpid()}
+    else:
+        response["error"] = "boom"
+    with lock:
+        sys.stdout.write(json.dumps(response) + "\\n")
+        sys.stdout.flush()
+for line in sys.stdin:
+    threading.Thread(target=handle, args=(json.loads(line),)).start()
+"""
+
+
+class TestNodeBridge:
+    """Test the Node worker bridge against a fake worker process"""
+    
+    def make_pool(self, **kwargs):
+        return NodeWorkerPool(enabled=True, size=1, command=[sys.executable, "-c", FAKE_NODE_WORKER], cwd=".",
+                              request_timeout=5, **kwargs)
+    
+    def test_out_of_order_responses(self):
+        """Test that concurrent requests are matched to their responses by id"""
+        pool = self.make_pool()
+        try:
+            slow = pool.submit("https://www.nike.com/slow")
+            fast = pool.submit("https://www.nike.com/fast")
+            assert fast.result(5)["name"] == "https://www.nike.com/fast"
+            assert not slow.done()
+            assert slow.result(5)["name"] == "https://www.nike.com/slow"
+            with pytest.raises(NodeWorkerError):
+                pool.scrape("https://www.nike.com/fail")
+            assert asyncio.run(pool.scrape_async("https://www.nike.com/p1"))["name"] == "https://www.nike.com/p1"
+        finally:
+            pool.shutdown()
+    
+    def test_timeout_and_crash_restart(self):
+        """Test client timeouts and that a crashed worker fails its requests and is replaced"""
+        pool = self.make_pool()
+        try:
+            with pytest.raises(TimeoutError):
+                pool.scrape("https://www.nike.com/slow", timeout=0.1)
+            first_pid = pool.scrape("https://www.nike.com/p1")["pid"]
+            with pytest.raises(NodeWorkerError):
+                pool.scrape("https://www.nike.com/crash")
+            assert pool.scrape("https://www.nike.com/p2")["pid"] != first_pid
+            assert pool.stats["restarted"] == 1 and pool.stats["timeouts"] == 1
+        finally:
+            pool.shutdown()
+    
+    def test_recycles_after_max_requests(self):
+        """Test that a worker past max_requests is drained and replaced"""
+        pool = self.make_pool(max_requests=2)
+        try:
+            first_pid = pool.scrape("https://www.nike.com/p1")["pid"]
+            assert pool.scrape("https://www.nike.com/p2")["pid"] == first_pid
+            assert pool.scrape("https://www.nike.com/p3")["pid"] != first_pid
+            assert pool.stats["recycled"] == 1
+        finally:
+            pool.shutdown()
+    
+    def test_routes(self):
+        """Test which URLs go to the Node workers"""
+        pool = NodeWorkerPool(enabled=True, domains=("nike.com", "decathlon"))
+        assert pool.routes("https://www.nike.com/tr/t/p1") and pool.routes("https://www.decathlon.com.tr/p/1")
+        assert not pool.routes("https://www.zara.com/tr/p1")
+        assert not NodeWorkerPool(enabled=False).routes("https://www.nike.com/tr/t/p1")
+
+
+class FakeBrowser:
+    """Browser stand-in for pool bookkeeping tests"""
+    
+    def __init__(self):
+        self.closed = False
+    
+    def is_connected(self):
+        return not self.closed
+    
+    async def new_context(self, **options):
+        return FakeContext()
+    
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    async def close(self):
+        pass
+
+
+class TestBrowserGovernor:
+    """Test browser recycling by the governor"""
+    
+    def make_pool(self, **limits):
+        pool = BrowserPool(size=1, governor=BrowserGovernor(max_age=0, max_rss_mb=0, **limits))
+        
+        async def launch():
+            marker_args, info = pool.governor.track()
+            browser = FakeBrowser()
+            pool._info[browser] = info
+            return browser
+        
+        pool._launch = launch
+        return pool
+    
+    def test_drains_without_failing_in_flight(self):
+        """Test that a recycled browser keeps serving its open context and is closed once it is returned"""
+        pool = self.make_pool(max_served=2)
+        
+        async def scenario():
+            async with pool.context() as first:
+                async with pool.context():
+                    pass
+                old = pool._browsers[0]
+                async with pool.context():
+                    assert pool._browsers[0] is not old
+                    assert not old.closed and old in pool._draining
+                    assert len(pool.browser_stats()["draining"]) == 1
+            assert old.closed and not pool._draining
+            return pool.browser_stats()
+        
+        try:
+            stats = pool.run(scenario(), timeout=5)
+        finally:
+            pool.shutdown()
+        assert stats["recycled"] == {"recycled": 1, "reasons": {"pages": 1}}
+        assert stats["browsers"][0]["pages"] == 1 and stats["browsers"][0]["active"] == 0
+    
+    def test_age_limit(self):
+        """Test that a browser past max_age is replaced on the next borrow"""
+        governor = BrowserGovernor(max_served=0, max_age=60, max_rss_mb=0)
+        args, info = governor.track()
+        assert args[0].startswith(MARKER_SWITCH) and governor.recycle_reason(info) is None
+        info["launched"] -= 61
+        assert governor.recycle_reason(info) == "age"
+    
+    @pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+    def test_process_tree_rss(self):
+        """Test finding a tagged process and summing its tree's memory"""
+        import subprocess
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(10)", f"{MARKER_SWITCH}=t3st"])
+        try:
+            deadline = time.time() + 5
+            while find_browser_process("t3st") is None and time.time() < deadline:
+                time.sleep(0.05)
+            assert find_browser_process("t3st") == child.pid
+            child_rss = process_tree_rss(child.pid)
+            assert child_rss > 0
+            assert process_tree_rss(os.getpid()) > child_rss
+        finally:
+            child.kill()
+            child.wait()
+        assert process_tree_rss(child.pid) is None
+
+
+class FakeCapturePage:
+    """Page stand-in returning fixed HTML and screenshot bytes"""
+    
+    def __init__(self, size=1000):
+        self.size = size
+    
+    async def content(self):
+        return "<html><title>Gömlek</title></html>"
+    
+    async def screenshot(self, **options):
+        return os.urandom(self.size)
+
+
+class TestDebugCapture:
+    """Test sampled debug captures"""
+    
+    def test_sampling_per_outcome_and_domain(self, tmp_path):
+        """Test that rates apply per outcome with per-domain overrides"""
+        capture = DebugCapture(directory=str(tmp_path), rates={"success": 0.0, "failure": 1.0},
+                               domain_rates={"pullandbear.com": {"success": 1.0}})
+        assert capture.rate("https://www.zara.com/p1", "success") == 0.0
+        assert capture.rate("https://www.zara.com/p1", "parse_miss") == 1.0
+        assert capture.rate("https://www.pullandbear.com/p1", "success") == 1.0
+        
+        page = FakeCapturePage()
+        assert asyncio.run(capture.capture(page, "https://www.zara.com/p1", "success")) is None
+        capture_id = asyncio.run(capture.capture(page, "https://www.zara.com/p1", "block", {"status": 403}))
+        capture.flush(5)
+        
+        assert [meta["id"] for meta in capture.recent()] == [capture_id]
+        assert capture.recent()[0]["details"] == {"status": 403}
+        assert "Gömlek" in capture.read(capture_id, "html").decode("utf-8")
+        assert len(capture.read(capture_id, "screenshot")) == 1000
+        assert capture.read("../etc/passwd", "html") is None and capture.read(capture_id, "other") is None
+    
+    def test_ring_buffer(self, tmp_path):
+        """Test that the oldest captures are evicted once the directory exceeds max_bytes"""
+        capture = DebugCapture(directory=str(tmp_path), rates={"failure": 1.0}, domain_rates={}, max_bytes=25000)
+        ids = []
+        for i in range(5):
+            ids.append(asyncio.run(capture.capture(FakeCapturePage(10000), f"https://www.mango.com/p{i}", "error")))
+            capture.flush(5)
+            time.sleep(0.01)
+        
+        assert {meta["id"] for meta in capture.recent()} == set(ids[-2:])
+        assert capture.read(ids[0], "screenshot") is None
+        assert capture.stats["evicted"] == 3
+
+
+def png_header(width, height):
+    import struct
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', width, height) + b'\x08\x02\x00\x00\x00'
+
+
+class FakeRangeFetcher:
+    """fetch_range stand-in serving fixed responses per URL"""
+    
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+    
+    async def fetch_range(self, url, length, headers=None, timeout=None):
+        self.calls.append((url, length, headers.get("Referer")))
+        response = self.responses.get(url)
+        if response is None:
+            return None
+        status, content_type, body = response
+        return {"status": status, "content_type": content_type, "total": len(body), "body": body[:length]}
+
+
+class TestImageProbe:
+    """Test header-only image probing and candidate ranking"""
+    
+    def test_image_info(self):
+        """Test type and dimensions from image headers"""
+        import struct
+        jpeg = (b'\xff\xd8' + b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+                + b'\xff\xc0' + struct.pack('>HBHH', 17, 8, 1200, 800) + b'\x00' * 10)
+        webp = b'RIFF' + b'\x00' * 4 + b'WEBPVP8X' + b'\x00' * 8 + (999).to_bytes(3, 'little') + (1499).to_bytes(3, 'little')
+        assert image_info(png_header(1, 1)) == ("png", 1, 1)
+        assert image_info(b'GIF89a' + struct.pack('<HH', 300, 200)) == ("gif", 300, 200)
+        assert image_info(jpeg) == ("jpeg", 800, 1200)
+        assert image_info(webp) == ("webp", 1000, 1500)
+        assert image_info(b'<?xml version="1.0"?><svg xmlns="x"></svg>')[0] == "svg"
+        assert image_info(b'<html>not found</html>') == (None, None, None)
+    
+    def test_rank_drops_placeholders_and_logos(self):
+        """Test that tiny, elongated, SVG and missing candidates are dropped and large ones ranked first"""
+        fetcher = FakeRangeFetcher({
+            "https://cdn.shop.com/pixel.png": (200, "image/png", png_header(1, 1)),
+            "https://cdn.shop.com/logo.png": (200, "image/png", png_header(900, 120)),
+            "https://cdn.shop.com/logo.svg": (200, "image/svg+xml", b'<svg></svg>'),
+            "https://cdn.shop.com/thumb.png": (200, "image/png", png_header(300, 400)),
+            "https://cdn.shop.com/main.png": (200, "image/png", png_header(1000, 1500)),
+            "https://cdn.shop.com/alt.png": (206, "image/png", png_header(800, 1200)),
+            "https://cdn.shop.com/gone.png": (404, "text/html", b'<html></html>'),
+            "https://cdn.other.com/protected.jpg": (403, "text/html", b'<html></html>'),
+        })
+        prober = ImageProber(config={"enabled": True}, fetcher=fetcher)
+        urls = ["https://cdn.shop.com/pixel.png", "https://cdn.shop.com/logo.png", "https://cdn.shop.com/logo.svg",
+                "https://cdn.shop.com/thumb.png", "https://cdn.shop.com/main.png", "https://cdn.shop.com/alt.png",
+                "https://cdn.shop.com/gone.png", "https://cdn.other.com/protected.jpg", "data:image/gif;base64,R0lG"]
+        ranked = asyncio.run(prober.rank(urls, referer="https://www.shop.com/p1"))
+        assert ranked["images"] == ["https://cdn.shop.com/main.png", "https://cdn.shop.com/alt.png",
+                                    "https://cdn.shop.com/thumb.png", "https://cdn.other.com/protected.jpg"]
+        assert ranked["image"] == "https://cdn.shop.com/main.png"
+        assert prober.stats["rejected"] == 4
+        assert all(call[1:] == (32 * 1024, "https://www.shop.com/p1") for call in fetcher.calls)
+        
+        # Probe cache: a second ranking does not hit the network
+        asyncio.run(prober.rank(urls))
+        assert len(fetcher.calls) == 8 and prober.stats["cache_hits"] == 8
+        
+        # Browser path: weak (small / elongated) images are kept last, definite misses still dropped
+        ranked = asyncio.run(prober.rank(urls, keep_weak=True))
+        assert ranked["images"] == ["https://cdn.shop.com/main.png", "https://cdn.shop.com/alt.png",
+                                    "https://cdn.shop.com/thumb.png", "https://cdn.other.com/protected.jpg",
+                                    "https://cdn.shop.com/logo.png"]
+        
+        thumb = {"https://cdn.shop.com/small.png": (200, "image/png", png_header(180, 180))}
+        prober = ImageProber(config={"enabled": True}, fetcher=FakeRangeFetcher(thumb))
+        assert asyncio.run(prober.rank(list(thumb)))["image"] is None
+        assert asyncio.run(prober.rank(list(thumb), keep_weak=True))["image"] == "https://cdn.shop.com/small.png"
+    
+    def test_disabled_keeps_order(self):
+        """Test that a disabled prober returns the candidates unchanged"""
+        prober = ImageProber(config={"enabled": False}, fetcher=FakeRangeFetcher({}))
+        ranked = asyncio.run(prober.rank(["https://a.com/1.jpg", "https://a.com/2.jpg", "https://a.com/1.jpg"]))
+        assert ranked == {"image": "https://a.com/1.jpg", "images": ["https://a.com/1.jpg", "https://a.com/2.jpg"], "probes": {}}
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -3,28 +3,45 @@ const StealthPlugin = require('puppeteer-extra-plugin-stealth');
 
 puppeteer.use(StealthPlugin());
 
+const LAUNCH_OPTIONS = {
+    headless: "new",
+    args: [
+        '--no-sandbox',
+        '--disable-setuid-sandbox',
+        '--window-size=1920,1080'
+    ]
+};
+
+/**
+ * Launches a stealth browser (worker.js keeps one warm across requests).
+ * @returns {Promise<Browser>}
+ */
+function launchBrowser() {
+    return puppeteer.launch(LAUNCH_OPTIONS);
+}
+
 /**
  * Scrapes product data from a given URL.
  * @param {string} url - The product URL.
+ * @param {Object} [options]
+ * @param {Browser} [options.browser] - Warm browser to use; the page gets its own context, the browser stays open.
+ *                                      Without it a browser is launched and closed for this call.
+ * @param {number} [options.timeout] - Navigation timeout in ms (default 60000).
  * @returns {Promise<Object>} - The scraped product data.
  */
-async function scrape(url) {
-    const browser = await puppeteer.launch({
-        headless: "new",
-        args: [
-            '--no-sandbox',
-            '--disable-setuid-sandbox',
-            '--window-size=1920,1080'
-        ]
-    });
+async function scrape(url, options = {}) {
+    const ownBrowser = !options.browser;
+    const browser = options.browser || await launchBrowser();
+    // Shared browser: isolated cookies/storage per request
+    const context = ownBrowser ? null : await browser.createBrowserContext();
 
     try {
-        const page = await browser.newPage();
+        const page = await (context || browser).newPage();
         await page.setUserAgent('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36');
         await page.setViewport({ width: 1920, height: 1080 });
 
         console.error(`Navigating to ${url}...`); // Use stderr for logs so stdout is clean JSON
-        await page.goto(url, { waitUntil: 'networkidle2', timeout: 60000 });
+        await page.goto(url, { waitUntil: 'networkidle2', timeout: options.timeout || 60000 });
 
         const domain = new URL(url).hostname;
         let data = {};
@@ -51,7 +68,11 @@ async function scrape(url) {
         console.error("Scraping failed:", error);
         return { error: error.message };
     } finally {
-        await browser.close();
+        if (ownBrowser) {
+            await browser.close();
+        } else {
+            await context.close().catch(() => { });
+        }
     }
 }
 
@@ -207,4 +228,4 @@ async function scrapeGeneric(page) {
     });
 }
 
-module.exports = { scrape };
+module.exports = { scrape, launchBrowser };
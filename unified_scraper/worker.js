@@ -0,0 +1,110 @@
+#!/usr/bin/env node
+/**
+ * Long-lived scrape worker: one warm stealth browser, newline-delimited JSON over stdio.
+ *
+ * Request:  {"id": 1, "op": "scrape", "url": "https://...", "timeout": 60000}
+ *           {"id": 2, "op": "ping"}
+ * Response: {"id": 1, "ok": true, "data": {...}, "rss": 123456789}
+ *           {"id": 1, "ok": false, "error": "...", "rss": 123456789}
+ *
+ * Up to WORKER_MAX_PAGES requests run at once, the rest wait in order;
+ * responses come back in completion order, matched by id. Logs go to
+ * stderr so stdout stays one JSON object per line. Closing stdin lets the
+ * running requests finish, then closes the browser and exits.
+ */
+const readline = require('readline');
+const { scrape, launchBrowser } = require('./index');
+
+const MAX_PAGES = Math.max(1, parseInt(process.env.WORKER_MAX_PAGES || '2', 10));
+
+let browserPromise = null;
+let active = 0;
+let closing = false;
+const queue = [];
+
+function getBrowser() {
+    if (!browserPromise) {
+        browserPromise = launchBrowser().then(browser => {
+            // Crashed browser: relaunch on the next request
+            browser.on('disconnected', () => { browserPromise = null; });
+            return browser;
+        }, error => {
+            browserPromise = null;
+            throw error;
+        });
+    }
+    return browserPromise;
+}
+
+function send(message) {
+    message.rss = process.memoryUsage().rss;
+    process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+async function handle(request) {
+    if (request.op === 'ping') {
+        send({ id: request.id, ok: true, data: { active, queued: queue.length } });
+        return;
+    }
+    if (request.op !== 'scrape' || !request.url) {
+        send({ id: request.id, ok: false, error: `Unknown request: ${request.op}` });
+        return;
+    }
+    try {
+        const browser = await getBrowser();
+        const data = await scrape(request.url, { browser, timeout: request.timeout });
+        if (data && data.error) {
+            send({ id: request.id, ok: false, error: data.error });
+        } else {
+            send({ id: request.id, ok: true, data });
+        }
+    } catch (error) {
+        send({ id: request.id, ok: false, error: error.message });
+    }
+}
+
+function pump() {
+    while (active < MAX_PAGES && queue.length) {
+        const request = queue.shift();
+        active++;
+        handle(request).finally(() => {
+            active--;
+            pump();
+        });
+    }
+    if (closing && active === 0 && queue.length === 0) {
+        shutdown();
+    }
+}
+
+let shuttingDown = false;
+function shutdown() {
+    if (shuttingDown) return;
+    shuttingDown = true;
+    const browserClosed = browserPromise
+        ? browserPromise.then(browser => browser.close()).catch(() => { })
+        : Promise.resolve();
+    browserClosed.finally(() => process.exit(0));
+}
+
+const lines = readline.createInterface({ input: process.stdin });
+
+lines.on('line', line => {
+    if (!line.trim()) return;
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (error) {
+        send({ id: null, ok: false, error: `Invalid JSON: ${error.message}` });
+        return;
+    }
+    queue.push(request);
+    pump();
+});
+
+lines.on('close', () => {
+    closing = true;
+    pump();
+});
+
+console.error(`unified_scraper worker ready (pid ${process.pid}, ${MAX_PAGES} pages)`);
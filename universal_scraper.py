@@ -8,6 +8,9 @@ import json
 from urllib.parse import urlparse
 from typing import Dict, List, Optional, Tuple
 
+from scrapers.price_parser import parse_price, parse_prices, parse_price_info, format_price
+from scrapers.request_blocking import blocked_images
+
 
 class UniversalScraper:
     """Evrensel ürün scraping sınıfı"""
@@ -61,6 +64,27 @@ class UniversalScraper:
             'img[src*=".webp"]',
             'img[src*=".png"]'
         ]
+        
+        # Meta tag selector'ları (live ve statik HTML extraction ortak kullanır)
+        self.title_meta_selectors = [
+            'meta[property="og:title"]',
+            'meta[name="twitter:title"]',
+            'meta[property="product:title"]',
+            'meta[name="title"]'
+        ]
+        
+        self.price_meta_selectors = [
+            'meta[property="product:price:amount"]',
+            'meta[name="price"]',
+            'meta[itemprop="price"]'
+        ]
+        
+        self.image_meta_selectors = [
+            'meta[property="og:image"]',
+            'meta[name="twitter:image"]',
+            'meta[property="product:image"]',
+            'meta[itemprop="image"]'
+        ]
     
     async def extract_title(self, page) -> Optional[str]:
         """Başlık çekme - Öncelik sırası: JSON-LD > Meta Tags > DOM Selectors"""
@@ -211,36 +235,9 @@ class UniversalScraper:
             scripts = await page.query_selector_all('script[type="application/ld+json"]')
             for script in scripts:
                 try:
-                    content = await script.text_content()
-                    if not content:
-                        continue
-                    
-                    data = json.loads(content)
-                    
-                    # Product schema kontrolü
-                    if isinstance(data, dict):
-                        if data.get('@type') == 'Product' or 'Product' in str(data.get('@type', '')):
-                            title = data.get('name') or data.get('title')
-                            if title:
-                                return title
-                    
-                    # Array içinde Product arama
-                    if isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict) and (item.get('@type') == 'Product' or 'Product' in str(item.get('@type', ''))):
-                                title = item.get('name') or item.get('title')
-                                if title:
-                                    return title
-                    
-                    # Nested structure kontrolü
-                    if isinstance(data, dict) and '@graph' in data:
-                        for item in data.get('@graph', []):
-                            if isinstance(item, dict) and (item.get('@type') == 'Product' or 'Product' in str(item.get('@type', ''))):
-                                title = item.get('name') or item.get('title')
-                                if title:
-                                    return title
-                except json.JSONDecodeError:
-                    continue
+                    title = self._title_from_jsonld(await script.text_content())
+                    if title:
+                        return title
                 except Exception:
                     continue
         except Exception:
@@ -251,14 +248,7 @@ class UniversalScraper:
     async def _extract_title_from_meta(self, page) -> Optional[str]:
         """Meta tags'den başlık çek"""
         try:
-            meta_selectors = [
-                'meta[property="og:title"]',
-                'meta[name="twitter:title"]',
-                'meta[property="product:title"]',
-                'meta[name="title"]'
-            ]
-            
-            for selector in meta_selectors:
+            for selector in self.title_meta_selectors:
                 try:
                     element = await page.query_selector(selector)
                     if element:
@@ -278,50 +268,9 @@ class UniversalScraper:
             scripts = await page.query_selector_all('script[type="application/ld+json"]')
             for script in scripts:
                 try:
-                    content = await script.text_content()
-                    if not content:
-                        continue
-                    
-                    data = json.loads(content)
-                    
-                    # Product schema kontrolü
-                    product_data = None
-                    if isinstance(data, dict):
-                        if data.get('@type') == 'Product' or 'Product' in str(data.get('@type', '')):
-                            product_data = data
-                    elif isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict) and (item.get('@type') == 'Product' or 'Product' in str(item.get('@type', ''))):
-                                product_data = item
-                                break
-                    
-                    if product_data and 'offers' in product_data:
-                        offers = product_data['offers']
-                        
-                        # Single offer
-                        if isinstance(offers, dict):
-                            price_value = offers.get('price') or offers.get('priceCurrency')
-                            if price_value:
-                                price_str = self._format_price(price_value)
-                                return {'current': price_str, 'old': None}
-                        
-                        # Multiple offers
-                        elif isinstance(offers, list) and len(offers) > 0:
-                            prices = []
-                            for offer in offers:
-                                if isinstance(offer, dict):
-                                    price_value = offer.get('price')
-                                    if price_value:
-                                        prices.append(float(str(price_value).replace(',', '.')))
-                            
-                            if prices:
-                                prices.sort()
-                                current = self._format_price(prices[0])
-                                old = self._format_price(prices[-1]) if len(prices) > 1 and prices[-1] != prices[0] else None
-                                return {'current': current, 'old': old}
-                
-                except json.JSONDecodeError:
-                    continue
+                    price_data = self._price_from_jsonld(await script.text_content())
+                    if price_data:
+                        return price_data
                 except Exception:
                     continue
         except Exception:
@@ -332,26 +281,15 @@ class UniversalScraper:
     async def _extract_price_from_meta(self, page) -> Optional[Dict[str, str]]:
         """Meta tags'den fiyat çek"""
         try:
-            meta_selectors = [
-                ('meta[property="product:price:amount"]', 'current'),
-                ('meta[name="price"]', 'current'),
-                ('meta[itemprop="price"]', 'current')
-            ]
-            
-            price = None
-            for selector, _ in meta_selectors:
+            for selector in self.price_meta_selectors:
                 try:
                     element = await page.query_selector(selector)
                     if element:
                         price_value = await element.get_attribute('content')
                         if price_value:
-                            price = self._format_price(price_value)
-                            break
+                            return {'current': self._format_price(price_value), 'old': None}
                 except:
                     continue
-            
-            if price:
-                return {'current': price, 'old': None}
         except Exception:
             pass
         
@@ -360,38 +298,16 @@ class UniversalScraper:
     async def _extract_price_from_dom(self, page, url: str) -> Optional[Dict[str, str]]:
         """DOM selector'larından fiyat çek"""
         try:
-            all_prices = []
-            
+            texts = []
             for selector in self.price_selectors:
                 try:
                     elements = await page.query_selector_all(selector)
                     for element in elements:
-                        price_text = await element.text_content()
-                        if price_text and price_text.strip():
-                            # Fiyat formatlarını parse et
-                            prices = self._parse_price_text(price_text)
-                            for p in prices:
-                                if p and p not in all_prices:
-                                    all_prices.append(p)
+                        texts.append(await element.text_content())
                 except:
                     continue
             
-            if all_prices:
-                # Fiyatları sayısal değere çevir ve sırala
-                price_nums = []
-                for p in all_prices:
-                    try:
-                        num = self._price_to_float(p)
-                        if 10 <= num <= 100000:  # Mantıklı fiyat aralığı
-                            price_nums.append({'value': num, 'text': p})
-                    except:
-                        continue
-                
-                if price_nums:
-                    price_nums.sort(key=lambda x: x['value'])
-                    current = price_nums[0]['text']
-                    old = price_nums[-1]['text'] if len(price_nums) > 1 and price_nums[-1]['value'] != price_nums[0]['value'] else None
-                    return {'current': current, 'old': old}
+            return self._prices_from_texts(texts)
         except Exception as e:
             print(f"[DEBUG] DOM fiyat çekme hatası: {e}")
         
@@ -400,35 +316,7 @@ class UniversalScraper:
     async def _extract_price_with_regex(self, page) -> Optional[Dict[str, str]]:
         """Regex ile sayfadan fiyat çek (son çare)"""
         try:
-            page_text = await page.text_content()
-            if not page_text:
-                return None
-            
-            # Türkçe format: 1.299,99 veya 1.299,99 TL
-            price_patterns = [
-                r'([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2})\s*(?:₺|TL|tl)?',
-                r'([0-9]{1,3}(?:\.[0-9]{3})*\.[0-9]{2})\s*(?:₺|TL|tl)?',  # İngilizce format
-                r'([0-9]+(?:\.[0-9]{2})?)\s*(?:₺|TL|tl)'
-            ]
-            
-            all_prices = []
-            for pattern in price_patterns:
-                matches = re.findall(pattern, page_text)
-                for match in matches:
-                    try:
-                        num = self._price_to_float(match)
-                        if 10 <= num <= 100000:
-                            formatted = self._format_price(match)
-                            if formatted not in all_prices:
-                                all_prices.append({'value': num, 'text': formatted})
-                    except:
-                        continue
-            
-            if all_prices:
-                all_prices.sort(key=lambda x: x['value'])
-                current = all_prices[0]['text']
-                old = all_prices[-1]['text'] if len(all_prices) > 1 and all_prices[-1]['value'] != all_prices[0]['value'] else None
-                return {'current': current, 'old': old}
+            return self._prices_from_text(await page.text_content())
         except Exception:
             pass
         
@@ -440,54 +328,9 @@ class UniversalScraper:
             scripts = await page.query_selector_all('script[type="application/ld+json"]')
             for script in scripts:
                 try:
-                    content = await script.text_content()
-                    if not content:
-                        continue
-                    
-                    data = json.loads(content)
-                    
-                    # Product schema kontrolü
-                    product_data = None
-                    if isinstance(data, dict):
-                        if data.get('@type') == 'Product' or 'Product' in str(data.get('@type', '')):
-                            product_data = data
-                    elif isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict) and (item.get('@type') == 'Product' or 'Product' in str(item.get('@type', ''))):
-                                product_data = item
-                                break
-                    
-                    if product_data:
-                        images = []
-                        
-                        # image field
-                        if 'image' in product_data:
-                            img = product_data['image']
-                            if isinstance(img, str):
-                                images.append(img)
-                            elif isinstance(img, list):
-                                images.extend([i for i in img if isinstance(i, str)])
-                            elif isinstance(img, dict) and 'url' in img:
-                                images.append(img['url'])
-                        
-                        # images field
-                        if 'images' in product_data:
-                            imgs = product_data['images']
-                            if isinstance(imgs, list):
-                                for img in imgs:
-                                    if isinstance(img, str):
-                                        images.append(img)
-                                    elif isinstance(img, dict) and 'url' in img:
-                                        images.append(img['url'])
-                        
-                        if images:
-                            # İlk görseli ana görsel olarak seç
-                            primary = self._normalize_image_url(images[0], page.url)
-                            all_images = [self._normalize_image_url(img, page.url) for img in images]
-                            return {'primary': primary, 'all': all_images}
-                
-                except json.JSONDecodeError:
-                    continue
+                    image_data = self._images_from_jsonld(await script.text_content(), page.url)
+                    if image_data:
+                        return image_data
                 except Exception:
                     continue
         except Exception:
@@ -498,15 +341,8 @@ class UniversalScraper:
     async def _extract_image_from_meta(self, page) -> Optional[Dict[str, any]]:
         """Meta tags'den görsel çek"""
         try:
-            meta_selectors = [
-                'meta[property="og:image"]',
-                'meta[name="twitter:image"]',
-                'meta[property="product:image"]',
-                'meta[itemprop="image"]'
-            ]
-            
             images = []
-            for selector in meta_selectors:
+            for selector in self.image_meta_selectors:
                 try:
                     element = await page.query_selector(selector)
                     if element:
@@ -516,10 +352,7 @@ class UniversalScraper:
                 except:
                     continue
             
-            if images:
-                primary = self._normalize_image_url(images[0], page.url)
-                all_images = [self._normalize_image_url(img, page.url) for img in images]
-                return {'primary': primary, 'all': all_images}
+            return self._images_from_urls(images, page.url)
         except Exception:
             pass
         
@@ -528,89 +361,19 @@ class UniversalScraper:
     async def _extract_image_from_dom(self, page, url: str) -> Optional[Dict[str, any]]:
         """DOM selector'larından görsel çek"""
         try:
-            all_product_images = []
-            
+            elements = []
             for selector in self.image_selectors:
                 try:
                     img_elements = await page.query_selector_all(selector)
                     for img_element in img_elements:
-                        # srcset kontrolü
-                        srcset = await img_element.get_attribute('srcset')
-                        src = await img_element.get_attribute('src')
-                        data_src = await img_element.get_attribute('data-src')
-                        data_lazy_src = await img_element.get_attribute('data-lazy-src')
-                        alt_text = await img_element.get_attribute('alt') or ''
-                        
-                        # srcset'ten en yüksek kaliteli görseli al
-                        if srcset:
-                            srcset_parts = srcset.split(',')
-                            highest_res = None
-                            max_width = 0
-                            
-                            for part in srcset_parts:
-                                part = part.strip()
-                                if ' ' in part:
-                                    url_part, size_part = part.rsplit(' ', 1)
-                                    if 'w' in size_part:
-                                        try:
-                                            width = int(size_part.replace('w', ''))
-                                            if width > max_width:
-                                                max_width = width
-                                                highest_res = url_part.strip()
-                                        except ValueError:
-                                            continue
-                            
-                            if highest_res:
-                                src = highest_res
-                        
-                        # data-src ve data-lazy-src kontrolü (lazy loading)
-                        if data_lazy_src and not src:
-                            src = data_lazy_src
-                        if data_src and not src:
-                            src = data_src
-                        
-                        if src:
-                            # Relative URL'yi absolute yap
-                            src = self._normalize_image_url(src, url)
-                            
-                            # Skip keyword kontrolü
-                            src_lower = src.lower()
-                            if any(keyword in src_lower for keyword in self.skip_keywords):
-                                continue
-                            
-                            # Görsel formatı kontrolü
-                            if any(ext in src_lower for ext in ['.jpg', '.jpeg', '.webp', '.png']):
-                                # Priority score hesapla
-                                priority_score = 0
-                                alt_lower = alt_text.lower()
-                                
-                                if 'product' in alt_lower or 'ürün' in alt_lower or 'resmi' in alt_lower:
-                                    priority_score += 100
-                                if max_width > 0:
-                                    priority_score += max_width / 10
-                                
-                                all_product_images.append({
-                                    'url': src,
-                                    'width': max_width if max_width > 0 else 0,
-                                    'priority': priority_score,
-                                    'alt': alt_text
-                                })
+                        element = {}
+                        for attr in ('srcset', 'src', 'data-src', 'data-lazy-src', 'alt'):
+                            element[attr] = await img_element.get_attribute(attr)
+                        elements.append(element)
                 except Exception as e:
                     continue
             
-            if all_product_images:
-                # Priority score'a göre sırala
-                all_product_images.sort(key=lambda x: x.get('priority', 0), reverse=True)
-                
-                # En yüksek öncelikli görseli seç
-                selected = all_product_images[0]
-                primary = selected['url']
-                
-                # Tüm görselleri topla (tekrar yoksa)
-                all_images = [img['url'] for img in all_product_images if img['url'] not in [primary]]
-                all_images.insert(0, primary)
-                
-                return {'primary': primary, 'all': all_images}
+            return self._images_from_elements(elements, url)
         except Exception as e:
             print(f"[DEBUG] DOM görsel çekme hatası: {e}")
         
@@ -620,35 +383,264 @@ class UniversalScraper:
         """Fallback: Tüm görselleri tara"""
         try:
             all_imgs = await page.query_selector_all('img')
-            candidate_images = []
+            blocked = blocked_images(page)
+            elements = []
             
             for img in all_imgs:
                 try:
-                    src = await img.get_attribute('src')
-                    if src and any(ext in src.lower() for ext in ['.jpg', '.jpeg', '.webp', '.png']):
-                        # Skip keyword kontrolü
-                        if not any(keyword in src.lower() for keyword in self.skip_keywords):
-                            # Boyut kontrolü
-                            try:
-                                size = await img.bounding_box()
-                                if size and size['width'] > 150 and size['height'] > 150:
-                                    src = self._normalize_image_url(src, url)
-                                    if src not in candidate_images:
-                                        candidate_images.append(src)
-                            except:
-                                src = self._normalize_image_url(src, url)
-                                if src not in candidate_images:
-                                    candidate_images.append(src)
+                    element = {'src': await img.get_attribute('src')}
+                    if not self._is_image_candidate(element['src']):
+                        continue
+                    try:
+                        size = await img.bounding_box()
+                        element['width'] = size['width'] if size else 0
+                        element['height'] = size['height'] if size else 0
+                        # Görsel byte'ları engellendiyse (request blocking) 1x1 placeholder render edilir;
+                        # gerçek 1x1 tracking pixel'ler placeholder sayılmaz
+                        element['placeholder'] = await img.evaluate("i => i.currentSrc || i.src") in blocked
+                    except:
+                        # Boyut bilinemiyorsa aday olarak tut
+                        element['placeholder'] = True
+                    elements.append(element)
                 except:
                     continue
-                    
-            if candidate_images:
-                return {'primary': candidate_images[0], 'all': candidate_images}
+            
+            return self._images_from_fallback(elements, url)
         except Exception:
             pass
         
         return None
 
+    # ========== Page-independent Strategies ==========
+    # Live (Playwright) ve statik HTML extraction aynı parse mantığını kullanır
+    
+    def _find_jsonld_product(self, data) -> Optional[Dict]:
+        """JSON-LD verisinden Product objesini bul (obje, liste veya @graph)"""
+        candidates = []
+        if isinstance(data, dict):
+            candidates.append(data)
+            graph = data.get('@graph')
+            if isinstance(graph, list):
+                candidates.extend(graph)
+        elif isinstance(data, list):
+            candidates.extend(data)
+        
+        for item in candidates:
+            if isinstance(item, dict) and (item.get('@type') == 'Product' or 'Product' in str(item.get('@type', ''))):
+                return item
+        return None
+    
+    def _load_jsonld_product(self, content) -> Optional[Dict]:
+        """JSON-LD script içeriğini parse edip Product objesini döndür"""
+        if not content:
+            return None
+        try:
+            return self._find_jsonld_product(json.loads(content))
+        except json.JSONDecodeError:
+            return None
+    
+    def _title_from_jsonld(self, content) -> Optional[str]:
+        """Tek bir JSON-LD script içeriğinden başlık"""
+        product_data = self._load_jsonld_product(content)
+        if product_data:
+            return product_data.get('name') or product_data.get('title')
+        return None
+    
+    def _price_from_jsonld(self, content) -> Optional[Dict[str, str]]:
+        """Tek bir JSON-LD script içeriğinden current/old fiyat"""
+        product_data = self._load_jsonld_product(content)
+        if not product_data or 'offers' not in product_data:
+            return None
+        
+        offers = product_data['offers']
+        
+        # Single offer / AggregateOffer (lowPrice-highPrice satıcılar arası aralık, indirim değil)
+        if isinstance(offers, dict):
+            price_value = offers.get('price') or offers.get('lowPrice')
+            if price_value and parse_price(price_value) is not None:
+                return {'current': self._format_price(price_value), 'old': None}
+        
+        # Multiple offers
+        elif isinstance(offers, list) and len(offers) > 0:
+            prices = []
+            for offer in offers:
+                if isinstance(offer, dict):
+                    price_value = offer.get('price')
+                    if price_value:
+                        amount = parse_price(price_value)
+                        if amount is not None:
+                            prices.append(amount)
+            
+            if prices:
+                prices.sort()
+                current = self._format_price(prices[0])
+                old = self._format_price(prices[-1]) if len(prices) > 1 and prices[-1] != prices[0] else None
+                return {'current': current, 'old': old}
+        
+        return None
+    
+    def _images_from_jsonld(self, content, base_url: str) -> Optional[Dict[str, any]]:
+        """Tek bir JSON-LD script içeriğinden görseller"""
+        product_data = self._load_jsonld_product(content)
+        if not product_data:
+            return None
+        
+        images = []
+        
+        # image field
+        if 'image' in product_data:
+            img = product_data['image']
+            if isinstance(img, str):
+                images.append(img)
+            elif isinstance(img, list):
+                images.extend([i for i in img if isinstance(i, str)])
+            elif isinstance(img, dict) and 'url' in img:
+                images.append(img['url'])
+        
+        # images field
+        if 'images' in product_data:
+            imgs = product_data['images']
+            if isinstance(imgs, list):
+                for img in imgs:
+                    if isinstance(img, str):
+                        images.append(img)
+                    elif isinstance(img, dict) and 'url' in img:
+                        images.append(img['url'])
+        
+        return self._images_from_urls(images, base_url)
+    
+    def _images_from_urls(self, images: List[str], base_url: str) -> Optional[Dict[str, any]]:
+        """İlk görsel ana görsel, hepsi absolute URL"""
+        if not images:
+            return None
+        primary = self._normalize_image_url(images[0], base_url)
+        all_images = [self._normalize_image_url(img, base_url) for img in images]
+        return {'primary': primary, 'all': all_images}
+    
+    def _prices_from_text(self, page_text: str) -> Optional[Dict[str, str]]:
+        """Sayfa metninden fiyat (son çare): yalnızca para birimi işaretli tutarlar"""
+        if not page_text:
+            return None
+        
+        info = parse_price_info(page_text)
+        if not info.currency:
+            return None
+        return self._current_and_old(info.values)
+
+    def _prices_from_texts(self, texts: List[str]) -> Optional[Dict[str, str]]:
+        """Element metinlerinden fiyat: en düşük current, en yüksek old"""
+        values = []
+        for text in texts:
+            if text and text.strip():
+                values.extend(parse_prices(text))
+        return self._current_and_old(values)
+    
+    def _current_and_old(self, values) -> Optional[Dict[str, str]]:
+        """Mantıklı aralıktaki tutarlardan en düşüğü current, en yükseği old"""
+        values = sorted(v for v in values if 10 <= v <= 100000)
+        if not values:
+            return None
+        current = format_price(values[0])
+        old = format_price(values[-1]) if values[-1] != values[0] else None
+        return {'current': current, 'old': old}
+    
+    def _best_from_srcset(self, srcset: str) -> Tuple[Optional[str], int]:
+        """srcset'ten en yüksek genişlikli görsel (url, width)"""
+        highest_res = None
+        max_width = 0
+        for part in (srcset or '').split(','):
+            part = part.strip()
+            if ' ' in part:
+                url_part, size_part = part.rsplit(' ', 1)
+                if 'w' in size_part:
+                    try:
+                        width = int(size_part.replace('w', ''))
+                    except ValueError:
+                        continue
+                    if width > max_width:
+                        max_width = width
+                        highest_res = url_part.strip()
+        return highest_res, max_width
+    
+    def _is_image_candidate(self, src: str) -> bool:
+        """Ürün görseli olabilecek bir URL mi (format + skip keyword kontrolü)"""
+        if not src:
+            return False
+        src_lower = src.lower()
+        if not any(ext in src_lower for ext in ['.jpg', '.jpeg', '.webp', '.png']):
+            return False
+        return not any(keyword in src_lower for keyword in self.skip_keywords)
+    
+    def _images_from_elements(self, elements: List[Dict], base_url: str) -> Optional[Dict[str, any]]:
+        """img attribute'larından (src/srcset/data-src/alt) ürün görsellerini sırala"""
+        all_product_images = []
+        
+        for element in elements:
+            src = element.get('src')
+            alt_text = element.get('alt') or ''
+            
+            # srcset'ten en yüksek kaliteli görseli al
+            highest_res, max_width = self._best_from_srcset(element.get('srcset'))
+            if highest_res:
+                src = highest_res
+            
+            # data-src ve data-lazy-src kontrolü (lazy loading)
+            if not src:
+                src = element.get('data-lazy-src') or element.get('data-src')
+            
+            src = self._normalize_image_url(src, base_url)
+            if not self._is_image_candidate(src):
+                continue
+            
+            # Priority score hesapla
+            priority_score = 0
+            alt_lower = alt_text.lower()
+            if 'product' in alt_lower or 'ürün' in alt_lower or 'resmi' in alt_lower:
+                priority_score += 100
+            if max_width > 0:
+                priority_score += max_width / 10
+            
+            all_product_images.append({
+                'url': src,
+                'width': max_width,
+                'priority': priority_score,
+                'alt': alt_text
+            })
+        
+        if all_product_images:
+            # Priority score'a göre sırala (eşitlikte DOM sırası korunur)
+            all_product_images.sort(key=lambda x: x.get('priority', 0), reverse=True)
+            
+            primary = all_product_images[0]['url']
+            all_images = [primary]
+            for img in all_product_images:
+                if img['url'] not in all_images:
+                    all_images.append(img['url'])
+            
+            return {'primary': primary, 'all': all_images}
+        
+        return None
+    
+    def _images_from_fallback(self, elements: List[Dict], base_url: str) -> Optional[Dict[str, any]]:
+        """Tüm img'ler arasından yeterince büyük (veya boyutu bilinmeyen) görseller"""
+        candidate_images = []
+        for element in elements:
+            src = element.get('src')
+            if not self._is_image_candidate(src):
+                continue
+            large_enough = element.get('width', 0) > 150 and element.get('height', 0) > 150
+            # Görsel byte'ları engellendiyse (request blocking) 1x1 placeholder render edilir;
+            # boyut bilinemediği için aday olarak tut
+            if large_enough or element.get('placeholder'):
+                src = self._normalize_image_url(src, base_url)
+                if src not in candidate_images:
+                    candidate_images.append(src)
+        
+        if candidate_images:
+            return {'primary': candidate_images[0], 'all': candidate_images}
+        
+        return None
+
     # ========== Utility Methods ==========
     
     def _clean_title(self, title: str) -> str:
@@ -667,77 +659,19 @@ class UniversalScraper:
         if not price_value:
             return None
         
-        price_str = str(price_value).strip()
-        
-        # Sayısal değeri float'a çevir
-        try:
-            price_float = self._price_to_float(price_str)
-            
-            # Türkçe formatına çevir
-            if price_float >= 1000:
-                formatted = f"{price_float:,.2f} TL".replace(',', 'X').replace('.', ',').replace('X', '.')
-            else:
-                formatted = f"{price_float:.2f} TL".replace('.', ',')
-            
+        formatted = format_price(price_value)
+        if formatted:
             return formatted
-        except:
-            # Eğer parse edilemezse, direkt TL ekle
-            if 'TL' not in price_str.upper() and '₺' not in price_str:
-                return f"{price_str} TL"
-            return price_str
-    
-    def _price_to_float(self, price_str: str) -> float:
-        """Fiyat string'ini float'a çevir"""
-        if not price_str:
-            return 0.0
-        
-        # Temizle
-        price_clean = re.sub(r'[^\d,\.]', '', str(price_str))
-        
-        # Türkçe format: 1.299,99
-        if ',' in price_clean and '.' in price_clean:
-            # Nokta binlik, virgül ondalık
-            price_clean = price_clean.replace('.', '').replace(',', '.')
-        # İngilizce format: 1,299.99 veya 1299.99
-        elif ',' in price_clean:
-            price_clean = price_clean.replace(',', '')
-        # Sadece nokta: 1299.99
-        elif '.' in price_clean:
-            # Son 2 haneyi ondalık olarak ayır
-            parts = price_clean.split('.')
-            if len(parts) == 2 and len(parts[1]) == 2:
-                price_clean = price_clean
-            else:
-                price_clean = price_clean.replace('.', '')
         
-        try:
-            return float(price_clean)
-        except:
-            return 0.0
+        # Eğer parse edilemezse, direkt TL ekle
+        price_str = str(price_value).strip()
+        if 'TL' not in price_str.upper() and '₺' not in price_str:
+            return f"{price_str} TL"
+        return price_str
     
-    def _parse_price_text(self, text: str) -> List[str]:
-        """Fiyat metninden fiyatları parse et"""
-        if not text:
-            return []
-        
-        prices = []
-        
-        # Türkçe format: 1.299,99 veya 1.299,99 TL
-        pattern1 = r'([0-9]{1,3}(?:\.[0-9]{3})*,[0-9]{2})'
-        matches1 = re.findall(pattern1, text)
-        prices.extend(matches1)
-        
-        # İngilizce format: 1,299.99 veya 1299.99
-        pattern2 = r'([0-9]{1,3}(?:\.[0-9]{3})*\.[0-9]{2})'
-        matches2 = re.findall(pattern2, text)
-        prices.extend(matches2)
-        
-        # Basit format: 199.99 veya 199 TL
-        pattern3 = r'([0-9]+(?:\.[0-9]{2})?)'
-        matches3 = re.findall(pattern3, text)
-        prices.extend(matches3)
-        
-        return list(set(prices))  # Duplicate'leri kaldır
+    def _price_to_float(self, price_str: str) -> float:
+        """Fiyat string'ini float'a çevir (parse edilemezse 0.0)"""
+        return parse_price(price_str, 0.0)
     
     def _normalize_image_url(self, img_url: str, base_url: str) -> str:
         """Görsel URL'sini normalize et (relative -> absolute)"""